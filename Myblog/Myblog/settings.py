@@ -137,4 +137,7 @@ MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = "/accounts/login/"          # ← use auth login view (not admin)
 LOGIN_REDIRECT_URL = "/"                # after login
-LOGOUT_REDIRECT_URL = "/"               # after logout
\ No newline at end of file
+LOGOUT_REDIRECT_URL = "/"               # after logout
+# Post views are buffered in memory and written in bulk (blogs/view_buffer.py)
+BLOG_VIEW_FLUSH_INTERVAL = 10  # seconds; 0 writes each view immediately
+BLOG_VIEW_FLUSH_SIZE = 500     # flush early once this many views are waiting
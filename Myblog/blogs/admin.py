@@ -31,10 +31,7 @@ class PostAdmin(admin.ModelAdmin):
             super()
             .get_queryset(request)
             # NOTE: use new related names from models.py
-            .annotate(
-                _vcount=Count("view_events", distinct=True),
-                _lcount=Count("like_events", distinct=True),
-            )
+            .annotate(_lcount=Count("like_events", distinct=True))
         )
         # Limit non-superusers to their own posts
         if request.user.is_superuser:
@@ -43,8 +40,9 @@ class PostAdmin(admin.ModelAdmin):
 
     # Use method names that DON'T collide with Post.view_count field
     def admin_view_count(self, obj):
-        return getattr(obj, "_vcount", 0)
+        return obj.view_count  # kept up to date by blogs.view_buffer
     admin_view_count.short_description = "Views"
+    admin_view_count.admin_order_field = "view_count"
 
     def admin_like_count(self, obj):
         return getattr(obj, "_lcount", 0)
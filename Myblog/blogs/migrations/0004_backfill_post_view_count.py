@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_view_count(apps, schema_editor):
+    # Views were only stored as PostView rows until view_count became the
+    # counter post_detail reads (see blogs.view_buffer)
+    Post = apps.get_model("blogs", "Post")
+    PostView = apps.get_model("blogs", "PostView")
+    views = (
+        PostView.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Post.objects.update(view_count=Coalesce(Subquery(views, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0003_alter_post_options_rename_created_at_post_created_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_view_count, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,69 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+
+from . import view_buffer
+from .models import Post, PostView
+
+
+@override_settings(BLOG_VIEW_FLUSH_INTERVAL=60)
+class ViewBufferTests(TestCase):
+    def setUp(self):
+        author = get_user_model().objects.create_user("author", password="x")
+        self.post = Post.objects.create(title="First", body="Hello", author=author, status=Post.PUBLISHED)
+        self.other = Post.objects.create(title="Second", body="Hi", author=author, status=Post.PUBLISHED)
+        # Flushes are forced by the tests, never by the background thread
+        patcher = mock.patch.object(view_buffer, "_ensure_thread")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(view_buffer.flush)
+
+    def assert_views(self, post, count):
+        post.refresh_from_db()
+        self.assertEqual((post.view_count, post.view_events.count()), (count, count))
+
+    def test_flush_writes_events_and_counters(self):
+        for _ in range(3):
+            view_buffer.record(self.post, ip_address="127.0.0.1")
+        view_buffer.record(self.other)
+        self.assertEqual(view_buffer.pending_count(self.post.pk), 3)
+        self.assert_views(self.post, 0)
+
+        self.assertEqual(view_buffer.flush(), 4)
+
+        self.assertEqual(view_buffer.pending_count(self.post.pk), 0)
+        self.assert_views(self.post, 3)
+        self.assert_views(self.other, 1)
+        self.assertEqual(view_buffer.flush(), 0)
+
+    @override_settings(BLOG_VIEW_FLUSH_INTERVAL=0)
+    def test_zero_interval_writes_through(self):
+        view_buffer.record(self.post)
+        self.assert_views(self.post, 1)
+
+    def test_deleted_post_is_skipped(self):
+        view_buffer.record(self.post)
+        view_buffer.record(self.other)
+        self.other.delete()
+
+        self.assertEqual(view_buffer.flush(), 1)
+        self.assert_views(self.post, 1)
+
+    def test_failed_flush_is_retried(self):
+        view_buffer.record(self.post)
+        view_buffer.record(self.post)
+
+        # Fails after bulk_create has assigned primary keys
+        with mock.patch.object(QuerySet, "update", side_effect=DatabaseError("locked")), \
+                self.assertLogs("blogs.view_buffer", "ERROR"):
+            self.assertEqual(view_buffer.flush(), 0)
+
+        self.assertFalse(PostView.objects.exists())
+        self.assertEqual(view_buffer.pending_count(self.post.pk), 2)
+        self.assertTrue(all(e.pk is None and e._state.adding for e in view_buffer._events))
+
+        self.assertEqual(view_buffer.flush(), 2)
+        self.assert_views(self.post, 2)
@@ -0,0 +1,118 @@
+"""
+Buffered post view counting.
+
+post_detail used to insert a PostView row and count them all on every
+first view. Now record() only appends the event to an in-process buffer.
+A background thread flushes the buffer every BLOG_VIEW_FLUSH_INTERVAL
+seconds, or sooner once BLOG_VIEW_FLUSH_SIZE events are waiting. A flush
+is one transaction with one bulk_create of all PostView rows and one
+F() update of Post.view_count per post. A popular post getting thousands
+of views a minute therefore costs a few writes per interval.
+
+Pages read Post.view_count (plus pending_count() for views this process
+has not flushed yet), never COUNT(*) over PostView.
+
+Each process has its own buffer; the F() increments add up correctly
+across processes. Events still buffered when a process is killed are
+lost (flush() also runs at exit), which is fine for view statistics.
+BLOG_VIEW_FLUSH_INTERVAL = 0 writes through synchronously (tests, dev).
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from .models import Post, PostView
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = getattr(settings, "BLOG_VIEW_FLUSH_SIZE", 500)
+# Events kept for a retry when the database is unavailable; older ones are dropped
+MAX_PENDING = FLUSH_SIZE * 20
+
+_lock = threading.Lock()
+_events = []
+_pending = Counter()  # post id -> buffered views
+_wake = threading.Event()
+_thread = None
+
+
+def _flush_interval():
+    # Read per call so override_settings() applies
+    return getattr(settings, "BLOG_VIEW_FLUSH_INTERVAL", 10)  # seconds
+
+
+def record(post, user=None, ip_address=None, user_agent=""):
+    """Queue one view of `post`; nothing is written to the database here."""
+    event = PostView(post_id=post.pk, user=user, ip_address=ip_address, user_agent=user_agent)
+    with _lock:
+        _events.append(event)
+        _pending[post.pk] += 1
+        waiting = len(_events)
+    if _flush_interval() <= 0:
+        flush()
+        return
+    _ensure_thread()
+    if waiting >= FLUSH_SIZE:
+        _wake.set()
+
+
+def pending_count(post_id):
+    """Views of this post recorded here but not flushed yet."""
+    with _lock:
+        return _pending.get(post_id, 0)
+
+
+def flush():
+    """Write buffered events and counter increments; returns how many events were written."""
+    global _events, _pending
+    with _lock:
+        events, pending = _events, _pending
+        _events, _pending = [], Counter()
+    if not events:
+        return 0
+    try:
+        with transaction.atomic():
+            # Posts deleted since the view would fail the whole insert
+            live = set(Post.objects.filter(pk__in=pending).values_list("pk", flat=True))
+            events = [e for e in events if e.post_id in live]
+            PostView.objects.bulk_create(events, batch_size=FLUSH_SIZE)
+            for post_id, views in pending.items():
+                if post_id in live:
+                    Post.objects.filter(pk=post_id).update(view_count=F("view_count") + views)
+    except Exception:
+        logger.exception("Flushing %d post views failed; keeping them for the next flush", len(events))
+        # bulk_create may have assigned primary keys before the rollback;
+        # the retry must insert these as new rows again
+        for event in events:
+            event.pk = None
+            event._state.adding = True
+        with _lock:
+            _events = (events + _events)[-MAX_PENDING:]
+            _pending = Counter(e.post_id for e in _events)
+        return 0
+    return len(events)
+
+
+def _run():
+    while True:
+        _wake.wait(_flush_interval())
+        _wake.clear()
+        close_old_connections()
+        flush()
+
+
+def _ensure_thread():
+    global _thread
+    if _thread is None:
+        with _lock:
+            if _thread is None:
+                _thread = threading.Thread(target=_run, name="post-view-flush", daemon=True)
+                _thread.start()
+
+
+atexit.register(flush)
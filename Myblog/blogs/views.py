@@ -3,11 +3,12 @@ from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.core.paginator import Paginator
-from django.db.models import Count, Q, F
+from django.db.models import Count, Q, Sum
 from django.shortcuts import get_object_or_404, redirect, render
 
 from .forms import PostForm, CommentForm
-from .models import Post, Category, Tag, PostView, PostLike
+from . import view_buffer
+from .models import Post, Category, Tag, PostLike
 
 
 # -------- helpers --------
@@ -79,7 +80,7 @@ def post_detail(request, slug):
     post = get_object_or_404(
         Post.objects.published()
         .select_related("author", "category")
-        .prefetch_related("comments", "like_events", "view_events"),
+        .prefetch_related("comments", "like_events"),
         slug=slug,
     )
 
@@ -87,15 +88,14 @@ def post_detail(request, slug):
     viewed = set(request.session.get("viewed_posts", []))
     key = f"post:{post.pk}"
     if key not in viewed:
-        PostView.objects.create(
-            post=post,
+        # Buffered; the PostView row and the view_count increment are
+        # written in bulk by view_buffer.flush()
+        view_buffer.record(
+            post,
             user=request.user if request.user.is_authenticated else None,
             ip_address=_get_client_ip(request),
             user_agent=request.META.get("HTTP_USER_AGENT", "")[:500],
         )
-        # If you DO NOT have a Post.view_count integer field, don't touch it.
-        # If you DO have it, uncomment the next line.
-        # Post.objects.filter(pk=post.pk).update(view_count=F("view_count") + 1)
         viewed.add(key)
         request.session["viewed_posts"] = list(viewed)
 
@@ -108,7 +108,8 @@ def post_detail(request, slug):
         "comment_form": CommentForm(),
         "liked": liked,
         "like_count": post.like_events.count(),   # count via PostLike reverse
-        "view_count": post.view_events.count(),   # count via PostView reverse
+        # denormalized counter plus this process's unflushed views
+        "view_count": post.view_count + view_buffer.pending_count(post.pk),
     }
     return render(request, "blog/post_detail.html", context)
 
@@ -123,9 +124,8 @@ def author_dashboard(request):
     base_qs = (
         Post.objects.filter(author=request.user)
         .select_related("category")
-        # Use non-conflicting annotation names
+        # Use non-conflicting annotation names; views come from Post.view_count
         .annotate(
-            v_count=Count("view_events", distinct=True),
             l_count=Count("like_events", distinct=True),
             c_count=Count("comments", distinct=True),
         )
@@ -146,13 +146,14 @@ def author_dashboard(request):
     # totals panel for the author
     totals = base_qs.aggregate(
         total_posts=Count("id", distinct=True),
-        total_views=Count("view_events", distinct=True),
         total_likes=Count("like_events", distinct=True),
         total_comments=Count("comments", distinct=True),
     )
+    # separate query: summed across the like/comment joins it would be multiplied
+    totals.update(Post.objects.filter(author=request.user).aggregate(total_views=Sum("view_count")))
 
     # trending (top by views then likes)
-    trending = base_qs.order_by("-v_count", "-l_count")[:5]
+    trending = base_qs.order_by("-view_count", "-l_count")[:5]
 
     return render(
         request,
@@ -0,0 +1,94 @@
+"""
+Local stand-in for the Gemini REST API, for development and tests.
+
+    python -m ai.fake_server --port 8765 --delay 0.05
+
+then set GEMINI_API_BASE=http://127.0.0.1:8765/v1beta and any non-empty
+GEMINI_API_KEY. Serves both `:generateContent` (one JSON body) and
+`:streamGenerateContent?alt=sse` (one `data:` event per word, `--delay`
+seconds apart) so streaming views can be exercised without network access.
+The answer echoes the last line of the prompt.
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_answer(prompt: str) -> str:
+    lines = [line for line in prompt.strip().splitlines() if line.strip()]
+    tail = lines[-1] if lines else ""
+    return f"Summary (fake model): {tail}"
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    delay = 0.05
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _prompt(self) -> str:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        try:
+            return body["contents"][0]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            return ""
+
+    def _event(self, text, final=False) -> dict:
+        event = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+        if final:
+            event["usageMetadata"] = {"promptTokenCount": 1, "candidatesTokenCount": 1}
+        return event
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        answer = fake_answer(self._prompt())
+
+        if path.endswith(":generateContent"):
+            payload = json.dumps(self._event(answer, final=True)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        if not path.endswith(":streamGenerateContent"):
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            chunk = word if i == 0 else " " + word
+            event = self._event(chunk, final=(i == len(words) - 1))
+            self._write_chunk(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+            time.sleep(self.delay)
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+def serve(port=8765, delay=0.05, host="127.0.0.1") -> ThreadingHTTPServer:
+    """Build (but do not start) a fake server; call serve_forever() on it."""
+    handler = type("Handler", (FakeGeminiHandler,), {"delay": delay})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Gemini API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.05,
+                        help="Seconds between streamed words.")
+    opts = parser.parse_args()
+    server = serve(opts.port, opts.delay, opts.host)
+    print(f"Fake Gemini listening on http://{opts.host}:{opts.port}/v1beta")
+    server.serve_forever()
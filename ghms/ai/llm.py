@@ -1,42 +1,303 @@
+"""
+Shared Gemini client for GHMS.
+
+Every LLM call in the project goes through call_gemini() here:
+
+- one pooled requests.Session per process (keep-alive connections),
+- connect/read timeouts and retries with exponential backoff on 429/5xx,
+- a content-addressed response cache (sha256 of model + parameters +
+  prompt -> text) stored in the Django cache alias "llm", whose backend
+  handles TTL and size-bounded eviction (MAX_ENTRIES),
+- in-process metrics: latency, token usage and cache hit rate,
+- stream_gemini() for token streaming over server-sent events
+  (`:streamGenerateContent?alt=sse`), so views can show the first words
+  while the rest is still being generated.
+
+Configuration (settings, falling back to environment):
+GEMINI_API_KEY, GEMINI_MODEL, GEMINI_API_BASE (point at a local fake
+server in development, e.g. `python -m ai.fake_server`), LLM_TIMEOUT,
+LLM_MAX_RETRIES, LLM_CACHE_TTL.
+"""
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+logger = logging.getLogger(__name__)
 
-API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+DEFAULT_MODEL = "gemini-2.5-flash"
+DEFAULT_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+MAX_OUTPUT_TOKENS = 512
 
 
 class LLMNotConfigured(Exception):
+    """Raised when no valid LLM configuration is available."""
+    pass
+
+
+class LLMRequestFailed(LLMNotConfigured):
+    """
+    Raised when a configured LLM call fails at runtime.
+    Subclasses LLMNotConfigured so callers fall back the same way.
+    """
     pass
 
 
-def _check_config():
-    if not GEMINI_API_KEY:
-        raise LLMNotConfigured("GEMINI_API_KEY not set")
+def _setting(name, default=None):
+    value = getattr(settings, name, None)
+    if value in (None, ""):
+        value = os.getenv(name, default)
+    return value
+
+
+class LLMMetrics:
+    """Thread-safe counters for LLM usage; read with snapshot()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.cache_hits = 0
+            self.errors = 0
+            self.latency_total = 0.0
+            self.latency_max = 0.0
+            self.prompt_tokens = 0
+            self.output_tokens = 0
+
+    def record_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def record_call(self, latency, usage=None, error=False):
+        usage = usage or {}
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.prompt_tokens += int(usage.get("promptTokenCount", 0) or 0)
+            self.output_tokens += int(usage.get("candidatesTokenCount", 0) or 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.requests + self.cache_hits
+            return {
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "cache_hit_rate": (self.cache_hits / lookups) if lookups else 0.0,
+                "errors": self.errors,
+                "latency_avg_ms": (self.latency_total / self.requests * 1000) if self.requests else 0.0,
+                "latency_max_ms": self.latency_max * 1000,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+            }
+
+
+metrics = LLMMetrics()
+
+
+class GeminiClient:
+    """Gemini REST client with a pooled session, retries and response cache."""
+
+    def __init__(self, api_key=None, model=None, api_base=None, timeout=None,
+                 max_retries=None, cache_ttl=None, pool_size=10):
+        self.api_key = api_key or _setting("GEMINI_API_KEY")
+        self.model = model or _setting("GEMINI_MODEL", DEFAULT_MODEL)
+        self.api_base = (api_base or _setting("GEMINI_API_BASE", DEFAULT_API_BASE)).rstrip("/")
+        self.timeout = float(timeout if timeout is not None else _setting("LLM_TIMEOUT", 15))
+        self.cache_ttl = int(cache_ttl if cache_ttl is not None else _setting("LLM_CACHE_TTL", 24 * 3600))
+        retries = int(max_retries if max_retries is not None else _setting("LLM_MAX_RETRIES", 2))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def url(self) -> str:
+        return f"{self.api_base}/models/{self.model}:generateContent"
+
+    @property
+    def stream_url(self) -> str:
+        return f"{self.api_base}/models/{self.model}:streamGenerateContent"
+
+    def _cache(self):
+        try:
+            return caches["llm"]
+        except InvalidCacheBackendError:
+            return caches["default"]
+
+    def cache_key(self, prompt, temperature, max_tokens) -> str:
+        raw = json.dumps(
+            {"m": self.model, "t": temperature, "n": max_tokens, "p": prompt},
+            sort_keys=True,
+        )
+        return "llm:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _payload(self, prompt, temperature, max_tokens) -> dict:
+        return {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": temperature,
+                "maxOutputTokens": max_tokens,
+            },
+        }
+
+    def generate(self, prompt: str, temperature: float = 0.3,
+                 max_tokens: int = MAX_OUTPUT_TOKENS, use_cache: bool = True) -> str:
+        if not self.api_key:
+            raise LLMNotConfigured("GEMINI_API_KEY not set")
+
+        key = self.cache_key(prompt, temperature, max_tokens)
+        if use_cache:
+            cached = self._cache().get(key)
+            if cached is not None:
+                metrics.record_hit()
+                return cached
+
+        started = time.perf_counter()
+        try:
+            resp = self.session.post(
+                self.url,
+                params={"key": self.api_key},
+                json=self._payload(prompt, temperature, max_tokens),
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            body = resp.json()
+        except (requests.RequestException, ValueError) as exc:
+            metrics.record_call(time.perf_counter() - started, error=True)
+            logger.warning("Gemini call failed: %s", exc)
+            raise LLMRequestFailed(str(exc)) from exc
+
+        metrics.record_call(time.perf_counter() - started, body.get("usageMetadata"))
+
+        try:
+            text = body["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            text = ""
+        text = (text or "").strip()
+
+        if text and use_cache:
+            self._cache().set(key, text, self.cache_ttl)
+        return text
+
+    def stream(self, prompt: str, temperature: float = 0.3,
+               max_tokens: int = MAX_OUTPUT_TOKENS, use_cache: bool = True):
+        """
+        Yield the completion in chunks as the model produces them.
+
+        A cached answer is yielded in one piece. The full text is cached
+        once the stream completes, so a later generate() with the same
+        parameters is a cache hit. Errors raise LLMRequestFailed, also
+        after some chunks were yielded: a stream cut off midway is never
+        returned (or cached) as if it were the whole answer.
+        """
+        if not self.api_key:
+            raise LLMNotConfigured("GEMINI_API_KEY not set")
+
+        key = self.cache_key(prompt, temperature, max_tokens)
+        if use_cache:
+            cached = self._cache().get(key)
+            if cached is not None:
+                metrics.record_hit()
+                yield cached
+                return
+
+        started = time.perf_counter()
+        try:
+            resp = self.session.post(
+                self.stream_url,
+                params={"key": self.api_key, "alt": "sse"},
+                json=self._payload(prompt, temperature, max_tokens),
+                timeout=self.timeout,
+                stream=True,
+            )
+            resp.raise_for_status()
+        except requests.RequestException as exc:
+            metrics.record_call(time.perf_counter() - started, error=True)
+            logger.warning("Gemini stream failed: %s", exc)
+            raise LLMRequestFailed(str(exc)) from exc
+
+        parts = []
+        usage = None
+        error = False
+        try:
+            for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                try:
+                    event = json.loads(line[5:].strip())
+                except ValueError:
+                    continue
+                usage = event.get("usageMetadata") or usage
+                try:
+                    chunk = event["candidates"][0]["content"]["parts"][0]["text"]
+                except (KeyError, IndexError, TypeError):
+                    continue
+                if chunk:
+                    parts.append(chunk)
+                    yield chunk
+        except requests.RequestException as exc:
+            error = True
+            logger.warning("Gemini stream interrupted: %s", exc)
+            raise LLMRequestFailed(str(exc)) from exc
+        finally:
+            resp.close()
+            metrics.record_call(time.perf_counter() - started, usage, error=error)
+
+        text = "".join(parts).strip()
+        if text and use_cache:
+            self._cache().set(key, text, self.cache_ttl)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GeminiClient:
+    """Process-wide client (and connection pool), created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+    return _client
+
+
+def reset_client() -> None:
+    """Drop the shared client, e.g. after changing settings."""
+    global _client
+    with _client_lock:
+        _client = None
 
 
 def call_gemini(prompt: str, temperature: float = 0.3) -> str:
-    _check_config()
-
-    headers = {"Content-Type": "application/json"}
-    params = {"key": GEMINI_API_KEY}
-
-    data = {
-        "contents": [
-            {"parts": [{"text": prompt}]}
-        ],
-        "generationConfig": {
-            "temperature": temperature,
-            "maxOutputTokens": 512,
-        },
-    }
-
-    resp = requests.post(API_URL, headers=headers, params=params, json=data, timeout=15)
-    resp.raise_for_status()
-    body = resp.json()
-
-    try:
-        return body["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception:
-        return ""
+    return get_client().generate(prompt, temperature=temperature)
+
+
+def stream_gemini(prompt: str, temperature: float = 0.3):
+    return get_client().stream(prompt, temperature=temperature)
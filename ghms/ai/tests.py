@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from ai.fake_server import fake_answer, serve
+from ai.llm import GeminiClient, LLMNotConfigured, LLMRequestFailed, metrics
+
+
+def _event(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """
+    Answers each POST with the next (status, body, delay) from the
+    server's script; the last entry repeats. A list body is sent as an
+    SSE stream, one line per item.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            status, body, delay = server.script[min(server.requests, len(server.script)) - 1]
+        time.sleep(delay)
+
+        if isinstance(body, list):
+            payload = "".join(f"{line}\r\n" for line in body).encode("utf-8")
+            content_type = "text/event-stream"
+        else:
+            payload = json.dumps(body).encode("utf-8")
+            content_type = "application/json"
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out first
+
+
+class CutOffStreamHandler(BaseHTTPRequestHandler):
+    """Sends one SSE event, then drops the connection mid-response."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        payload = f"data: {json.dumps(_event('Partial'))}\r\n\r\n".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # One complete chunk and no terminating zero-length chunk
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class LocalServerTestCase(SimpleTestCase):
+    def setUp(self):
+        caches["llm"].clear()
+        metrics.reset()
+
+    def start(self, server):
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1beta"
+
+    def scripted(self, *script):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+        server.script = list(script)
+        server.requests = 0
+        server.lock = threading.Lock()
+        self.server = server
+        return self.start(server)
+
+    def gemini(self, api_base, **kwargs):
+        kwargs.setdefault("max_retries", 0)
+        return GeminiClient(api_key="test-key", api_base=api_base, **kwargs)
+
+
+class GenerateTests(LocalServerTestCase):
+    def test_retries_on_server_errors(self):
+        base = self.scripted((503, {}, 0), (200, _event("recovered"), 0))
+        text = self.gemini(base, max_retries=1).generate("hello")
+        self.assertEqual(text, "recovered")
+        self.assertEqual(self.server.requests, 2)
+
+    def test_gives_up_after_max_retries(self):
+        base = self.scripted((503, {}, 0))
+        with self.assertRaises(LLMRequestFailed), self.assertLogs("ai.llm", "WARNING"):
+            self.gemini(base, max_retries=1).generate("hello")
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(metrics.snapshot()["errors"], 1)
+
+    def test_timeout(self):
+        base = self.scripted((200, _event("too late"), 1.0))
+        started = time.perf_counter()
+        with self.assertRaises(LLMRequestFailed), self.assertLogs("ai.llm", "WARNING"):
+            self.gemini(base, timeout=0.2).generate("hello")
+        self.assertLess(time.perf_counter() - started, 0.9)
+
+    def test_not_configured(self):
+        client = self.gemini("http://127.0.0.1:9/v1beta")
+        client.api_key = ""
+        with self.assertRaises(LLMNotConfigured):
+            client.generate("hello")
+        with self.assertRaises(LLMNotConfigured):
+            next(client.stream("hello"))
+
+    def test_request_failure_is_a_not_configured_fallback(self):
+        # Callers catch LLMNotConfigured to fall back for both cases
+        self.assertTrue(issubclass(LLMRequestFailed, LLMNotConfigured))
+
+    def test_responses_are_cached(self):
+        base = self.scripted((200, _event("  cached answer "), 0))
+        client = self.gemini(base)
+        self.assertEqual(client.generate("hello"), "cached answer")
+        self.assertEqual(client.generate("hello"), "cached answer")
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(metrics.snapshot()["cache_hits"], 1)
+        client.generate("hello", temperature=0.9)
+        self.assertEqual(self.server.requests, 2)
+
+
+class StreamTests(LocalServerTestCase):
+    def test_stream_from_fake_server(self):
+        base = self.start(serve(port=0, delay=0))
+        client = self.gemini(base)
+        prompt = "Summarize:\n- 2024-01-01 | Lab: FBC x1"
+
+        chunks = list(client.stream(prompt))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), fake_answer(prompt))
+        # The finished stream is cached for generate()
+        self.assertEqual(client.generate(prompt), fake_answer(prompt))
+        self.assertEqual(metrics.snapshot()["cache_hits"], 1)
+
+    def test_stream_skips_non_text_events(self):
+        base = self.scripted((200, [
+            ": keep-alive",
+            "",
+            "data: not json",
+            "data: " + json.dumps(_event("Hello")),
+            "",
+            "event: ping",
+            "data: " + json.dumps({"candidates": [{"finishReason": "STOP"}]}),
+            "data: " + json.dumps(_event(" world")),
+            "data: " + json.dumps({"usageMetadata": {"promptTokenCount": 3, "candidatesTokenCount": 2}}),
+        ], 0))
+
+        chunks = list(self.gemini(base).stream("hello"))
+
+        self.assertEqual(chunks, ["Hello", " world"])
+        self.assertEqual(metrics.snapshot()["output_tokens"], 2)
+
+    def test_stream_error_before_first_chunk(self):
+        base = self.scripted((500, {}, 0))
+        with self.assertRaises(LLMRequestFailed), self.assertLogs("ai.llm", "WARNING"):
+            list(self.gemini(base).stream("hello"))
+
+    def test_stream_cut_off_midway_raises(self):
+        base = self.start(ThreadingHTTPServer(("127.0.0.1", 0), CutOffStreamHandler))
+        client = self.gemini(base)
+        chunks = []
+        with self.assertRaises(LLMRequestFailed), self.assertLogs("ai.llm", "WARNING"):
+            for chunk in client.stream("hello"):
+                chunks.append(chunk)
+
+        self.assertEqual(chunks, ["Partial"])
+        self.assertEqual(metrics.snapshot()["errors"], 1)
+        # The partial answer was not cached
+        self.assertIsNone(caches["llm"].get(client.cache_key("hello", 0.3, 512)))
@@ -3,7 +3,8 @@ from rest_framework import serializers
 from patients.models import Patient
 from workflow.models import Referral
 from core.models import Department
-from clinical.models import LabOrder, LabResult, ImagingOrder, ImagingStudy, Prescription, PharmacyDispense, Invoice, Payment
+from clinical.models import LabOrder, LabResult, ImagingOrder, ImagingStudy, Prescription, PharmacyDispense
+from finance.models import Invoice, Payment
 
 class PatientSerializer(serializers.ModelSerializer):
     class Meta:
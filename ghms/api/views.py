@@ -52,10 +52,12 @@ class PharmacyDispenseViewset(viewsets.ModelViewSet, ScopedMixin):
     serializer_class = PharmacyDispenseSerializer
     def get_queryset(self): return self.filter_to_dept(PharmacyDispense.objects.select_related("prescription"), field="prescription__patient__upi")
 
-class InvoiceViewset(viewsets.ModelViewSet, ScopedMixin):
+# Invoices and payments come from the finance ledger and are read-only here:
+# billing and payment capture go through finance.billing and the cashier UI.
+class InvoiceViewset(mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet, ScopedMixin):
     serializer_class = InvoiceSerializer
     def get_queryset(self): return self.filter_to_dept(Invoice.objects.all())
 
-class PaymentViewset(viewsets.ModelViewSet, ScopedMixin):
+class PaymentViewset(mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet, ScopedMixin):
     serializer_class = PaymentSerializer
     def get_queryset(self): return self.filter_to_dept(Payment.objects.select_related("invoice"), field="invoice__patient__upi")
@@ -54,6 +54,10 @@ class ImagingStudy(models.Model):
     signed_at = models.DateTimeField(auto_now_add=True)
 
 class Invoice(models.Model):
+    """
+    Deprecated: superseded by finance.models.Invoice. Nothing writes this
+    table any more; it is kept only so existing rows stay readable.
+    """
     id = models.AutoField(primary_key=True)
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     total = models.DecimalField(max_digits=12, decimal_places=2)
@@ -62,6 +66,7 @@ class Invoice(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 class Payment(models.Model):
+    """Deprecated: superseded by finance.models.Payment (see Invoice above)."""
     id = models.AutoField(primary_key=True)
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="payments")
     amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -1,23 +1,23 @@
 
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.deprecation import MiddlewareMixin
 
 EXEMPT_PATHS = {"/login/", "/admin/login/", "/admin/logout/"}
 
-class EnforceDepartmentMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
+class EnforceDepartmentMiddleware(MiddlewareMixin):
+    # MiddlewareMixin makes this async-capable, so an async view (the
+    # messaging long-poll) does not hold a thread while it waits.
+    def process_request(self, request):
         # If not logged in, do nothing special
         if not request.user.is_authenticated:
-            return self.get_response(request)
+            return None
 
         path = request.path
 
         # Allow admin & static & login/logout without interference
         if path.startswith("/admin/") or path.startswith("/static/"):
-            return self.get_response(request)
+            return None
 
         # Resolve once (safe even if urls change)
         try:
@@ -37,7 +37,7 @@ class EnforceDepartmentMiddleware:
 
         # Don't enforce on these views to avoid redirect loops
         if path in {my_profile_url, login_url, logout_url}:
-            return self.get_response(request)
+            return None
 
         # Check staff profile / department
         sp = getattr(request.user, "staffprofile", None)
@@ -45,4 +45,4 @@ class EnforceDepartmentMiddleware:
             # Send them to profile page to show "No staff profile linked"
             return redirect("my_profile")
 
-        return self.get_response(request)
\ No newline at end of file
+        return None
\ No newline at end of file
@@ -2,3 +2,6 @@ from django.apps import AppConfig
 
 class DaasConfig(AppConfig):
     name='daas'
+
+    def ready(self):
+        from . import signals
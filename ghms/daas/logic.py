@@ -1,7 +1,10 @@
 from datetime import timedelta
 
+from django.core.cache import cache
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 
 from .models import DaasEvent, DaasShiftSummary
 from ai.llm import call_gemini, LLMNotConfigured
@@ -10,6 +13,84 @@ from ai.llm import call_gemini, LLMNotConfigured
 
 SHIFT_LENGTH_HOURS = 8
 
+# Latest-shift lookups are cached briefly; saves to DaasShiftSummary evict them on commit.
+LATEST_SHIFT_CACHE_TTL = 60
+_NO_SHIFT = "none"
+
+
+def _latest_shift_key(user_id) -> str:
+    return f"daas:latest_shift:{user_id}"
+
+
+def latest_shifts(users) -> dict:
+    """
+    Latest DaasShiftSummary per user, as {user_id: shift or None}.
+
+    Accepts users or user ids. Cached entries are served from the Django
+    cache; all misses are resolved with one query (ROW_NUMBER() per user
+    ordered by shift_start), however many users are asked for.
+    """
+    user_ids = {getattr(u, "pk", u) for u in users}
+    if not user_ids:
+        return {}
+
+    keys = {_latest_shift_key(uid): uid for uid in user_ids}
+    cached = cache.get_many(keys.keys())
+    result = {keys[k]: (None if v == _NO_SHIFT else v) for k, v in cached.items()}
+
+    missing = user_ids - result.keys()
+    if missing:
+        rows = (
+            DaasShiftSummary.objects
+            .filter(user_id__in=missing)
+            .annotate(rn=Window(
+                expression=RowNumber(),
+                partition_by=[F("user_id")],
+                order_by=F("shift_start").desc(),
+            ))
+            .filter(rn=1)
+        )
+        found = {s.user_id: s for s in rows}
+        to_cache = {}
+        for uid in missing:
+            shift = found.get(uid)
+            result[uid] = shift
+            to_cache[_latest_shift_key(uid)] = shift if shift is not None else _NO_SHIFT
+        cache.set_many(to_cache, LATEST_SHIFT_CACHE_TTL)
+
+    return result
+
+
+def latest_shift(user):
+    return latest_shifts([user]).get(user.pk)
+
+
+def invalidate_latest_shift(user_id) -> None:
+    """
+    Evict the user's cached latest shift once the current transaction
+    commits; evicting earlier lets a concurrent reader re-cache the old row.
+    """
+    key = _latest_shift_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def shift_status(shift, now=None) -> str:
+    """"on" / "scheduled" / "off" for a shift (or None)."""
+    if not shift:
+        return "off"
+    now = now or timezone.now()
+    if shift.shift_start <= now <= shift.shift_end:
+        return "on"
+    if now < shift.shift_start:
+        return "scheduled"
+    return "off"
+
+
+def shift_statuses(users) -> dict:
+    """{user_id: status} for many users with at most one query."""
+    now = timezone.now()
+    return {uid: shift_status(s, now) for uid, s in latest_shifts(users).items()}
+
 
 def current_shift_window(ts=None):
     """
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.15 on 2026-10-19 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('daas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='daasshiftsummary',
+            index=models.Index(fields=['user', '-shift_start'], name='daas_shift_user_start_idx'),
+        ),
+    ]
@@ -44,6 +44,9 @@ class DaasShiftSummary(models.Model):
 
     class Meta:
         ordering = ("-shift_start",)
+        indexes = [
+            models.Index(fields=["user", "-shift_start"], name="daas_shift_user_start_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} {self.shift_start} [{self.status}]"
\ No newline at end of file
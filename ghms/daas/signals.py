@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .logic import invalidate_latest_shift
+from .models import DaasShiftSummary
+
+
+@receiver(post_save, sender=DaasShiftSummary)
+@receiver(post_delete, sender=DaasShiftSummary)
+def evict_latest_shift(sender, instance, **kwargs):
+    invalidate_latest_shift(instance.user_id)
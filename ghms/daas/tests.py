@@ -0,0 +1,32 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from .logic import latest_shift
+from .models import DaasShiftSummary
+
+
+class LatestShiftCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("nurse")
+        self.now = timezone.now()
+
+    def add_shift(self, hours_ago):
+        start = self.now - datetime.timedelta(hours=hours_ago)
+        return DaasShiftSummary.objects.create(
+            user=self.user, shift_start=start, shift_end=start + datetime.timedelta(hours=8),
+        )
+
+    def test_eviction_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old = self.add_shift(24)
+        self.assertEqual(latest_shift(self.user), old)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            new = self.add_shift(1)
+            # Not committed yet: other requests must keep the old cached row
+            self.assertEqual(latest_shift(self.user), old)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(latest_shift(self.user), new)
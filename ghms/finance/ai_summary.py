@@ -1,87 +1,49 @@
-import os
+import datetime
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
 
+from ai.llm import call_gemini, stream_gemini, LLMNotConfigured
 from workflow.models import PatientServiceLog
+from .models import PatientSummary
 
 logger = logging.getLogger(__name__)
 
+EMPTY_HISTORY_TEXT = "No clinical or billing data recorded for this patient yet."
 
-class LLMNotConfigured(Exception):
-    """Raised when no valid LLM configuration is available."""
-    pass
-
-
-def _get_gemini_api_key() -> str:
-    """
-    Get Gemini API key from settings or environment.
-    Raises LLMNotConfigured if missing.
-    """
-    key = getattr(settings, "GEMINI_API_KEY", None) or os.getenv("GEMINI_API_KEY")
-    if not key:
-        raise LLMNotConfigured("GEMINI_API_KEY is not configured.")
-    return key
+# Summaries stuck in PENDING longer than this are re-queued on the next view.
+PENDING_STALE_SECONDS = 300
+# After a failed LLM call, views wait this long before trying again.
+FAILED_RETRY_SECONDS = 60
 
 
-def call_gemini(prompt: str) -> str:
-    """
-    Thin wrapper around Gemini.
-    - Uses GEMINI_API_KEY
-    - Raises LLMNotConfigured on any config/import/network failure
-    """
-    key = _get_gemini_api_key()
-
-    try:
-        import google.generativeai as genai
-    except ImportError:
-        raise LLMNotConfigured("google-generativeai package is not installed.")
-
-    try:
-        genai.configure(api_key=key)
-        model_name = getattr(settings, "GEMINI_MODEL", "gemini-1.5-flash")
-        model = genai.GenerativeModel(model_name)
-        resp = model.generate_content(prompt)
-
-        # Try to extract text robustly
-        text = getattr(resp, "text", "") or ""
-        if not text and getattr(resp, "candidates", None):
-            parts = resp.candidates[0].content.parts
-            if parts:
-                text = getattr(parts[0], "text", "") or ""
-
-        return (text or "").strip()
-    except Exception as exc:
-        logger.warning("Gemini call failed: %s", exc, exc_info=True)
-        # For our app, treat any runtime failure as "not configured" so we fall back safely
-        raise LLMNotConfigured("Gemini runtime failure")
-
-
-def summarize_patient_services(patient) -> str:
-    """
-    Build a structured summary of a patient's service history.
-    - If Gemini is available, returns AI-generated narrative.
-    - If not, returns a deterministic bullet list (no external calls).
-    """
-    logs = (
+def _patient_logs(patient):
+    return (
         PatientServiceLog.objects.filter(patient=patient)
         .select_related("service", "department")
         .order_by("created_at")
     )
 
-    if not logs.exists():
-        return "No clinical or billing data recorded for this patient yet."
 
+def baseline_summary(patient) -> str:
+    """Deterministic bullet list of the patient's services (no external calls)."""
     bullet_lines = []
-    for s in logs:
+    for s in _patient_logs(patient):
         dept_name = s.department.name if getattr(s, "department", None) else "N/A"
         bullet_lines.append(
             f"- {s.created_at.date()} | {dept_name}: "
             f"{s.service.name} x{s.quantity} @ {s.unit_price} = {s.total_price}"
         )
+    return "\n".join(bullet_lines) or EMPTY_HISTORY_TEXT
 
-    baseline = "\n".join(bullet_lines)
 
-    prompt = (
+def build_summary_prompt(baseline: str) -> str:
+    return (
         "You are an AI assistant for a public hospital EMR.\n"
         "Summarize the patient's journey based ONLY on the following services.\n"
         "Highlight key investigations, treatments, and pending financial/clinical actions.\n"
@@ -89,9 +51,232 @@ def summarize_patient_services(patient) -> str:
         f"{baseline}\n"
     )
 
+
+def summarize_patient_services(patient) -> str:
+    """
+    Build a structured summary of a patient's service history.
+    - If Gemini is available, returns AI-generated narrative.
+    - If not, returns a deterministic bullet list (no external calls).
+    """
+    baseline = baseline_summary(patient)
+    if baseline == EMPTY_HISTORY_TEXT:
+        return baseline
+
     try:
-        ai_text = call_gemini(prompt)
+        ai_text = call_gemini(build_summary_prompt(baseline))
         return ai_text or baseline
     except LLMNotConfigured:
         # Safe local fallback
         return baseline
+
+
+# Control characters that end a summary stream; never part of model text.
+# STREAM_FAILED: no AI summary (model unavailable or failed, possibly
+# midway), so the editor discards any partial text and keeps the service list.
+STREAM_FAILED = "\x00"
+# STREAM_PENDING: another worker is generating it; the editor retries later.
+STREAM_PENDING = "\x01"
+
+
+def stream_patient_summary(patient):
+    """
+    Yield the summary text in chunks as the LLM produces it.
+
+    The stream takes the same claim as the background job
+    (claim_summary), so one patient's summary is generated once however
+    many people open the report; the others get STREAM_PENDING straight
+    away and retry, rather than holding a worker until it is stored.
+    The text is stored as READY only when the stream completes. A stream
+    that yields no AI text (Gemini unavailable, failed midway, or empty)
+    marks the summary FAILED and ends with STREAM_FAILED, so the editor
+    can tell the service-list fallback from a real summary.
+    """
+    text, ready = get_patient_summary(patient, refresh=False)
+    if ready or text == EMPTY_HISTORY_TEXT:
+        yield text
+        return
+    if not claim_summary(patient.pk):
+        yield STREAM_PENDING
+        return
+
+    fingerprint = services_fingerprint(patient)
+    parts = []
+    chunks = stream_gemini(build_summary_prompt(text))
+    try:
+        for chunk in chunks:
+            chunk = chunk.replace(STREAM_FAILED, "").replace(STREAM_PENDING, "")
+            parts.append(chunk)
+            yield chunk
+    except LLMNotConfigured as exc:
+        logger.warning("Patient summary stream for %s failed: %s", patient.pk, exc)
+        mark_summary_failed(patient.pk)
+        yield STREAM_FAILED
+        return
+    except GeneratorExit:
+        # The viewer left: finish in the background under the same claim
+        _dispatch(patient.pk)
+        raise
+    finally:
+        chunks.close()
+
+    summary_text = "".join(parts).strip()
+    if summary_text:
+        store_summary(patient.pk, summary_text, fingerprint)
+    else:
+        mark_summary_failed(patient.pk)
+        yield STREAM_FAILED
+
+
+# ----------------- Stored summaries ----------------- #
+
+# Every PatientServiceLog column that baseline_summary() renders
+FINGERPRINT_FIELDS = (
+    "id",
+    "created_at",
+    "department_id",
+    "service_id",
+    "quantity",
+    "unit_price",
+    "total_price",
+)
+
+
+def services_fingerprint(patient) -> str:
+    """
+    Identity of the patient's service history: a hash of the ordered
+    FINGERPRINT_FIELDS tuples, so any add, delete or edit of a log that
+    shows in the summary changes it. Streams one narrow indexed query.
+    """
+    digest = hashlib.sha256()
+    rows = (
+        PatientServiceLog.objects.filter(patient=patient)
+        .order_by("id")
+        .values_list(*FINGERPRINT_FIELDS)
+    )
+    for row in rows.iterator(chunk_size=500):
+        digest.update(repr(row).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def regenerate_patient_summary(patient_id) -> None:
+    """Build and store the summary for a patient (runs in the background)."""
+    summary = PatientSummary.objects.select_related("patient").filter(patient_id=patient_id).first()
+    if summary is None:
+        return
+    fingerprint = services_fingerprint(summary.patient)
+    baseline = baseline_summary(summary.patient)
+    text = baseline
+    if baseline != EMPTY_HISTORY_TEXT:
+        try:
+            text = call_gemini(build_summary_prompt(baseline))
+        except LLMNotConfigured as exc:
+            text = ""
+            logger.warning("Patient summary for %s not generated: %s", patient_id, exc)
+    if not text:
+        # Not stored as READY: the baseline is served until a later view retries
+        mark_summary_failed(patient_id)
+        return
+    store_summary(patient_id, text, fingerprint)
+
+
+def store_summary(patient_id, text, fingerprint) -> None:
+    """Save a finished summary built from the services identified by `fingerprint`."""
+    PatientSummary.objects.filter(patient_id=patient_id).update(
+        text=text,
+        fingerprint=fingerprint,
+        status=PatientSummary.STATUS_READY,
+        generated_at=timezone.now(),
+    )
+    # Services logged while the LLM was working: go round again
+    if services_fingerprint(patient_id) != fingerprint:
+        schedule_summary_refresh(patient_id)
+
+
+def mark_summary_failed(patient_id) -> None:
+    PatientSummary.objects.filter(patient_id=patient_id).update(
+        fingerprint="",
+        status=PatientSummary.STATUS_FAILED,
+        generated_at=timezone.now(),
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _run_in_background(patient_id):
+    try:
+        regenerate_patient_summary(patient_id)
+    except Exception:
+        logger.exception("Patient summary generation failed for %s", patient_id)
+    finally:
+        close_old_connections()
+
+
+def _dispatch(patient_id):
+    global _executor
+    if getattr(settings, "USE_CELERY", False):
+        from .tasks import refresh_patient_summary_task
+        refresh_patient_summary_task.delay(patient_id)
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="patient-summary")
+    _executor.submit(_run_in_background, patient_id)
+
+
+def claim_summary(patient_id) -> bool:
+    """
+    Atomically mark the patient's summary as being generated. Only one
+    caller wins while a generation is in flight (or a failure is recent);
+    a PENDING claim older than PENDING_STALE_SECONDS can be taken over.
+    """
+    now = timezone.now()
+    summary, created = PatientSummary.objects.get_or_create(
+        patient_id=patient_id,
+        defaults={"status": PatientSummary.STATUS_PENDING, "requested_at": now},
+    )
+    if created:
+        return True
+    stale_before = now - datetime.timedelta(seconds=PENDING_STALE_SECONDS)
+    retry_before = now - datetime.timedelta(seconds=FAILED_RETRY_SECONDS)
+    return bool(
+        PatientSummary.objects
+        .filter(pk=summary.pk)
+        .exclude(status=PatientSummary.STATUS_PENDING, requested_at__gt=stale_before)
+        .exclude(status=PatientSummary.STATUS_FAILED, generated_at__gt=retry_before)
+        .update(status=PatientSummary.STATUS_PENDING, requested_at=now)
+    )
+
+
+def schedule_summary_refresh(patient_id) -> bool:
+    """
+    Queue a background regeneration unless one is already in flight.
+    Returns True if a job was queued.
+    """
+    if not claim_summary(patient_id):
+        return False
+    transaction.on_commit(lambda: _dispatch(patient_id))
+    return True
+
+
+def get_patient_summary(patient, refresh=True):
+    """
+    Summary text for the report page without waiting on the LLM.
+
+    Returns (text, ready). When the stored summary matches the current
+    service fingerprint it is returned as-is; otherwise the deterministic
+    baseline is returned with ready=False and, if refresh is set, a
+    background refresh is queued. Pass refresh=False when the caller
+    streams the summary itself (stream_patient_summary claims and stores it).
+    """
+    fingerprint = services_fingerprint(patient)
+    summary = PatientSummary.objects.filter(patient=patient).first()
+
+    if summary and summary.text and summary.fingerprint == fingerprint:
+        return summary.text, True
+
+    if refresh:
+        schedule_summary_refresh(patient.pk)
+    return baseline_summary(patient), False
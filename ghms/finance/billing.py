@@ -0,0 +1,158 @@
+"""
+Billing engine: turns unbilled PatientServiceLog rows into invoices.
+
+All billing goes through generate_invoices() so the per-patient finance
+queue, the nightly batch (`manage.py run_billing`) and the Celery task share
+one code path:
+
+- unbilled logs are read with a compact values() projection,
+- grouped per patient in Python,
+- invoices and InvoiceLine rows are written with bulk_create,
+- the logs are flagged billed=True with a single UPDATE per batch,
+- the billed amounts are moved out of the reports' unbilled totals.
+
+Reruns are idempotent: only billed=False logs are selected, and
+InvoiceLine.service_log is one-to-one so a log can never be billed twice.
+"""
+import datetime
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from reports.summary import record_billed
+from workflow.models import PatientServiceLog
+from .models import Invoice, InvoiceLine
+
+
+# Patients per transaction in batch runs; keeps memory and lock time bounded.
+BATCH_SIZE = 500
+
+LOG_FIELDS = (
+    "id",
+    "patient_id",
+    "service_id",
+    "department_id",
+    "quantity",
+    "unit_price",
+    "total_price",
+    "created_at",
+)
+
+
+@dataclass
+class BillingResult:
+    invoices: int = 0
+    lines: int = 0
+    total: Decimal = Decimal("0")
+    invoice_ids: list = field(default_factory=list)
+
+    def merge(self, other: "BillingResult") -> None:
+        self.invoices += other.invoices
+        self.lines += other.lines
+        self.total += other.total
+        self.invoice_ids.extend(other.invoice_ids)
+
+
+def unbilled_logs(patients=None, day=None, department=None):
+    """
+    Queryset of unbilled service logs, optionally narrowed to a set of
+    patients (instances or UPIs), a local calendar day and/or a department.
+    """
+    qs = PatientServiceLog.objects.filter(billed=False)
+    if patients is not None:
+        upis = [getattr(p, "pk", p) for p in patients]
+        qs = qs.filter(patient_id__in=upis)
+    if day is not None:
+        start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+        qs = qs.filter(created_at__gte=start, created_at__lt=start + datetime.timedelta(days=1))
+    if department is not None:
+        qs = qs.filter(department=department)
+    return qs
+
+
+@transaction.atomic
+def _bill_rows(rows, created_by=None) -> BillingResult:
+    """
+    Bill already-selected log rows (dicts of LOG_FIELDS).
+    Must run inside the transaction that locked the rows.
+    """
+    result = BillingResult()
+    if not rows:
+        return result
+
+    by_patient = defaultdict(list)
+    for row in rows:
+        by_patient[row["patient_id"]].append(row)
+
+    now = timezone.now()
+    invoices = [
+        Invoice(
+            patient_id=upi,
+            total=sum((r["total_price"] for r in patient_rows), Decimal("0")),
+            status=Invoice.STATUS_PENDING,
+            created_at=now,
+            created_by=created_by,
+        )
+        for upi, patient_rows in by_patient.items()
+    ]
+    # Postgres and SQLite >= 3.35 return primary keys from bulk inserts.
+    Invoice.objects.bulk_create(invoices)
+
+    lines = []
+    for inv in invoices:
+        for r in by_patient[inv.patient_id]:
+            lines.append(InvoiceLine(
+                invoice_id=inv.pk,
+                service_log_id=r["id"],
+                service_id=r["service_id"],
+                department_id=r["department_id"],
+                quantity=r["quantity"],
+                unit_price=r["unit_price"],
+                total_price=r["total_price"],
+            ))
+    InvoiceLine.objects.bulk_create(lines)
+
+    PatientServiceLog.objects.filter(
+        id__in=[r["id"] for r in rows],
+    ).update(billed=True)
+    # update() skips post_save, so tell the summary tables directly
+    record_billed(rows)
+
+    result.invoices = len(invoices)
+    result.lines = len(lines)
+    result.total = sum((inv.total for inv in invoices), Decimal("0"))
+    result.invoice_ids = [inv.pk for inv in invoices]
+    return result
+
+
+def generate_invoices(patients=None, day=None, department=None, created_by=None,
+                      batch_size=BATCH_SIZE) -> BillingResult:
+    """
+    Create one invoice per patient covering all of their unbilled logs
+    matching the filters. Safe to call repeatedly: already billed logs
+    are skipped.
+    """
+    result = BillingResult()
+    base = unbilled_logs(patients=patients, day=day, department=department)
+
+    patient_ids = list(
+        base.order_by("patient_id")
+        .values_list("patient_id", flat=True)
+        .distinct()
+    )
+
+    for i in range(0, len(patient_ids), batch_size):
+        chunk = patient_ids[i:i + batch_size]
+        with transaction.atomic():
+            rows = list(
+                base.filter(patient_id__in=chunk)
+                .select_for_update()
+                .order_by("patient_id", "created_at")
+                .values(*LOG_FIELDS)
+            )
+            result.merge(_bill_rows(rows, created_by=created_by))
+
+    return result
@@ -0,0 +1,44 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from finance.billing import generate_invoices
+
+
+class Command(BaseCommand):
+    help = "Generate invoices for unbilled service logs (nightly batch across all departments)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Local day to bill (YYYY-MM-DD). Defaults to yesterday.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Bill every unbilled log regardless of date.",
+        )
+        parser.add_argument(
+            "--patient",
+            action="append",
+            dest="patients",
+            help="Restrict to a patient UPI (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        day = None
+        if not options["all"]:
+            if options["date"]:
+                try:
+                    day = datetime.date.fromisoformat(options["date"])
+                except ValueError:
+                    raise CommandError("--date must be YYYY-MM-DD")
+            else:
+                day = timezone.localdate() - datetime.timedelta(days=1)
+
+        result = generate_invoices(patients=options["patients"], day=day)
+        self.stdout.write(self.style.SUCCESS(
+            f"Billing done ({day or 'all dates'}): "
+            f"{result.invoices} invoices, {result.lines} lines, total {result.total}."
+        ))
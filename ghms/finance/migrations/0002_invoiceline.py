@@ -0,0 +1,29 @@
+# Generated by Django 4.2.15 on 2026-10-19 07:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_remove_staffprofile_role_staffprofile_hospital_and_more'),
+        ('workflow', '0003_alter_patientservicelog_options_and_more'),
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.department')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='finance.invoice')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.serviceitem')),
+                ('service_log', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='invoice_line', to='workflow.patientservicelog')),
+            ],
+        ),
+    ]
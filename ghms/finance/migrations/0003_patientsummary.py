@@ -0,0 +1,27 @@
+# Generated by Django 4.2.15 on 2026-10-19 07:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0001_initial'),
+        ('finance', '0002_invoiceline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(blank=True, max_length=64)),
+                ('text', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Generating'), ('READY', 'Ready')], default='PENDING', max_length=16)),
+                ('requested_at', models.DateTimeField(blank=True, null=True)),
+                ('generated_at', models.DateTimeField(blank=True, null=True)),
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ai_summary', to='patients.patient')),
+            ],
+        ),
+    ]
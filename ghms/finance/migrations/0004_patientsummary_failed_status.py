@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-19 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_patientsummary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patientsummary',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Generating'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='PENDING', max_length=16),
+        ),
+    ]
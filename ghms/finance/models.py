@@ -98,3 +98,70 @@ class Payment(models.Model):
             agg = self.invoice.payments.aggregate(total=models.Sum("amount"))
             self.invoice.amount_paid = agg["total"] or Decimal("0")
             self.invoice.refresh_status(save=True)
+
+
+class InvoiceLine(models.Model):
+    """
+    One billed PatientServiceLog on an invoice.
+    The one-to-one link to the service log keeps billing idempotent:
+    a log can never appear on two invoices.
+    """
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.CASCADE,
+        related_name="lines",
+    )
+    service_log = models.OneToOneField(
+        "workflow.PatientServiceLog",
+        on_delete=models.PROTECT,
+        related_name="invoice_line",
+    )
+    service = models.ForeignKey(
+        "core.ServiceItem",
+        on_delete=models.PROTECT,
+        related_name="+",
+    )
+    department = models.ForeignKey(
+        "core.Department",
+        on_delete=models.PROTECT,
+        related_name="+",
+    )
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"Invoice #{self.invoice_id} line: log #{self.service_log_id} ({self.total_price})"
+
+
+class PatientSummary(models.Model):
+    """
+    Stored AI summary of a patient's service history.
+    `fingerprint` identifies the PatientServiceLog rows it was built from;
+    a mismatch means new services were logged and the text is stale.
+    FAILED means the last LLM call failed; no fingerprint is stored, so
+    the next view retries.
+    """
+    STATUS_PENDING = "PENDING"
+    STATUS_READY = "READY"
+    STATUS_FAILED = "FAILED"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Generating"),
+        (STATUS_READY, "Ready"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    patient = models.OneToOneField(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name="ai_summary",
+    )
+    fingerprint = models.CharField(max_length=64, blank=True)
+    text = models.TextField(blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    requested_at = models.DateTimeField(null=True, blank=True)
+    generated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Summary for {self.patient_id} [{self.status}]"
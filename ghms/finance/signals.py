@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from workflow.models import PatientServiceLog
+from .ai_summary import schedule_summary_refresh
+from .models import PatientSummary
+
+
+@receiver(post_save, sender=PatientServiceLog)
+def refresh_summary_on_new_service(sender, instance, created, **kwargs):
+    """Regenerate a stored AI summary in the background when services are logged."""
+    if created and PatientSummary.objects.filter(patient_id=instance.patient_id).exists():
+        schedule_summary_refresh(instance.patient_id)
@@ -0,0 +1,23 @@
+import datetime
+
+from celery import shared_task
+from django.utils import timezone
+
+from .billing import generate_invoices
+
+
+@shared_task
+def nightly_billing_task(day=None):
+    """Bill yesterday's (or the given ISO day's) unbilled service logs."""
+    if day:
+        day = datetime.date.fromisoformat(day)
+    else:
+        day = timezone.localdate() - datetime.timedelta(days=1)
+    result = generate_invoices(day=day)
+    return {"invoices": result.invoices, "lines": result.lines, "total": str(result.total)}
+
+
+@shared_task
+def refresh_patient_summary_task(patient_id):
+    from .ai_summary import regenerate_patient_summary
+    regenerate_patient_summary(patient_id)
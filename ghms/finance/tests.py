@@ -1,3 +1,256 @@
-from django.test import TestCase
+import datetime
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from ai.llm import LLMRequestFailed
+from core.models import Department, ServiceItem
+from patients.models import Patient
+from workflow.models import PatientServiceLog
+from . import ai_summary, billing
+from .models import Invoice, InvoiceLine, PatientSummary
+
+
+class SummaryTestCase(TestCase):
+    def setUp(self):
+        dept = Department.objects.create(name="Laboratory", code="LAB")
+        service = ServiceItem.objects.create(code="FBC", name="Full blood count", department=dept)
+        self.patient = Patient.objects.create(national_id="12345678", full_name="Jane Doe")
+        PatientServiceLog.objects.create(
+            patient=self.patient, service=service, department=dept,
+            unit_price=500, total_price=500,
+        )
+        self.baseline = ai_summary.baseline_summary(self.patient)
+
+
+class FingerprintTests(SummaryTestCase):
+    def test_edits_that_keep_totals_change_it(self):
+        log = PatientServiceLog.objects.get(patient=self.patient)
+        other_service = ServiceItem.objects.create(code="UEC", name="Electrolytes", department=log.department)
+        before = ai_summary.services_fingerprint(self.patient)
+        self.assertEqual(ai_summary.services_fingerprint(self.patient), before)
+
+        # Same count, max id, quantity and total: only the service differs
+        log.service = other_service
+        log.save()
+        after_service = ai_summary.services_fingerprint(self.patient)
+        self.assertNotEqual(after_service, before)
+
+        log.unit_price = 250
+        log.quantity = 2
+        log.save()
+        self.assertNotEqual(ai_summary.services_fingerprint(self.patient), after_service)
+
+
+@mock.patch("finance.ai_summary._dispatch")
+class RegenerateSummaryTests(SummaryTestCase):
+    def test_success_is_stored_ready(self, dispatch):
+        ai_summary.claim_summary(self.patient.pk)
+        with mock.patch("finance.ai_summary.call_gemini", return_value="AI summary"):
+            ai_summary.regenerate_patient_summary(self.patient.pk)
+
+        self.assertEqual(ai_summary.get_patient_summary(self.patient), ("AI summary", True))
+
+    def test_llm_failure_is_not_cached_as_ready(self, dispatch):
+        ai_summary.claim_summary(self.patient.pk)
+        with mock.patch("finance.ai_summary.call_gemini", side_effect=LLMRequestFailed("503")), \
+                self.assertLogs("finance.ai_summary", "WARNING"):
+            ai_summary.regenerate_patient_summary(self.patient.pk)
+
+        summary = PatientSummary.objects.get(patient=self.patient)
+        self.assertEqual(summary.status, PatientSummary.STATUS_FAILED)
+        self.assertEqual(summary.fingerprint, "")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ai_summary.get_patient_summary(self.patient), (self.baseline, False))
+        # Recent failure: no retry yet
+        dispatch.assert_not_called()
+
+        PatientSummary.objects.filter(pk=summary.pk).update(
+            generated_at=timezone.now() - datetime.timedelta(seconds=ai_summary.FAILED_RETRY_SECONDS + 1),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            ai_summary.get_patient_summary(self.patient)
+        dispatch.assert_called_once_with(self.patient.pk)
+
+    def test_one_claim_while_pending(self, dispatch):
+        self.assertTrue(ai_summary.claim_summary(self.patient.pk))
+        self.assertFalse(ai_summary.claim_summary(self.patient.pk))
+
+
+def _fake_stream(*chunks, error=None):
+    def stream(prompt):
+        yield from chunks
+        if error:
+            raise error
+    return stream
+
+
+@mock.patch("finance.ai_summary._dispatch")
+class StreamSummaryTests(SummaryTestCase):
+    def stream(self, fake):
+        with mock.patch("finance.ai_summary.stream_gemini", side_effect=fake) as stream_gemini:
+            self.stream_gemini = stream_gemini
+            return list(ai_summary.stream_patient_summary(self.patient))
+
+    def test_completed_stream_is_stored(self, dispatch):
+        self.assertEqual(self.stream(_fake_stream("AI ", "summary")), ["AI ", "summary"])
+        self.assertEqual(ai_summary.get_patient_summary(self.patient), ("AI summary", True))
+        # Served from storage afterwards
+        self.assertEqual(self.stream(_fake_stream("unused")), ["AI summary"])
+        self.stream_gemini.assert_not_called()
+
+    def test_failure_midway_is_not_stored(self, dispatch):
+        with self.assertLogs("finance.ai_summary", "WARNING"):
+            chunks = self.stream(_fake_stream("AI ", error=LLMRequestFailed("connection reset")))
+
+        self.assertEqual(chunks, ["AI ", ai_summary.STREAM_FAILED])
+        summary = PatientSummary.objects.get(patient=self.patient)
+        self.assertEqual(summary.status, PatientSummary.STATUS_FAILED)
+        self.assertEqual(ai_summary.get_patient_summary(self.patient, refresh=False), (self.baseline, False))
+
+    def test_failure_before_first_chunk_is_flagged(self, dispatch):
+        with self.assertLogs("finance.ai_summary", "WARNING"):
+            chunks = self.stream(_fake_stream(error=LLMRequestFailed("503")))
+        self.assertEqual(chunks, [ai_summary.STREAM_FAILED])
+
+    def test_empty_model_output_is_flagged(self, dispatch):
+        self.assertEqual(self.stream(_fake_stream("  ")), ["  ", ai_summary.STREAM_FAILED])
+        self.assertEqual(
+            PatientSummary.objects.get(patient=self.patient).status, PatientSummary.STATUS_FAILED,
+        )
+
+    def test_generation_in_flight_returns_pending(self, dispatch):
+        ai_summary.claim_summary(self.patient.pk)
+        fingerprint = ai_summary.services_fingerprint(self.patient)
+
+        self.assertEqual(self.stream(_fake_stream("unused")), [ai_summary.STREAM_PENDING])
+        self.stream_gemini.assert_not_called()
+
+        # The retry gets the stored text once the other worker is done
+        ai_summary.store_summary(self.patient.pk, "Generated elsewhere", fingerprint)
+        self.assertEqual(self.stream(_fake_stream("unused")), ["Generated elsewhere"])
+
+    def test_viewer_leaving_hands_over_to_background(self, dispatch):
+        with mock.patch("finance.ai_summary.stream_gemini", side_effect=_fake_stream("AI ", "summary")):
+            chunks = ai_summary.stream_patient_summary(self.patient)
+            self.assertEqual(next(chunks), "AI ")
+            chunks.close()
+        dispatch.assert_called_once_with(self.patient.pk)
+        self.assertEqual(
+            PatientSummary.objects.get(patient=self.patient).status, PatientSummary.STATUS_PENDING,
+        )
+
+
+class BillingFixtures:
+    def make_logs(self, patients=3, per_patient=2):
+        dept = Department.objects.create(name="Radiology", code="RAD")
+        service = ServiceItem.objects.create(code="XRAY", name="Chest X-ray", department=dept)
+        logs = []
+        for i in range(patients):
+            patient = Patient.objects.create(national_id=f"2000000{i}", full_name=f"Patient {i}")
+            for qty in range(1, per_patient + 1):
+                logs.append(PatientServiceLog.objects.create(
+                    patient=patient, service=service, department=dept,
+                    quantity=qty, unit_price=250, total_price=250 * qty,
+                ))
+        return logs
+
+    def assert_billed_once(self, logs):
+        self.assertEqual(InvoiceLine.objects.count(), len(logs))
+        self.assertEqual(
+            set(InvoiceLine.objects.values_list("service_log_id", flat=True)),
+            {log.pk for log in logs},
+        )
+        self.assertFalse(PatientServiceLog.objects.filter(billed=False).exists())
+
+
+class BillingTests(BillingFixtures, TestCase):
+    def setUp(self):
+        self.logs = self.make_logs()
+
+    def test_one_invoice_per_patient_with_line_totals(self):
+        result = billing.generate_invoices()
+
+        self.assertEqual((result.invoices, result.lines), (3, 6))
+        self.assertEqual(result.total, Decimal("2250"))
+        self.assert_billed_once(self.logs)
+        for invoice in Invoice.objects.filter(pk__in=result.invoice_ids):
+            lines = list(invoice.lines.all())
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(invoice.total, sum(line.total_price for line in lines))
+            self.assertEqual(invoice.status, Invoice.STATUS_PENDING)
+        for line in InvoiceLine.objects.select_related("service_log"):
+            self.assertEqual(
+                (line.quantity, line.unit_price, line.total_price),
+                (line.service_log.quantity, line.service_log.unit_price, line.service_log.total_price),
+            )
+
+    def test_rerun_bills_nothing(self):
+        billing.generate_invoices()
+        again = billing.generate_invoices()
+
+        self.assertEqual((again.invoices, again.lines), (0, 0))
+        self.assertEqual(Invoice.objects.count(), 3)
+        self.assert_billed_once(self.logs)
+
+    def test_only_new_logs_are_billed_on_rerun(self):
+        billing.generate_invoices()
+        log = self.logs[0]
+        extra = PatientServiceLog.objects.create(
+            patient=log.patient, service=log.service, department=log.department,
+            unit_price=100, total_price=100,
+        )
+
+        result = billing.generate_invoices()
+
+        self.assertEqual((result.invoices, result.lines, result.total), (1, 1, Decimal("100")))
+        self.assert_billed_once(self.logs + [extra])
+
+    def test_batches_split_patients(self):
+        with mock.patch("finance.billing._bill_rows", wraps=billing._bill_rows) as bill_rows:
+            result = billing.generate_invoices(batch_size=2)
+
+        self.assertEqual([len(c.args[0]) for c in bill_rows.call_args_list], [4, 2])
+        self.assertEqual((result.invoices, result.lines), (3, 6))
+        self.assertEqual(len(result.invoice_ids), 3)
+        self.assert_billed_once(self.logs)
+
+    def test_log_cannot_be_billed_twice(self):
+        # Two runs that read the same rows before either wrote
+        rows = list(billing.unbilled_logs().values(*billing.LOG_FIELDS))
+        billing._bill_rows(rows)
+
+        with self.assertRaises(IntegrityError):
+            billing._bill_rows(rows)
+
+        self.assertEqual(Invoice.objects.count(), 3)
+        self.assert_billed_once(self.logs)
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentBillingTests(BillingFixtures, TransactionTestCase):
+    def test_concurrent_runs_bill_each_log_once(self):
+        logs = self.make_logs(patients=10)
+        start = threading.Barrier(4)
+        results = []
+
+        def run():
+            try:
+                start.wait()
+                results.append(billing.generate_invoices(batch_size=3))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(sum(r.lines for r in results), len(logs))
+        self.assertEqual(Invoice.objects.count(), 10)
+        self.assert_billed_once(logs)
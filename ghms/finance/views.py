@@ -3,28 +3,31 @@ from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from workflow.models import PatientServiceLog
 from patients.models import Patient
+from .billing import generate_invoices, unbilled_logs
+from .models import Invoice
 
 @login_required
 def finance_queue_for_patient(request, patient_id):
-    patient = get_object_or_404(Patient, id=patient_id)
-
-    services = PatientServiceLog.objects.filter(
-        patient=patient,
-        billed=False
-    ).select_related("service", "department")
-
-    total = services.aggregate(total=Sum("total_price"))["total"] or 0
+    patient = get_object_or_404(Patient, pk=patient_id)
 
     if request.method == "POST":
-        # mark as billed (after payment)
-        services.update(billed=True)
+        # bill every unbilled log for this patient in one invoice
+        result = generate_invoices(patients=[patient], created_by=request.user)
+        invoices = Invoice.objects.filter(id__in=result.invoice_ids)
+        services = PatientServiceLog.objects.filter(
+            invoice_line__invoice__in=invoices
+        ).select_related("service", "department")
         # generate receipt here or redirect to receipt view
         return render(request, "finance/receipt.html", {
             "patient": patient,
             "services": services,
-            "total": total,
+            "invoices": invoices,
+            "total": result.total,
         })
 
+    services = unbilled_logs(patients=[patient]).select_related("service", "department")
+    total = services.aggregate(total=Sum("total_price"))["total"] or 0
+
     return render(request, "finance/summary.html", {
         "patient": patient,
         "services": services,
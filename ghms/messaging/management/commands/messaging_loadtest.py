@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Department, Hospital, StaffProfile
+from messaging.models import Message, Thread
+
+USER_PREFIX = "loadtest-"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_stats(pid):
+    """(cpu seconds, thread count) of a local process, from /proc; None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            threads = next(int(line.split()[1]) for line in f if line.startswith("Threads:"))
+    except (OSError, StopIteration):
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK"), threads
+
+
+async def _request(host, port, method, path, cookie, body=b"", headers=None):
+    """Minimal HTTP/1.1 client (one connection per request). Returns (status, body)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", f"Cookie: {cookie}",
+             "Connection: close", f"Content-Length: {len(body)}"]
+    lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+    try:
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), content
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test for the message long-poll endpoint over HTTP: start the ASGI "
+        "app under uvicorn (or use --url), park N idle long-poll clients, send "
+        "messages through the thread view and report wake-up latency plus the "
+        "server's CPU and thread count while the clients are parked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=50,
+                            help="Distinct conversations the clients are spread over.")
+        parser.add_argument("--messages", type=int, default=20)
+        parser.add_argument("--idle", type=float, default=2.0,
+                            help="Seconds to leave clients parked before sending.")
+        parser.add_argument("--url",
+                            help="Test an already running server (e.g. http://127.0.0.1:8000) "
+                                 "sharing this database, instead of starting uvicorn.")
+
+    def handle(self, *args, **options):
+        n_clients = options["clients"]
+        n_threads = max(1, min(options["threads"], n_clients))
+        sessions, threads = self._fixtures(n_clients, n_threads)
+
+        server = None
+        if options["url"]:
+            url = urlsplit(options["url"])
+            host, port = url.hostname, url.port or 80
+        else:
+            host, port = "127.0.0.1", _free_port()
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "project.asgi:application",
+                 "--host", host, "--port", str(port), "--log-level", "critical",
+                 "--timeout-graceful-shutdown", "2"],
+                cwd=settings.BASE_DIR,
+            )
+        try:
+            result = asyncio.run(self._run(host, port, sessions, threads, options, server))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+        self.stdout.write(self.style.SUCCESS(result))
+
+    def _fixtures(self, n_clients, n_threads):
+        """Users with sessions, spread over threads; reused across runs."""
+        hospital, _ = Hospital.objects.get_or_create(code="LOADTEST", defaults={"name": "Load test"})
+        dept, _ = Department.objects.get_or_create(
+            code="LOADTEST", defaults={"name": "Load test", "hospital": hospital},
+        )
+        sessions = []
+        for i in range(n_clients + n_threads):
+            user, created = User.objects.get_or_create(username=f"{USER_PREFIX}{i}")
+            if created:
+                user.set_unusable_password()
+                user.save()
+            StaffProfile.objects.get_or_create(user=user, defaults={"hospital": hospital, "department": dept})
+            store = SessionStore()
+            store[SESSION_KEY] = str(user.pk)
+            store[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+            store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            store.create()
+            sessions.append((user, store.session_key))
+
+        threads = []
+        senders = sessions[n_clients:]
+        for t, (sender, _) in enumerate(senders):
+            thread = (
+                Thread.objects.filter(hospital=hospital, participants=sender).first()
+                or Thread.objects.create(hospital=hospital)
+            )
+            thread.participants.add(sender, *[u for u, _ in sessions[t:n_clients:n_threads]])
+            threads.append(thread.pk)
+        return sessions, threads
+
+    async def _run(self, host, port, sessions, threads, options, server):
+        n_clients = options["clients"]
+        n_threads = len(threads)
+        cookie_name = settings.SESSION_COOKIE_NAME
+
+        for _ in range(100):
+            try:
+                await _request(host, port, "GET", "/login/", "")
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+        else:
+            raise CommandError(f"No server listening on {host}:{port}.")
+
+        latest = await Message.objects.order_by("-id").values_list("id", flat=True).afirst() or 0
+        sent_at = {}
+        latencies = []
+        parked = asyncio.Semaphore(0)
+
+        async def poller(i):
+            thread_id = threads[i % n_threads]
+            cookie = f"{cookie_name}={sessions[i][1]}"
+            after = latest
+            first = True
+            while True:
+                path = f"/messages/thread/{thread_id}/poll/?{urlencode({'after': after})}"
+                request = asyncio.create_task(_request(host, port, "GET", path, cookie))
+                if first:
+                    parked.release()
+                    first = False
+                status, body = await request
+                if status != 200:
+                    raise CommandError(f"Poll returned HTTP {status}.")
+                received = time.perf_counter()
+                for message in json.loads(body)["messages"]:
+                    after = max(after, message["id"])
+                    if message["body"] in sent_at:
+                        latencies.append(received - sent_at[message["body"]])
+
+        pollers = [asyncio.create_task(poller(i)) for i in range(n_clients)]
+        for _ in range(n_clients):
+            await parked.acquire()
+
+        # Idle phase: every client is parked in the server
+        await asyncio.sleep(options["idle"])
+        before = _proc_stats(server.pid) if server else None
+        await asyncio.sleep(options["idle"])
+        after = _proc_stats(server.pid) if server else None
+
+        csrf = secrets.token_hex(16)
+        for k in range(options["messages"]):
+            t = k % n_threads
+            body = f"loadtest {time.time_ns()} {k}"
+            cookie = f"{cookie_name}={sessions[n_clients + t][1]}; {settings.CSRF_COOKIE_NAME}={csrf}"
+            sent_at[body] = time.perf_counter()
+            status, _ = await _request(
+                host, port, "POST", f"/messages/thread/{threads[t]}/", cookie,
+                body=urlencode({"body": body}).encode(),
+                headers={"Content-Type": "application/x-www-form-urlencoded", "X-CSRFToken": csrf},
+            )
+            if status != 302:
+                raise CommandError(f"Sending a message returned HTTP {status}.")
+            await asyncio.sleep(0.05)
+
+        await asyncio.sleep(1.0)
+        for task in pollers:
+            task.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+
+        if not latencies:
+            raise CommandError("No deliveries observed.")
+        latencies.sort()
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        summary = (
+            f"{n_clients} clients on {n_threads} threads, {options['messages']} messages: "
+            f"{len(latencies)} deliveries, median {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p95 {p95 * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms"
+        )
+        if before and after:
+            summary += (
+                f"; server while idle: {(after[0] - before[0]) * 1000:.0f} ms CPU over "
+                f"{options['idle']:.1f} s, {after[1]} threads"
+            )
+        return summary + "."
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.15 on 2026-10-19 07:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_inbox(apps, schema_editor):
+    Thread = apps.get_model("messaging", "Thread")
+    Message = apps.get_model("messaging", "Message")
+    ThreadMembership = apps.get_model("messaging", "ThreadMembership")
+
+    for thread in Thread.objects.all().iterator():
+        last = Message.objects.filter(thread=thread).order_by("-created_at", "-id").first()
+        if last:
+            thread.last_message_at = last.created_at
+            thread.last_message_preview = last.body[:140]
+            thread.save(update_fields=["last_message_at", "last_message_preview"])
+
+        memberships = []
+        for user_id in thread.participants.values_list("id", flat=True):
+            unread = (
+                Message.objects.filter(thread=thread)
+                .exclude(sender_id=user_id)
+                .exclude(read_by__id=user_id)
+                .count()
+            )
+            memberships.append(ThreadMembership(
+                thread=thread,
+                user_id=user_id,
+                unread_count=unread,
+                last_message_at=thread.last_message_at or thread.created_at,
+            ))
+        ThreadMembership.objects.bulk_create(memberships, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=140),
+        ),
+        migrations.CreateModel(
+            name='ThreadMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_message_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='messaging.thread')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thread_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_message_at', '-id'], name='msg_inbox_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='threadmembership',
+            constraint=models.UniqueConstraint(fields=('thread', 'user'), name='unique_thread_membership'),
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.15 on 2026-10-19 07:34
+
+from django.db import migrations, models
+
+
+def backfill_last_read(apps, schema_editor):
+    ThreadMembership = apps.get_model("messaging", "ThreadMembership")
+    Message = apps.get_model("messaging", "Message")
+
+    # Up-to-date members have read everything currently in the thread.
+    for m in ThreadMembership.objects.filter(unread_count=0).iterator():
+        last = Message.objects.filter(thread_id=m.thread_id).order_by("-id").values_list("id", flat=True).first()
+        if last:
+            m.last_read_message_id = last
+            m.save(update_fields=["last_read_message_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_thread_denormalized_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threadmembership',
+            name='last_read_message_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['thread', 'id'], name='msg_thread_id_idx'),
+        ),
+        migrations.RunPython(backfill_last_read, migrations.RunPython.noop),
+    ]
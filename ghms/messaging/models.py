@@ -1,14 +1,23 @@
 # messaging/models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 from core.models import Hospital
+from .pubsub import get_broker, thread_channel
+
+PREVIEW_LENGTH = 140
+
 
 class Thread(models.Model):
     hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name="threads")
     participants = models.ManyToManyField(User, related_name="message_threads")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized from the newest Message (kept current by Message.save)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
+
     def __str__(self):
         users = ", ".join(self.participants.values_list("username", flat=True))
         return f"Thread({self.hospital.code}): {users}"
@@ -19,10 +28,62 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Legacy per-message receipts, no longer written: read state is
+    # ThreadMembership.last_read_message_id.
     read_by = models.ManyToManyField(User, related_name="read_messages", blank=True)
 
     class Meta:
         ordering = ("created_at",)
+        indexes = [
+            # Keyset history pages and "after id" polling within a thread
+            models.Index(fields=["thread", "id"], name="msg_thread_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.body[:40]}"
+
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        super().save(*args, **kwargs)
+        if is_new:
+            Thread.objects.filter(pk=self.thread_id).update(
+                last_message_at=self.created_at,
+                last_message_preview=self.body[:PREVIEW_LENGTH],
+            )
+            memberships = ThreadMembership.objects.filter(thread_id=self.thread_id)
+            memberships.update(last_message_at=self.created_at)
+            memberships.exclude(user_id=self.sender_id).update(
+                unread_count=models.F("unread_count") + 1,
+            )
+            # Wake long-poll subscribers once the row is visible to them
+            channel = thread_channel(self.thread_id)
+            transaction.on_commit(lambda: get_broker().publish(channel, str(self.pk)))
+
+
+class ThreadMembership(models.Model):
+    """
+    Per-participant view of a thread: unread counter plus a copy of
+    Thread.last_message_at so the inbox is one indexed query on
+    (user, last_message_at). Rows are created whenever a user is added
+    to Thread.participants (see messaging.signals).
+    """
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="memberships")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="thread_memberships")
+    unread_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(default=timezone.now)
+    # High-water mark: every message in the thread with id <= this is read
+    last_read_message_id = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["thread", "user"],
+                name="unique_thread_membership",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["user", "-last_message_at", "-id"], name="msg_inbox_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in thread #{self.thread_id} ({self.unread_count} unread)"
@@ -0,0 +1,237 @@
+"""
+Lightweight pub/sub used to wake long-poll requests when a message is sent.
+
+Only a "something changed on this channel" signal is published; the
+waiting request then reads the new rows from the database itself.
+
+Backends (settings.MESSAGING_BROKER):
+- "memory" (default): per-process condition variables. Fine for a single
+  runserver / gunicorn worker.
+- "redis": Redis PUBLISH/SUBSCRIBE so every worker sees every message.
+  Each process holds one pattern subscription, read by a background
+  thread and fanned out to local waiters, so a waiting request costs no
+  Redis connection of its own. Uses settings.MESSAGING_REDIS_URL (falls
+  back to CELERY_BROKER_URL).
+
+Usage:
+
+    with get_broker().subscribe(channel) as sub:
+        ...check the database...
+        sub.wait(timeout)               # True if something was published
+        await sub.wait_async(timeout)   # same, from an async view
+
+Subscribing before the database check closes the race where a message
+lands between the check and the wait.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "ghms:thread:"
+# Seconds a new subscriber waits for the Redis listener to be subscribed,
+# and between listener reconnect attempts.
+REDIS_READY_TIMEOUT = 1.0
+REDIS_RECONNECT_SECONDS = 1.0
+
+
+class BrokerNotConfigured(Exception):
+    """Raised when the configured broker backend cannot be used."""
+    pass
+
+
+def thread_channel(thread_id) -> str:
+    return f"{CHANNEL_PREFIX}{thread_id}"
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class _MemorySubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+
+    def __enter__(self):
+        self.cond, self.start_seq = self.broker._attach(self.channel)
+        return self
+
+    def __exit__(self, *exc):
+        self.broker._detach(self.channel)
+        return False
+
+    def _published(self):
+        return self.broker._seq[self.channel] != self.start_seq
+
+    def wait(self, timeout: float) -> bool:
+        with self.cond:
+            return self.cond.wait_for(self._published, timeout)
+
+    async def wait_async(self, timeout: float) -> bool:
+        """wait() for async views: parks a future instead of a thread."""
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self.cond:
+            if self._published():
+                return True
+            self.broker._futures[self.channel].add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.cond:
+                self.broker._futures[self.channel].discard(waiter)
+
+
+class InProcessBroker:
+    """
+    One Condition per channel, created on first subscriber and dropped
+    with the last one. Idle subscribers sleep in wait() (or on a future in
+    wait_async()) and cost no CPU or database work; publish() wakes only
+    the channel's waiters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conds = {}
+        self._refs = defaultdict(int)
+        self._seq = defaultdict(int)
+        self._futures = defaultdict(set)
+
+    def _attach(self, channel):
+        with self._lock:
+            cond = self._conds.get(channel)
+            if cond is None:
+                cond = self._conds[channel] = threading.Condition(self._lock)
+            self._refs[channel] += 1
+            return cond, self._seq[channel]
+
+    def _detach(self, channel):
+        with self._lock:
+            self._refs[channel] -= 1
+            if self._refs[channel] <= 0:
+                self._refs.pop(channel, None)
+                self._conds.pop(channel, None)
+                self._seq.pop(channel, None)
+                self._futures.pop(channel, None)
+
+    def subscribe(self, channel):
+        return _MemorySubscription(self, channel)
+
+    def publish(self, channel, payload=""):
+        with self._lock:
+            self._wake(channel)
+
+    def wake_all(self):
+        """Wake every waiter, e.g. after messages may have been missed."""
+        with self._lock:
+            for channel in list(self._conds):
+                self._wake(channel)
+
+    def _wake(self, channel):
+        cond = self._conds.get(channel)
+        if cond is None:
+            return
+        self._seq[channel] += 1
+        cond.notify_all()
+        for loop, future in self._futures.get(channel, ()):
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def subscriber_count(self, channel=None) -> int:
+        with self._lock:
+            if channel is None:
+                return sum(self._refs.values())
+            return self._refs.get(channel, 0)
+
+
+class RedisBroker:
+    """
+    PUBLISH goes straight to Redis. Receiving is shared: one daemon thread
+    per process holds a PSUBSCRIBE on every thread channel and republishes
+    into an InProcessBroker, which is what subscribe() hands out.
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise BrokerNotConfigured("redis package is not installed.")
+        self.client = redis.Redis.from_url(url)
+        self._local = InProcessBroker()
+        self._ready = threading.Event()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._listener is None:
+            with self._listener_lock:
+                if self._listener is None:
+                    self._listener = threading.Thread(
+                        target=self._listen, name="ghms-messaging-pubsub", daemon=True,
+                    )
+                    self._listener.start()
+        # Subscribed before the caller's database check, as with "memory"
+        if not self._ready.wait(REDIS_READY_TIMEOUT):
+            logger.warning("Messaging pub/sub listener is not subscribed; waiters will time out.")
+
+    def _listen(self):
+        import redis
+
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                for message in pubsub.listen():
+                    if message["type"] == "psubscribe":
+                        self._ready.set()
+                    elif message["type"] == "pmessage":
+                        channel = message["channel"]
+                        if isinstance(channel, bytes):
+                            channel = channel.decode()
+                        self._local.publish(channel)
+            except redis.RedisError as exc:
+                logger.warning("Messaging pub/sub connection lost: %s", exc)
+            finally:
+                self._ready.clear()
+                pubsub.close()
+                # Messages may have been missed: let every waiter re-check
+                self._local.wake_all()
+            time.sleep(REDIS_RECONNECT_SECONDS)
+
+    def subscribe(self, channel):
+        self._ensure_listener()
+        return self._local.subscribe(channel)
+
+    def publish(self, channel, payload=""):
+        self.client.publish(channel, payload)
+
+    def subscriber_count(self, channel=None) -> int:
+        return self._local.subscriber_count(channel)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Process-wide broker chosen from settings on first use."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                kind = getattr(settings, "MESSAGING_BROKER", "memory")
+                if kind == "redis":
+                    url = getattr(settings, "MESSAGING_REDIS_URL", "") or settings.CELERY_BROKER_URL
+                    _broker = RedisBroker(url)
+                else:
+                    _broker = InProcessBroker()
+    return _broker
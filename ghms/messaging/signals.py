@@ -0,0 +1,38 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Thread, ThreadMembership
+
+
+@receiver(m2m_changed, sender=Thread.participants.through)
+def sync_thread_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep ThreadMembership rows in step with Thread.participants.
+    Handles both thread.participants.add(...) and user.message_threads.add(...).
+    """
+    if action not in ("post_add", "post_remove") or not pk_set:
+        return
+
+    if reverse:
+        pairs = [(thread_id, instance.pk) for thread_id in pk_set]
+    else:
+        pairs = [(instance.pk, user_id) for user_id in pk_set]
+
+    if action == "post_remove":
+        for thread_id, user_id in pairs:
+            ThreadMembership.objects.filter(thread_id=thread_id, user_id=user_id).delete()
+        return
+
+    last_at = dict(
+        Thread.objects.filter(pk__in={t for t, _ in pairs})
+        .values_list("pk", "last_message_at")
+    )
+    now = timezone.now()
+    ThreadMembership.objects.bulk_create(
+        [
+            ThreadMembership(thread_id=t, user_id=u, last_message_at=last_at.get(t) or now)
+            for t, u in pairs
+        ],
+        ignore_conflicts=True,
+    )
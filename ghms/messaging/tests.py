@@ -1,3 +1,95 @@
-from django.test import TestCase
+import asyncio
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Department, Hospital, StaffProfile
+from .models import Message, Thread, ThreadMembership
+from .pubsub import get_broker, thread_channel
+from .utils import mark_thread_read
+
+
+@override_settings(MESSAGING_POLL_TIMEOUT=2)
+class ThreadPollTests(TestCase):
+    def setUp(self):
+        hospital = Hospital.objects.create(name="General", code="GEN")
+        dept = Department.objects.create(name="Outpatient", code="OPD", hospital=hospital)
+        self.alice, self.bob, self.carol = (
+            User.objects.create_user(name, password="x") for name in ("alice", "bob", "carol")
+        )
+        for user in (self.alice, self.bob, self.carol):
+            StaffProfile.objects.create(user=user, hospital=hospital, department=dept)
+        self.thread = Thread.objects.create(hospital=hospital)
+        self.thread.participants.add(self.alice, self.bob)
+        self.url = reverse("msg_thread_poll", args=[self.thread.id])
+
+    def test_returns_new_messages_immediately(self):
+        first = Message.objects.create(thread=self.thread, sender=self.bob, body="one")
+        second = Message.objects.create(thread=self.thread, sender=self.bob, body="two")
+        self.client.force_login(self.alice)
+
+        res = self.client.get(self.url, {"after": first.id})
+
+        self.assertEqual([m["body"] for m in res.json()["messages"]], ["two"])
+        membership = ThreadMembership.objects.get(thread=self.thread, user=self.alice)
+        self.assertEqual(membership.last_read_message_id, second.id)
+
+    async def test_wakes_on_publish(self):
+        await sync_to_async(self.client.force_login)(self.alice)
+        self.async_client.cookies = self.client.cookies
+        poll = asyncio.ensure_future(self.async_client.get(self.url, {"after": 0}))
+        await asyncio.sleep(0.2)
+        self.assertFalse(poll.done())
+
+        await Message.objects.acreate(thread=self.thread, sender=self.bob, body="hello")
+        get_broker().publish(thread_channel(self.thread.id))
+        res = await asyncio.wait_for(poll, 1)
+
+        self.assertEqual([m["body"] for m in res.json()["messages"]], ["hello"])
+
+    def test_times_out_empty(self):
+        self.client.force_login(self.alice)
+        with self.settings(MESSAGING_POLL_TIMEOUT=0.1):
+            res = self.client.get(self.url)
+        self.assertEqual(res.json(), {"messages": []})
+
+    def test_participants_only(self):
+        self.client.force_login(self.carol)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class ReadStateTests(TestCase):
+    def setUp(self):
+        hospital = Hospital.objects.create(name="General", code="GEN")
+        dept = Department.objects.create(name="Outpatient", code="OPD", hospital=hospital)
+        self.alice = User.objects.create_user("alice", password="x")
+        self.bob = User.objects.create_user("bob", password="x")
+        for user in (self.alice, self.bob):
+            StaffProfile.objects.create(user=user, hospital=hospital, department=dept)
+        self.thread = Thread.objects.create(hospital=hospital)
+        self.thread.participants.add(self.alice, self.bob)
+
+    def membership(self, user):
+        return ThreadMembership.objects.get(thread=self.thread, user=user)
+
+    def test_high_water_mark_is_the_read_state(self):
+        sent = [Message.objects.create(thread=self.thread, sender=self.alice, body=str(i)) for i in range(3)]
+        self.assertEqual(self.membership(self.bob).unread_count, 3)
+
+        mark_thread_read(self.thread, self.bob, up_to_id=sent[1].id)
+        bob = self.membership(self.bob)
+        self.assertEqual((bob.last_read_message_id, bob.unread_count), (sent[1].id, 1))
+        self.assertFalse(Message.read_by.through.objects.exists())
+
+        # Never moves backwards
+        mark_thread_read(self.thread, self.bob, up_to_id=sent[0].id)
+        self.assertEqual(self.membership(self.bob).last_read_message_id, sent[1].id)
+
+        self.client.force_login(self.alice)
+        res = self.client.get(reverse("msg_thread", args=[self.thread.id]))
+        seen = {m.body: m.seen_by for m in res.context["messages_page"]}
+        self.assertEqual(seen, {"0": ["bob"], "1": ["bob"], "2": []})
@@ -6,5 +6,7 @@ urlpatterns = [
     path("", views.inbox, name="msg_inbox"),
     path("compose/", views.message_compose, name="msg_compose"),
     path("thread/<int:thread_id>/", views.thread_detail, name="msg_thread"),
+    path("thread/<int:thread_id>/poll/", views.thread_poll, name="msg_thread_poll"),
+    path("thread/<int:thread_id>/older/", views.thread_older, name="msg_thread_older"),
     path("start/<int:user_id>/", views.start_thread, name="msg_start"),
 ]
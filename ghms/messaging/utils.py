@@ -1,22 +1,47 @@
 # messages/utils.py
-from django.utils import timezone
-from daas.models import DaasShiftSummary
+from django.db.models import Count, Subquery
+from django.db.models.functions import Coalesce
+
+from daas.logic import latest_shift, shift_status
+from .models import Message, ThreadMembership
 
 def get_shift_status(user):
-    shift = (
-        DaasShiftSummary.objects
-        .filter(user=user)
-        .order_by("-shift_start")
-        .first()
-    )
-    now = timezone.now()
-    if not shift:
-        return "off"
+    return shift_status(latest_shift(user))
 
-    if shift.shift_start <= now <= shift.shift_end:
-        return "on"
 
-    if now < shift.shift_start:
-        return "scheduled"
+def mark_thread_read(thread, user, up_to_id=None):
+    """
+    Mark every message in the thread with id <= up_to_id (default: the
+    newest message) as read by the user.
 
-    return "off"
+    Read state is the membership's last_read_message_id high-water mark
+    (a message is read when its id <= the mark), so this is a single
+    conditional UPDATE with an indexed COUNT subquery for unread_count,
+    however many messages it covers. No-op when the user has already read that far.
+    """
+    if up_to_id is None:
+        up_to_id = (
+            Message.objects.filter(thread=thread)
+            .order_by("-id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if up_to_id is None:
+            return
+
+    others = Message.objects.filter(thread=thread).exclude(sender=user)
+    # Conditional update so a concurrent, further-ahead mark is never undone
+    ThreadMembership.objects.filter(
+        thread=thread,
+        user=user,
+        last_read_message_id__lt=up_to_id,
+    ).update(
+        last_read_message_id=up_to_id,
+        unread_count=Coalesce(Subquery(
+            others.filter(id__gt=up_to_id)
+            .order_by()
+            .values("thread")
+            .annotate(n=Count("id"))
+            .values("n")
+        ), 0),
+    )
@@ -2,34 +2,72 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Max
-from .models import Thread, Message
+from django.db.models import Q
+from .models import Thread, Message, ThreadMembership
 from core.models import StaffProfile
 from audit.utils import log as hashchain_log
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
-from .utils import get_shift_status
+from .utils import mark_thread_read
+from daas.logic import shift_statuses
+from .pubsub import get_broker, thread_channel
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import connection
+from django.http import Http404, JsonResponse
 from django.contrib import messages
 from django.utils import timezone
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+import datetime
 
 
 
 User = get_user_model()
 
+INBOX_PAGE_SIZE = 30
+
+
 @login_required
 def inbox(request):
     """
     Show conversation threads the current user is part of,
     ordered by last message.
+
+    Reads ThreadMembership (denormalized last_message_at + unread_count)
+    with keyset pagination on (last_message_at, id), so each page is one
+    indexed query however many threads the user has.
     """
-    threads = (
-        Thread.objects.filter(participants=request.user)
-        .annotate(last_message_at=Max("messages__created_at"))
-        .order_by("-last_message_at")
+    memberships = ThreadMembership.objects.filter(user=request.user)
+
+    cursor = request.GET.get("cursor", "")
+    if "|" in cursor:
+        ts_str, id_str = cursor.rsplit("|", 1)
+        try:
+            ts = datetime.datetime.fromisoformat(ts_str)
+            last_id = int(id_str)
+        except ValueError:
+            pass
+        else:
+            memberships = memberships.filter(
+                Q(last_message_at__lt=ts) | Q(last_message_at=ts, id__lt=last_id)
+            )
+
+    page = list(
+        memberships
+        .select_related("thread")
+        .prefetch_related("thread__participants")
+        .order_by("-last_message_at", "-id")[:INBOX_PAGE_SIZE + 1]
     )
+    next_cursor = ""
+    if len(page) > INBOX_PAGE_SIZE:
+        page = page[:INBOX_PAGE_SIZE]
+        last = page[-1]
+        next_cursor = f"{last.last_message_at.isoformat()}|{last.id}"
 
     return render(request, "messaging/inbox.html", {
-        "threads": threads,
+        "memberships": page,
+        "next_query": urlencode({"cursor": next_cursor}) if next_cursor else "",
     })
 
 @login_required
@@ -43,13 +81,143 @@ def thread_detail(request, thread_id):
         body = request.POST.get("body", "").strip()
         if body:
             msg = Message.objects.create(thread=thread, sender=request.user, body=body)
-            hashchain_log("MSG_SENT", {
-                "thread_id": thread.id,
-                "sender_id": request.user.id,
-            }, actor=request.user)
+            hashchain_log(
+                request.user,
+                "MSG_SENT",
+                object_type="Message",
+                object_id=str(msg.id),
+                meta={"thread_id": thread.id, "sender_id": request.user.id},
+            )
         return redirect("msg_thread", thread_id=thread.id)
 
-    return render(request, "messaging/thread.html", {"thread": thread})
+    messages_page, has_older = _history_page(thread, request.GET.get("before"))
+    if messages_page and not request.GET.get("before"):
+        mark_thread_read(thread, request.user, up_to_id=messages_page[-1].id)
+
+    return render(request, "messaging/thread.html", {
+        "thread": thread,
+        "messages_page": messages_page,
+        "has_older": has_older,
+    })
+
+
+@login_required
+def thread_older(request, thread_id):
+    """Partial: the page of messages just before ?before=<id>, for "load older"."""
+    thread = get_object_or_404(
+        Thread.objects.filter(participants=request.user),
+        id=thread_id,
+    )
+    messages_page, has_older = _history_page(thread, request.GET.get("before"))
+    return render(request, "messaging/_message_rows.html", {
+        "thread": thread,
+        "messages_page": messages_page,
+        "has_older": has_older,
+    })
+
+
+THREAD_PAGE_SIZE = 50
+
+
+def _history_page(thread, before=None):
+    """
+    One keyset page of a thread's history: the newest THREAD_PAGE_SIZE
+    messages with id < before, returned oldest-first, plus whether older
+    messages exist. Senders are joined, and each message's `seen_by`
+    (usernames) comes from the participants' last_read_message_id
+    high-water marks, so cost does not grow with thread length.
+    """
+    qs = thread.messages.all()
+    try:
+        qs = qs.filter(id__lt=int(before)) if before else qs
+    except ValueError:
+        pass
+
+    page = list(
+        qs.select_related("sender")
+        .order_by("-id")[:THREAD_PAGE_SIZE + 1]
+    )
+    has_older = len(page) > THREAD_PAGE_SIZE
+    page = page[:THREAD_PAGE_SIZE]
+    page.reverse()
+
+    read_marks = list(
+        ThreadMembership.objects.filter(thread=thread)
+        .values_list("user_id", "user__username", "last_read_message_id")
+    )
+    for m in page:
+        m.seen_by = [
+            username for user_id, username, last_read in read_marks
+            if user_id != m.sender_id and last_read >= m.id
+        ]
+    return page, has_older
+
+
+# Most messages one poll response carries; a client that is further
+# behind gets the rest on its next (immediate) poll.
+POLL_PAGE_SIZE = 100
+
+
+async def _message_payload(qs):
+    return [
+        {
+            "id": m["id"],
+            "sender": m["sender__username"],
+            "body": m["body"],
+            "created_at": m["created_at"].isoformat(),
+        }
+        async for m in qs.order_by("id").values("id", "sender__username", "body", "created_at")[:POLL_PAGE_SIZE]
+    ]
+
+
+def _authenticated_user(request):
+    user = request.user
+    return user if user.is_authenticated else None
+
+
+def _release_connection():
+    # Don't hold a database connection for the whole wait
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+async def thread_poll(request, thread_id):
+    """
+    Long-poll endpoint: GET ?after=<message id>.
+
+    Returns new messages immediately if there are any; otherwise the
+    request sleeps on the pub/sub channel (no database polling) until a
+    message is sent or MESSAGING_POLL_TIMEOUT elapses, then returns
+    whatever is new (possibly an empty list), oldest first and at most
+    POLL_PAGE_SIZE messages.
+
+    An async view: under ASGI (project.asgi) a waiting poll is a parked
+    future, not a worker thread, and its database connection is closed
+    for the wait.
+    """
+    user = await sync_to_async(_authenticated_user)(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+    if not await Thread.objects.filter(participants=user, id=thread_id).aexists():
+        raise Http404("No Thread matches the given query.")
+    try:
+        after = int(request.GET.get("after", 0))
+    except ValueError:
+        after = 0
+
+    new_messages = Message.objects.filter(thread_id=thread_id, id__gt=after)
+    timeout = getattr(settings, "MESSAGING_POLL_TIMEOUT", 25)
+
+    with get_broker().subscribe(thread_channel(thread_id)) as sub:
+        payload = await _message_payload(new_messages)
+        if not payload:
+            await sync_to_async(_release_connection)()
+            if await sub.wait_async(timeout):
+                payload = await _message_payload(new_messages)
+
+    if payload:
+        await sync_to_async(mark_thread_read)(thread_id, user, up_to_id=payload[-1]["id"])
+    return JsonResponse({"messages": payload})
 
 
 @login_required
@@ -143,18 +311,24 @@ def message_compose(request):
                 thread = Thread.objects.create()
                 thread.participants.add(request.user, recipient)
 
-            Message.objects.create(
+            msg = Message.objects.create(
                 thread=thread,
                 sender=request.user,
                 body=body,
             )
 
-            hashchain_log("MSG_SENT", {
-                "thread_id": thread.id,
-                "sender_id": request.user.id,
-                "recipient_id": recipient.id,
-                "ts": timezone.now().isoformat(),
-            }, actor=request.user)
+            hashchain_log(
+                request.user,
+                "MSG_SENT",
+                object_type="Message",
+                object_id=str(msg.id),
+                meta={
+                    "thread_id": thread.id,
+                    "sender_id": request.user.id,
+                    "recipient_id": recipient.id,
+                    "ts": timezone.now().isoformat(),
+                },
+            )
 
             return redirect("msg_thread", thread_id=thread.id)
 
@@ -188,13 +362,13 @@ def message_compose(request):
         elif my_dept:
             recipients_qs = recipients_qs.filter(staffprofile__department=my_dept)
 
-        for u in recipients_qs:
-            # Only list people who actually have a staffprofile
-            if not hasattr(u, "staffprofile"):
-                continue
+        # Only list people who actually have a staffprofile
+        users = [u for u in recipients_qs if hasattr(u, "staffprofile")]
+        statuses = shift_statuses(users)
+        for u in users:
             annotated.append({
                 "user": u,
-                "shift_status": get_shift_status(u),
+                "shift_status": statuses.get(u.pk, "off"),
             })
 
     return render(request, "messaging/compose.html", {
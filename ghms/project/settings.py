@@ -37,7 +37,8 @@ INSTALLED_APPS = [
     "api",
     "drf_spectacular",
     "messaging",
-    "finance"
+    "finance",
+    "reports",
 ]
 
 MIDDLEWARE = [
@@ -64,6 +65,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "reports.context_processors.reports_nav",
             ],
         },
     },
@@ -135,13 +137,37 @@ OIDC_OP_TOKEN_ENDPOINT = os.getenv("OIDC_OP_TOKEN_ENDPOINT", "")
 OIDC_OP_USER_ENDPOINT = os.getenv("OIDC_OP_USER_ENDPOINT", "")
 OIDC_RP_SCOPES = "openid email profile"
 
+# Messaging push channel: "memory" (single process) or "redis" (multi-worker)
+MESSAGING_BROKER = os.getenv("MESSAGING_BROKER", "memory")
+MESSAGING_REDIS_URL = os.getenv("MESSAGING_REDIS_URL", "")
+MESSAGING_POLL_TIMEOUT = int(os.getenv("MESSAGING_POLL_TIMEOUT", "25"))
+
 # Cache (swap to Redis in prod)
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    }
+    },
+    # LLM response cache (prompt hash -> text); set LLM_CACHE_DIR to persist on disk
+    "llm": {
+        "BACKEND": (
+            "django.core.cache.backends.filebased.FileBasedCache"
+            if os.getenv("LLM_CACHE_DIR")
+            else "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("LLM_CACHE_DIR", "llm-responses"),
+        "TIMEOUT": int(os.getenv("LLM_CACHE_TTL", str(24 * 3600))),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))},
+    },
 }
 
+# LLM (Gemini) — shared client in ai/llm.py
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+
 # OTP / SMS
 OTP_EXPIRY_SECONDS = 300
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
@@ -24,6 +24,7 @@ urlpatterns = [
     
     path("find-patient/", uiv.find_patient, name="find_patient"),
     path("attended-today/", uiv.attended_today, name="attended_today"),
+    path("attended-today/rows/", uiv.attended_today_rows, name="attended_today_rows"),
     path("my-profile/", uiv.my_profile, name="my_profile"),
 
     # ...
@@ -36,6 +37,8 @@ urlpatterns = [
     path("audit/", include("audit.urls")),
     #messaging
     path("messages/", include("messaging.urls")),
+    #reports
+    path("reports/", include("reports.urls")),
     #register patient
     path("department/register-patient/", ui_views.register_patient, name="register_patient"),
     #refer patient
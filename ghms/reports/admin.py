@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import DailyPaymentSummary, DailyServiceSummary
+
+
+@admin.register(DailyServiceSummary)
+class DailyServiceSummaryAdmin(admin.ModelAdmin):
+    list_display = ("day", "department", "service", "count", "quantity", "revenue", "unbilled_amount")
+    list_filter = ("department", "day")
+
+
+@admin.register(DailyPaymentSummary)
+class DailyPaymentSummaryAdmin(admin.ModelAdmin):
+    list_display = ("day", "method", "count", "amount")
+    list_filter = ("method", "day")
@@ -0,0 +1,11 @@
+from functools import partial
+
+from .views import can_view_reports
+
+
+def reports_nav(request):
+    """`can_view_reports` for the nav; only queried when a template uses it."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {"can_view_reports": False}
+    return {"can_view_reports": partial(can_view_reports, user)}
@@ -0,0 +1,42 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reports.summary import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild daily summary tables from the source rows. Writes keep them "
+        "current; this repairs drift from bulk updates that skip signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="start",
+            help="First day to rebuild (YYYY-MM-DD). Defaults to yesterday.",
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            help="Last day to rebuild (YYYY-MM-DD). Defaults to --from, or today.",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        try:
+            if options["start"]:
+                start = datetime.date.fromisoformat(options["start"])
+                end = datetime.date.fromisoformat(options["end"] or options["start"])
+            else:
+                start = today - datetime.timedelta(days=1)
+                end = datetime.date.fromisoformat(options["end"]) if options["end"] else today
+        except ValueError:
+            raise CommandError("--from/--to must be YYYY-MM-DD")
+        if end < start:
+            raise CommandError("--to must not be before --from")
+
+        days = rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days} day(s)."))
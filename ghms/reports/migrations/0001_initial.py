@@ -0,0 +1,63 @@
+# Generated by Django 4.2.15 on 2026-10-19 07:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0004_remove_staffprofile_role_staffprofile_hospital_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPaymentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('method', models.CharField(max_length=16)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('-day', 'method'),
+            },
+        ),
+        migrations.CreateModel(
+            name='SummaryDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('marked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyServiceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unbilled_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='core.department')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='core.serviceitem')),
+            ],
+            options={
+                'ordering': ('-day', 'department', 'service'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailypaymentsummary',
+            constraint=models.UniqueConstraint(fields=('day', 'method'), name='unique_daily_payment_summary'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyservicesummary',
+            constraint=models.UniqueConstraint(fields=('day', 'department', 'service'), name='unique_daily_service_summary'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.15 on 2026-10-19 08:53
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_summaries(apps, schema_editor):
+    """
+    Summarise every existing service log and payment. From here on writes
+    apply their own deltas, so the dirty-day queue is no longer needed.
+    """
+    PatientServiceLog = apps.get_model("workflow", "PatientServiceLog")
+    Payment = apps.get_model("finance", "Payment")
+    DailyServiceSummary = apps.get_model("reports", "DailyServiceSummary")
+    DailyPaymentSummary = apps.get_model("reports", "DailyPaymentSummary")
+    local_day = TruncDate("created_at", tzinfo=timezone.get_current_timezone())
+
+    DailyServiceSummary.objects.all().delete()
+    DailyServiceSummary.objects.bulk_create(
+        [
+            DailyServiceSummary(
+                day=r["local_day"],
+                department_id=r["department_id"],
+                service_id=r["service_id"],
+                count=r["n"],
+                quantity=r["qty"] or 0,
+                revenue=r["revenue"] or Decimal("0"),
+                unbilled_amount=r["unbilled"] or Decimal("0"),
+            )
+            for r in PatientServiceLog.objects.order_by()
+            .values("department_id", "service_id", local_day=local_day)
+            .annotate(
+                n=Count("id"),
+                qty=Sum("quantity"),
+                revenue=Sum("total_price"),
+                unbilled=Sum("total_price", filter=Q(billed=False)),
+            )
+        ],
+        batch_size=1000,
+    )
+
+    DailyPaymentSummary.objects.all().delete()
+    DailyPaymentSummary.objects.bulk_create(
+        [
+            DailyPaymentSummary(
+                day=r["local_day"],
+                method=r["method"],
+                count=r["n"],
+                amount=r["amount"] or Decimal("0"),
+            )
+            for r in Payment.objects.order_by()
+            .values("method", local_day=local_day)
+            .annotate(n=Count("id"), amount=Sum("amount"))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('finance', '0004_patientsummary_failed_status'),
+        ('workflow', '0004_patientservicelog_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='SummaryDirtyDay',
+        ),
+    ]
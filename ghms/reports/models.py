@@ -0,0 +1,58 @@
+from django.db import models
+
+
+class DailyServiceSummary(models.Model):
+    """
+    Per-day, per-department, per-service activity and revenue.
+    Kept current by per-write deltas from reports.summary.
+    """
+    day = models.DateField()
+    department = models.ForeignKey(
+        "core.Department",
+        on_delete=models.CASCADE,
+        related_name="daily_summaries",
+    )
+    service = models.ForeignKey(
+        "core.ServiceItem",
+        on_delete=models.CASCADE,
+        related_name="daily_summaries",
+    )
+    count = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unbilled_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-day", "department", "service")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "department", "service"],
+                name="unique_daily_service_summary",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.department_id}/{self.service_id}: {self.revenue}"
+
+
+class DailyPaymentSummary(models.Model):
+    """Per-day payments received, split by payment method."""
+    day = models.DateField()
+    method = models.CharField(max_length=16)
+    count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-day", "method")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "method"],
+                name="unique_daily_payment_summary",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.method}: {self.amount}"
+
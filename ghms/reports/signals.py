@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from finance.models import Payment
+from workflow.models import PatientServiceLog
+from .summary import PAYMENT_FIELDS, SERVICE_FIELDS, record_payment_change, record_service_change
+
+TRACKED = {
+    PatientServiceLog: (SERVICE_FIELDS, record_service_change),
+    Payment: (PAYMENT_FIELDS, record_payment_change),
+}
+
+
+def _values(instance, fields):
+    return {f: getattr(instance, f) for f in fields}
+
+
+@receiver(pre_save, sender=PatientServiceLog)
+@receiver(pre_save, sender=Payment)
+def remember_summary_values(sender, instance, **kwargs):
+    """Keep the stored values of an edited row so post_save can move them out."""
+    fields, _ = TRACKED[sender]
+    instance._summary_old = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._summary_old = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=PatientServiceLog)
+@receiver(post_save, sender=Payment)
+def apply_summary_delta(sender, instance, **kwargs):
+    """Move the row's old values (on edit) out of the day summaries and its new ones in."""
+    fields, record = TRACKED[sender]
+    record(old=getattr(instance, "_summary_old", None), new=_values(instance, fields))
+    instance._summary_old = None
+
+
+@receiver(post_delete, sender=PatientServiceLog)
+@receiver(post_delete, sender=Payment)
+def remove_summary_delta(sender, instance, **kwargs):
+    fields, record = TRACKED[sender]
+    record(old=_values(instance, fields))
@@ -0,0 +1,218 @@
+"""
+Daily summary tables for dashboards and finance reports.
+
+Source rows (PatientServiceLog, finance.Payment) are never scanned by the
+report views. Instead every write applies its own delta to the summary
+row for its (day, department, service) or (day, method):
+
+- signals add a new row, subtract a deleted one and, for an edit, move
+  the old values out and the new ones in,
+- the billing engine's bulk UPDATE moves billed amounts out of
+  unbilled_amount,
+- the increments are single-row UPDATE ... SET col = col + n statements
+  in the writer's transaction, so concurrent writers to different
+  services never touch the same row and nothing is recomputed.
+
+rebuild() recomputes a date range from the source rows. It backs the
+`refresh_summaries` command and the nightly reconcile task, which repair
+drift from writes that bypass signals (raw SQL, QuerySet.update()).
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from finance.models import Payment
+from workflow.models import PatientServiceLog
+from .models import DailyPaymentSummary, DailyServiceSummary
+
+SERVICE_FIELDS = ("created_at", "department_id", "service_id", "quantity", "total_price", "billed")
+PAYMENT_FIELDS = ("created_at", "method", "amount")
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+def _as_day(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localdate(value)
+    return value
+
+
+def _bump(model, key, deltas):
+    """
+    Add `deltas` ({field: amount}) to the summary row identified by `key`,
+    creating it when this is the first write for that key.
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    updates = {k: F(k) + v for k, v in deltas.items()}
+    if model.objects.filter(**key).update(**updates):
+        if deltas.get("count", 0) < 0:
+            model.objects.filter(**key, count=0).delete()
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**key).update(**updates)
+
+
+def _service_key(values):
+    return {
+        "day": _as_day(values["created_at"]),
+        "department_id": values["department_id"],
+        "service_id": values["service_id"],
+    }
+
+
+def _service_delta(values, sign):
+    """(key, deltas) for one service log, given as a dict of SERVICE_FIELDS."""
+    total = values["total_price"] or Decimal("0")
+    return _service_key(values), {
+        "count": sign,
+        "quantity": sign * (values["quantity"] or 0),
+        "revenue": sign * total,
+        "unbilled_amount": Decimal("0") if values["billed"] else sign * total,
+    }
+
+
+def _payment_delta(values, sign):
+    """(key, deltas) for one payment, given as a dict of PAYMENT_FIELDS."""
+    key = {"day": _as_day(values["created_at"]), "method": values["method"]}
+    return key, {"count": sign, "amount": sign * (values["amount"] or Decimal("0"))}
+
+
+def _apply(model, changes):
+    """Merge (key, deltas) pairs per key, then bump each summary row once."""
+    merged = defaultdict(lambda: defaultdict(int))
+    for key, deltas in changes:
+        for field, value in deltas.items():
+            merged[tuple(sorted(key.items()))][field] += value
+    # Sorted keys: concurrent writers lock summary rows in the same order
+    for key in sorted(merged, key=str):
+        _bump(model, dict(key), merged[key])
+
+
+def record_service_change(old=None, new=None):
+    """Move a service log's old values (if any) out of the summaries and its new ones in."""
+    changes = []
+    if old is not None:
+        changes.append(_service_delta(old, -1))
+    if new is not None:
+        changes.append(_service_delta(new, 1))
+    _apply(DailyServiceSummary, changes)
+
+
+def record_payment_change(old=None, new=None):
+    """Payment counterpart of record_service_change()."""
+    changes = []
+    if old is not None:
+        changes.append(_payment_delta(old, -1))
+    if new is not None:
+        changes.append(_payment_delta(new, 1))
+    _apply(DailyPaymentSummary, changes)
+
+
+def record_billed(rows):
+    """
+    Move just-billed service logs out of unbilled_amount, for writers that
+    flag billed=True with update(). Rows are dicts with created_at,
+    department_id, service_id and total_price.
+    """
+    _apply(DailyServiceSummary, [
+        (_service_key(r), {"unbilled_amount": -(r["total_price"] or Decimal("0"))})
+        for r in rows
+    ])
+
+
+@transaction.atomic
+def rebuild(start, end):
+    """
+    Recompute the service and payment summaries for every local day in
+    [start, end] from the source rows, with one grouped query per table.
+    Returns the number of days covered.
+    """
+    range_start, _ = _day_bounds(start)
+    _, range_end = _day_bounds(end)
+    local_day = TruncDate("created_at", tzinfo=timezone.get_current_timezone())
+
+    service_rows = (
+        PatientServiceLog.objects
+        .filter(created_at__gte=range_start, created_at__lt=range_end)
+        .order_by()
+        .values("department_id", "service_id", local_day=local_day)
+        .annotate(
+            n=Count("id"),
+            qty=Sum("quantity"),
+            revenue=Sum("total_price"),
+            unbilled=Sum("total_price", filter=Q(billed=False)),
+        )
+    )
+    payment_rows = (
+        Payment.objects
+        .filter(created_at__gte=range_start, created_at__lt=range_end)
+        .order_by()
+        .values("method", local_day=local_day)
+        .annotate(n=Count("id"), amount=Sum("amount"))
+    )
+
+    DailyServiceSummary.objects.filter(day__gte=start, day__lte=end).delete()
+    DailyServiceSummary.objects.bulk_create([
+        DailyServiceSummary(
+            day=r["local_day"],
+            department_id=r["department_id"],
+            service_id=r["service_id"],
+            count=r["n"],
+            quantity=r["qty"] or 0,
+            revenue=r["revenue"] or Decimal("0"),
+            unbilled_amount=r["unbilled"] or Decimal("0"),
+        )
+        for r in service_rows
+    ])
+
+    DailyPaymentSummary.objects.filter(day__gte=start, day__lte=end).delete()
+    DailyPaymentSummary.objects.bulk_create([
+        DailyPaymentSummary(
+            day=r["local_day"],
+            method=r["method"],
+            count=r["n"],
+            amount=r["amount"] or Decimal("0"),
+        )
+        for r in payment_rows
+    ])
+    return (end - start).days + 1
+
+
+def service_totals(start, end, department=None):
+    """Totals over [start, end] (inclusive dates) read from the summary table."""
+    qs = DailyServiceSummary.objects.filter(day__gte=start, day__lte=end)
+    if department is not None:
+        qs = qs.filter(department=department)
+    totals = qs.aggregate(
+        count=Sum("count"),
+        quantity=Sum("quantity"),
+        revenue=Sum("revenue"),
+        unbilled=Sum("unbilled_amount"),
+    )
+    return {k: v or 0 for k, v in totals.items()}
+
+
+def payment_totals(start, end):
+    """{method: amount} over [start, end] read from the summary table."""
+    rows = (
+        DailyPaymentSummary.objects
+        .filter(day__gte=start, day__lte=end)
+        .order_by()
+        .values("method")
+        .annotate(amount=Sum("amount"))
+    )
+    return {r["method"]: r["amount"] or Decimal("0") for r in rows}
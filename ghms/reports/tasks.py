@@ -0,0 +1,13 @@
+import datetime
+
+from celery import shared_task
+from django.utils import timezone
+
+from .summary import rebuild
+
+
+@shared_task
+def reconcile_summaries_task(days=2):
+    """Rebuild the last `days` local days (nightly safety net for skipped signals)."""
+    today = timezone.localdate()
+    return rebuild(today - datetime.timedelta(days=days - 1), today)
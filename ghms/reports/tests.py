@@ -0,0 +1,130 @@
+import datetime
+import io
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Department, ServiceItem
+from finance.billing import generate_invoices
+from finance.models import Invoice, Payment
+from patients.models import Patient
+from workflow.models import PatientServiceLog
+from .models import DailyPaymentSummary, DailyServiceSummary
+from .summary import rebuild
+
+
+class SummaryDeltaTests(TestCase):
+    def setUp(self):
+        self.lab = Department.objects.create(name="Laboratory", code="LAB")
+        self.rad = Department.objects.create(name="Radiology", code="RAD")
+        self.fbc = ServiceItem.objects.create(code="FBC", name="Full blood count", department=self.lab)
+        self.xray = ServiceItem.objects.create(code="XRAY", name="Chest X-ray", department=self.rad)
+        self.patient = Patient.objects.create(national_id="12345678", full_name="Jane Doe")
+
+    def log(self, service=None, quantity=1, price=500, **kwargs):
+        service = service or self.fbc
+        return PatientServiceLog.objects.create(
+            patient=self.patient, service=service, department=service.department,
+            quantity=quantity, unit_price=price, total_price=price * quantity, **kwargs,
+        )
+
+    def raw_services(self):
+        totals = defaultdict(lambda: [0, 0, Decimal("0"), Decimal("0")])
+        for log in PatientServiceLog.objects.all():
+            row = totals[(timezone.localdate(log.created_at), log.department_id, log.service_id)]
+            row[0] += 1
+            row[1] += log.quantity
+            row[2] += log.total_price
+            row[3] += Decimal("0") if log.billed else log.total_price
+        return {key: tuple(row) for key, row in totals.items()}
+
+    def summary_services(self):
+        return {
+            (s.day, s.department_id, s.service_id): (s.count, s.quantity, s.revenue, s.unbilled_amount)
+            for s in DailyServiceSummary.objects.all()
+        }
+
+    def raw_payments(self):
+        totals = defaultdict(lambda: [0, Decimal("0")])
+        for payment in Payment.objects.all():
+            row = totals[(timezone.localdate(payment.created_at), payment.method)]
+            row[0] += 1
+            row[1] += payment.amount
+        return {key: tuple(row) for key, row in totals.items()}
+
+    def summary_payments(self):
+        return {(s.day, s.method): (s.count, s.amount) for s in DailyPaymentSummary.objects.all()}
+
+    def assert_matches_raw(self):
+        self.assertEqual(self.summary_services(), self.raw_services())
+        self.assertEqual(self.summary_payments(), self.raw_payments())
+
+    def test_create(self):
+        self.log()
+        self.log(quantity=2)
+        self.log(service=self.xray, price=1500)
+
+        self.assert_matches_raw()
+        self.assertEqual(DailyServiceSummary.objects.count(), 2)
+
+    def test_edit_moves_values_between_rows(self):
+        log = self.log()
+        self.log(service=self.xray, price=1500)
+
+        log.quantity = 3
+        log.total_price = 1500
+        log.save()
+        self.assert_matches_raw()
+
+        log.service = self.xray
+        log.department = self.rad
+        log.created_at = log.created_at - datetime.timedelta(days=2)
+        log.save()
+        self.assert_matches_raw()
+        self.assertFalse(DailyServiceSummary.objects.filter(service=self.fbc).exists())
+
+    def test_delete(self):
+        keep = self.log()
+        gone = self.log(quantity=4)
+
+        gone.delete()
+        self.assert_matches_raw()
+
+        keep.delete()
+        self.assert_matches_raw()
+        self.assertFalse(DailyServiceSummary.objects.exists())
+
+    def test_billing_and_payments(self):
+        self.log()
+        self.log(service=self.xray, price=1500)
+        generate_invoices()
+        self.assert_matches_raw()
+
+        invoice = Invoice.objects.get()
+        cash = Payment.objects.create(invoice=invoice, amount=500, method=Payment.METHOD_CASH)
+        Payment.objects.create(invoice=invoice, amount=1500, method=Payment.METHOD_MPESA)
+        self.assert_matches_raw()
+
+        cash.amount = 400
+        cash.save()
+        self.assert_matches_raw()
+
+        cash.delete()
+        self.assert_matches_raw()
+
+    def test_rebuild_repairs_drift(self):
+        self.log()
+        today = timezone.localdate()
+        # update() skips the signals
+        PatientServiceLog.objects.update(quantity=5)
+        self.assertNotEqual(self.summary_services(), self.raw_services())
+
+        self.assertEqual(rebuild(today, today), 1)
+        self.assert_matches_raw()
+
+        PatientServiceLog.objects.update(total_price=700)
+        call_command("refresh_summaries", stdout=io.StringIO())
+        self.assert_matches_raw()
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path("daily/", views.daily_summary, name="reports_daily_summary"),
+    path("api/summary/", views.summary_json, name="reports_summary_json"),
+]
@@ -0,0 +1,128 @@
+import datetime
+
+from django.contrib.auth.decorators import login_required
+from django.db.models import Sum
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+from .models import DailyServiceSummary
+from .summary import payment_totals, service_totals
+
+
+REPORT_ROLES = {"FINANCE", "ADMIN", "AUDITOR"}
+
+
+def can_view_reports(user):
+    if user.is_superuser:
+        return True
+    sp = getattr(user, "staffprofile", None)
+    if not sp:
+        return False
+    return sp.roles.filter(code__in=REPORT_ROLES).exists()
+
+
+def _parse_range(request):
+    """
+    Read ?start=YYYY-MM-DD&end=YYYY-MM-DD.
+    Defaults to month-to-date; falls back to the default on bad input.
+    """
+    today = timezone.localdate()
+    try:
+        start = datetime.date.fromisoformat(request.GET.get("start", ""))
+    except ValueError:
+        start = today.replace(day=1)
+    try:
+        end = datetime.date.fromisoformat(request.GET.get("end", ""))
+    except ValueError:
+        end = today
+    return start, end
+
+
+def _parse_department(request):
+    """Read ?department=<id>; None when absent. Raises ValueError on a non-integer."""
+    value = request.GET.get("department", "").strip()
+    return int(value) if value else None
+
+
+def _build_report(start, end, department_id=None):
+    # Read-only: writes keep the summary tables current (see reports.summary).
+    by_department = (
+        DailyServiceSummary.objects
+        .filter(day__gte=start, day__lte=end)
+        .order_by("department__name")
+        .values("department_id", "department__name")
+        .annotate(
+            count=Sum("count"),
+            quantity=Sum("quantity"),
+            revenue=Sum("revenue"),
+            unbilled=Sum("unbilled_amount"),
+        )
+    )
+    by_day = (
+        DailyServiceSummary.objects
+        .filter(day__gte=start, day__lte=end)
+        .order_by("day")
+        .values("day")
+        .annotate(count=Sum("count"), revenue=Sum("revenue"))
+    )
+    if department_id is not None:
+        by_department = by_department.filter(department_id=department_id)
+        by_day = by_day.filter(department_id=department_id)
+
+    return {
+        "start": start,
+        "end": end,
+        "totals": service_totals(start, end, department=department_id),
+        "payments": payment_totals(start, end),
+        "by_department": list(by_department),
+        "by_day": list(by_day),
+    }
+
+
+@login_required
+def daily_summary(request):
+    if not can_view_reports(request.user):
+        return render(request, "ui/not_allowed.html", status=403)
+
+    start, end = _parse_range(request)
+    try:
+        department_id = _parse_department(request)
+    except ValueError:
+        return HttpResponseBadRequest("department must be a department id.")
+    ctx = _build_report(start, end, department_id)
+    return render(request, "reports/daily_summary.html", ctx)
+
+
+@login_required
+def summary_json(request):
+    if not can_view_reports(request.user):
+        return JsonResponse({"detail": "Not allowed."}, status=403)
+
+    start, end = _parse_range(request)
+    try:
+        department_id = _parse_department(request)
+    except ValueError:
+        return JsonResponse({"detail": "department must be a department id."}, status=400)
+    report = _build_report(start, end, department_id)
+    return JsonResponse({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "totals": {k: str(v) for k, v in report["totals"].items()},
+        "payments": {k: str(v) for k, v in report["payments"].items()},
+        "by_department": [
+            {
+                "department_id": r["department_id"],
+                "department": r["department__name"],
+                "count": r["count"],
+                "quantity": r["quantity"],
+                "revenue": str(r["revenue"]),
+                "unbilled": str(r["unbilled"]),
+            }
+            for r in report["by_department"]
+        ],
+        "by_day": [
+            {"day": r["day"].isoformat(), "count": r["count"], "revenue": str(r["revenue"])}
+            for r in report["by_day"]
+        ],
+    })
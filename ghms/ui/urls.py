@@ -6,6 +6,8 @@ from ui import views as ui_views
 urlpatterns = [
     path("", views.department_home, name="department_home"),
     path("patient/<str:upi>/", views.patient_detail, name="patient_detail"),
+    path("patient/<str:patient_id>/report/", views.patient_report, name="patient_report"),
+    path("patient/<str:patient_id>/report/stream/", views.patient_report_stream, name="patient_report_stream"),
     path("lab/<str:upi>/order/", views.lab_create_order_persist, name="lab_create_order"),
     path("lab/<str:upi>/finalize/", views.lab_finalize_result_persist, name="lab_finalize_result"),
     path("radiology/<str:upi>/order/", views.radiology_order_persist, name="radiology_order"),
@@ -5,11 +5,12 @@ from django.contrib import messages
 from django.contrib.auth.forms import AuthenticationForm
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods, require_POST
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db.models import Q, Sum
 
 import csv
 import datetime
-import os
+from urllib.parse import urlencode
 
 from django.db import transaction
 
@@ -18,8 +19,10 @@ from patients.models import Patient
 from core.models import Department, StaffProfile, Role, ServiceItem
 from workflow.models import Referral, PatientServiceLog
 from daas.models import DaasShiftSummary
+from daas.logic import latest_shift
+from finance.billing import generate_invoices, unbilled_logs
 from finance.models import Invoice, Payment
-from finance.ai_summary import summarize_patient_services
+from finance.ai_summary import get_patient_summary, stream_patient_summary
 
 from clinical.models import (
     LabOrder,
@@ -37,34 +40,6 @@ except Exception:
     AuditLog = None
 
 
-# ----------------- LLM wrapper ----------------- #
-
-class LLMNotConfigured(Exception):
-    """Raised when LLM (Gemini) is not configured properly."""
-    pass
-
-
-def call_gemini(prompt: str) -> str:
-    api_key = os.getenv("GEMINI_API_KEY") or getattr(
-        __import__("django.conf").conf.settings, "GEMINI_API_KEY", None
-    )
-    if not api_key:
-        raise LLMNotConfigured("GEMINI_API_KEY not configured")
-
-    try:
-        import google.generativeai as genai
-    except ImportError:
-        raise LLMNotConfigured("google-generativeai not installed")
-
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    resp = model.generate_content(prompt)
-    text = getattr(resp, "text", None)
-    if not text:
-        raise LLMNotConfigured("No text returned from Gemini")
-    return text
-
-
 # ----------------- Helpers ----------------- #
 
 def _get_role_codes(user):
@@ -139,12 +114,7 @@ def dashboard(request):
         return bool(role_codes & codes)
 
     # Latest shift widget
-    shift = (
-        DaasShiftSummary.objects
-        .filter(user=user)
-        .order_by("-shift_start")
-        .first()
-    )
+    shift = latest_shift(user)
     if shift and shift.shift_end:
         now = timezone.now()
         total = (shift.shift_end - shift.shift_start).total_seconds()
@@ -309,7 +279,10 @@ def complete_department_process(request, upi):
         return redirect("patient_detail", upi=upi)
 
     # Guard: unpaid invoices
-    has_unpaid = Invoice.objects.filter(patient=patient, status="UNPAID").exists()
+    has_unpaid = Invoice.objects.filter(
+        patient=patient,
+        status__in=[Invoice.STATUS_PENDING, Invoice.STATUS_PARTIAL],
+    ).exists()
     if has_unpaid:
         messages.error(request, "Cannot complete: patient has unpaid invoices.")
         return redirect("patient_detail", upi=upi)
@@ -592,26 +565,32 @@ def finance_invoice_persist(request, upi):
     patient = get_object_or_404(Patient, pk=upi)
 
     if request.method == "POST":
-        amount = request.POST.get("amount", "").strip()
-        if not amount:
-            messages.error(request, "Amount required.")
-        else:
-            inv = Invoice.objects.create(
-                patient=patient,
-                total=amount,
-                status="UNPAID",
-                created_by=request.user,
-            )
-            messages.success(request, f"Invoice #{inv.id} created KES {amount}.")
+        # Same engine as the finance queue and the nightly run_billing batch
+        result = generate_invoices(patients=[patient], created_by=request.user)
+        if not result.invoices:
+            messages.info(request, "No unbilled services for this patient.")
+            return redirect("patient_detail", upi=upi)
+        for invoice_id in result.invoice_ids:
             audit_log(
                 request.user,
                 "FINANCE_INVOICE_DB",
                 object_type="Invoice",
-                object_id=str(inv.id),
+                object_id=str(invoice_id),
             )
-            return redirect("patient_detail", upi=upi)
+        messages.success(
+            request,
+            f"Invoice #{result.invoice_ids[0]} created KES {result.total} "
+            f"({result.lines} service{'s' if result.lines != 1 else ''}).",
+        )
+        return redirect("patient_detail", upi=upi)
 
-    return render(request, "departments/finance_invoice.html", {"patient": patient})
+    services = unbilled_logs(patients=[patient]).select_related("service", "department")
+    total = services.aggregate(total=Sum("total_price"))["total"] or 0
+    return render(request, "departments/finance_invoice.html", {
+        "patient": patient,
+        "services": services,
+        "total": total,
+    })
 
 
 # ----------------- LLM Patient Report ----------------- #
@@ -638,29 +617,10 @@ def patient_report(request, patient_id):
 
     # Patient.pk is UPI in your model
     patient = get_object_or_404(Patient, pk=patient_id)
-    services = PatientServiceLog.objects.filter(
-        patient=patient
-    ).select_related("service", "department")
-
-    lines = [
-        f"- {s.created_at.date()} | {s.department.name}: "
-        f"{s.service.name} x{s.quantity} @ {s.unit_price} = {s.total_price}"
-        for s in services
-    ]
-
-    base_prompt = (
-        "You are a clinical assistant in a public hospital.\n"
-        "Generate a concise, structured patient encounter summary.\n"
-        f"Patient ID: {patient.pk}\n"
-        "Services history:\n" + "\n".join(lines) +
-        "\nHighlight key investigations, treatments, and pending follow-ups.\n"
-        "Use clear headings. Do NOT invent data."
-    )
 
-    try:
-        auto_text = summarize_patient_services(base_prompt)
-    except Exception:
-        auto_text = "\n".join(lines) or "No services recorded yet."
+    # Served from storage when current; otherwise the editor shows the
+    # deterministic service list and streams the AI summary into it.
+    auto_text, summary_ready = get_patient_summary(patient, refresh=False)
 
     if request.method == "POST":
         final_text = request.POST.get("report_text", auto_text)
@@ -678,9 +638,34 @@ def patient_report(request, patient_id):
     return render(request, "ui/patient_report_edit.html", {
         "patient": patient,
         "auto_summary": auto_text,
+        "summary_ready": summary_ready,
     })
 
 
+@login_required
+def patient_report_stream(request, patient_id):
+    """
+    Stream the AI summary as plain text chunks for the report editor,
+    which appends them to the textarea as they arrive.
+    """
+    user = request.user
+    role_codes = _get_role_codes(user)
+
+    if not (role_codes & ALLOWED_REPORT_ROLES) and not user.is_superuser:
+        return HttpResponse("Not allowed", status=403)
+
+    patient = get_object_or_404(Patient, pk=patient_id)
+
+    response = StreamingHttpResponse(
+        stream_patient_summary(patient),
+        content_type="text/plain; charset=utf-8",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the whole response
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 # ----------------- Utility views ----------------- #
 
 @login_required
@@ -698,16 +683,113 @@ def find_patient(request):
     })
 
 
-@login_required
-def attended_today(request):
+ATTENDED_PAGE_SIZE = 50
+
+ATTENDED_FIELDS = (
+    "id",
+    "created_at",
+    "quantity",
+    "patient_id",
+    "patient__full_name",
+    "service__name",
+    "department__name",
+    "created_by__username",
+)
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _logs_today():
     today = timezone.localdate()
-    logs = (
-        PatientServiceLog.objects
-        .filter(created_at__date=today)
-        .select_related("patient", "service", "department")
-        .order_by("-created_at")
+    start = timezone.make_aware(datetime.datetime.combine(today, datetime.time.min))
+    return PatientServiceLog.objects.filter(
+        created_at__gte=start,
+        created_at__lt=start + datetime.timedelta(days=1),
     )
-    return render(request, "ui/attended_today.html", {"logs": logs})
+
+
+def _attended_today_page(request):
+    """
+    One keyset page of today's service logs, newest first.
+
+    Filters (department / service / staff) are applied in SQL and the
+    cursor is "<created_at iso>|<id>" of the last row shown, so every page
+    costs the same regardless of how many logs exist today.
+    """
+    qs = _logs_today()
+
+    filters = {
+        "department": _int_or_none(request.GET.get("department")),
+        "service": _int_or_none(request.GET.get("service")),
+        "staff": _int_or_none(request.GET.get("staff")),
+    }
+    if filters["department"]:
+        qs = qs.filter(department_id=filters["department"])
+    if filters["service"]:
+        qs = qs.filter(service_id=filters["service"])
+    if filters["staff"]:
+        qs = qs.filter(created_by_id=filters["staff"])
+
+    cursor = request.GET.get("cursor", "")
+    if "|" in cursor:
+        ts_str, id_str = cursor.rsplit("|", 1)
+        try:
+            ts = datetime.datetime.fromisoformat(ts_str)
+            last_id = int(id_str)
+        except ValueError:
+            pass
+        else:
+            qs = qs.filter(
+                Q(created_at__lt=ts) | Q(created_at=ts, id__lt=last_id)
+            )
+
+    rows = list(
+        qs.order_by("-created_at", "-id")
+        .values(*ATTENDED_FIELDS)[:ATTENDED_PAGE_SIZE + 1]
+    )
+    has_more = len(rows) > ATTENDED_PAGE_SIZE
+    rows = rows[:ATTENDED_PAGE_SIZE]
+
+    next_cursor = ""
+    if has_more:
+        last = rows[-1]
+        next_cursor = f"{last['created_at'].isoformat()}|{last['id']}"
+
+    query = {k: v for k, v in filters.items() if v}
+    return {
+        "rows": rows,
+        "filters": filters,
+        "next_query": urlencode({**query, "cursor": next_cursor}) if has_more else "",
+    }
+
+
+@login_required
+def attended_today(request):
+    ctx = _attended_today_page(request)
+    ctx.update({
+        "departments": Department.objects.order_by("name").values("id", "name"),
+        "services": ServiceItem.objects.filter(is_active=True).order_by("name").values("id", "name"),
+        # Staff who recorded a service today (served by the created_at index)
+        "staff": (
+            _logs_today()
+            .filter(created_by__isnull=False)
+            .order_by("created_by__username")
+            .values("created_by_id", "created_by__username")
+            .distinct()
+        ),
+    })
+    return render(request, "ui/attended_today.html", ctx)
+
+
+@login_required
+def attended_today_rows(request):
+    """HTMX partial: the next page of rows plus a new load-more sentinel."""
+    return render(request, "ui/_attended_today_rows.html", _attended_today_page(request))
 
 
 @login_required
@@ -727,13 +809,6 @@ def my_profile(request):
         or "SECURITY_AUDITOR" in role_codes
     )
 
-    latest_shift = (
-        DaasShiftSummary.objects
-        .filter(user=user)
-        .order_by("-shift_start")
-        .first()
-    )
-
     ctx = {
         "user": user,
         "staffprofile": sp,
@@ -741,7 +816,7 @@ def my_profile(request):
         "hospital": getattr(sp, "hospital", None) if sp and hasattr(sp, "hospital") else None,
         "roles": roles,
         "role_codes": role_codes,
-        "latest_shift": latest_shift,
+        "latest_shift": latest_shift(user),
         "is_admin": is_admin_like,
         "is_auditor": is_auditor_like,
     }
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.15 on 2026-10-19 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0002_alter_referral_options_referral_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='patientservicelog',
+            options={'ordering': ['created_at']},
+        ),
+        migrations.AddIndex(
+            model_name='patientservicelog',
+            index=models.Index(fields=['billed', 'created_at'], name='svclog_billed_created_idx'),
+        ),
+    ]
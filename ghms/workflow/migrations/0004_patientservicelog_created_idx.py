@@ -0,0 +1,17 @@
+# Generated by Django 4.2.15 on 2026-10-19 07:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0003_alter_patientservicelog_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patientservicelog',
+            index=models.Index(fields=['created_at'], name='svclog_created_idx'),
+        ),
+    ]
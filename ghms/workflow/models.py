@@ -17,9 +17,16 @@ class PatientServiceLog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     billed = models.BooleanField(default=False)
 
-class Meta:
+    class Meta:
         ordering = ["created_at"]
-def __str__(self):
+        indexes = [
+            # Billing engine: unbilled logs for a day / set of patients
+            models.Index(fields=["billed", "created_at"], name="svclog_billed_created_idx"),
+            # Daily summaries / attended-today: one day's logs
+            models.Index(fields=["created_at"], name="svclog_created_idx"),
+        ]
+
+    def __str__(self):
         return f"{self.patient} - {self.service.name} ({self.total_price})"
 
 
@@ -1,16 +1,40 @@
 import os
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 
 # Load env vars from .env
 load_dotenv()
 
-API_KEY = os.environ.get("GOOGLE_AI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("GOOGLE_AI_API_KEY environment variable is not set")
+# Optional override, e.g. http://127.0.0.1:8765 for fake_gemini_server.py
+API_BASE = os.environ.get("GOOGLE_AI_API_BASE")
 
-client = genai.Client(api_key=API_KEY)
+MODEL = "gemini-2.5-flash"
+
+# google-genai takes a good part of a second to import, so the client is
+# built on the first question rather than when the API starts; a missing
+# key only fails the AI endpoints.
+_client = None
+_generation_config = None
+
+
+def get_client():
+    """The Gemini client and generation config, created on first use."""
+    global _client, _generation_config
+    if _client is None:
+        api_key = os.environ.get("GOOGLE_AI_API_KEY")
+        if not api_key:
+            raise RuntimeError("GOOGLE_AI_API_KEY environment variable is not set")
+        from google import genai
+        from google.genai import types
+
+        _generation_config = types.GenerateContentConfig(
+            temperature=0.4,
+            max_output_tokens=512,
+        )
+        _client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(base_url=API_BASE) if API_BASE else None,
+        )
+    return _client, _generation_config
 
 SYSTEM_INSTRUCTION = """
 You are PinkCycle's friendly menstrual health assistant.
@@ -29,12 +53,15 @@ Tone:
 """
 
 
-def answer_faq(question: str, app_context: str | None = None) -> str:
-    """
-    Call Gemini 2.5 Flash to answer a single FAQ-style question.
-    """
+FALLBACK_ANSWER = (
+    "I’m having trouble forming a helpful answer right now. "
+    "Please try asking in a slightly different way, or talk to a healthcare professional "
+    "for personalised advice. 💕"
+)
+
 
-    prompt = f"""
+def build_faq_prompt(question: str, app_context: str | None = None) -> str:
+    return f"""
 {SYSTEM_INSTRUCTION}
 
 App context:
@@ -47,13 +74,16 @@ Now give a friendly, clear answer in a few short paragraphs.
 Do not give medical diagnoses or prescriptions. Encourage the user to see a doctor for anything severe or worrying.
 """.strip()
 
+
+def answer_faq(question: str, app_context: str | None = None) -> str:
+    """
+    Call Gemini 2.5 Flash to answer a single FAQ-style question.
+    """
+    client, config = get_client()
     response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            temperature=0.4,
-            max_output_tokens=512,
-        ),
+        model=MODEL,
+        contents=build_faq_prompt(question, app_context),
+        config=config,
     )
 
     # 1) First try the convenience .text accessor
@@ -81,8 +111,21 @@ Do not give medical diagnoses or prescriptions. Encourage the user to see a doct
         print("Error extracting text from Gemini response:", e)
 
     # 3) If still nothing, return a short generic message.
-    return (
-        "I’m having trouble forming a helpful answer right now. "
-        "Please try asking in a slightly different way, or talk to a healthcare professional "
-        "for personalised advice. 💕"
+    return FALLBACK_ANSWER
+
+
+def stream_faq(question: str, app_context: str | None = None):
+    """
+    Same as answer_faq, but yields the answer in text chunks as Gemini
+    generates them, so the first words reach the user right away.
+    """
+    client, config = get_client()
+    stream = client.models.generate_content_stream(
+        model=MODEL,
+        contents=build_faq_prompt(question, app_context),
+        config=config,
     )
+    for chunk in stream:
+        text = getattr(chunk, "text", None)
+        if text:
+            yield text
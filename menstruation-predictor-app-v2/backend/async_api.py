@@ -0,0 +1,97 @@
+# backend/async_api.py
+"""
+Async mode for the data endpoints, used when USE_ASYNC_DB=1.
+
+The handlers in main.py are the only copy of each endpoint. For the
+routes in ASYNC_ROUTES, use_async_routes() registers an `async def`
+wrapper with the same path, schema and errors that
+
+- authenticates with current_user_async (no threadpool hop),
+- opens an AsyncSession instead of taking a pooled sync Session, and
+- runs the sync handler body on it with AsyncSession.run_sync(), so its
+  queries await the async driver instead of holding a threadpool worker.
+
+Auth, password reset, export and the AI assistant stay sync in both modes.
+"""
+import inspect
+
+from fastapi import Depends, FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import current_user, current_user_async
+from database import get_async_sessionmaker
+
+ASYNC_ROUTES = {
+    ("/me", "GET"),
+    ("/settings", "GET"),
+    ("/settings", "POST"),
+    ("/notification-settings", "GET"),
+    ("/notification-settings", "POST"),
+    ("/periods", "GET"),
+    ("/periods", "POST"),
+    ("/periods/{period_id}", "PATCH"),
+    ("/predictions", "GET"),
+    ("/cycle-history", "GET"),
+}
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+def asyncify(endpoint, session_dependencies):
+    """
+    An async endpoint running the sync `endpoint` on an AsyncSession.
+    Parameters depending on one of session_dependencies get an
+    AsyncSession instead, and current_user becomes current_user_async.
+    """
+    signature = inspect.signature(endpoint)
+    db_params = []
+    parameters = []
+    for param in signature.parameters.values():
+        dependency = getattr(param.default, "dependency", None)
+        if dependency is current_user:
+            param = param.replace(default=Depends(current_user_async))
+        elif dependency in session_dependencies:
+            param = param.replace(default=Depends(get_async_db), annotation=AsyncSession)
+            db_params.append(param.name)
+        parameters.append(param)
+
+    async def handler(**kwargs):
+        sessions = {name: kwargs.pop(name) for name in db_params}
+        if not sessions:
+            return endpoint(**kwargs)
+        db = next(iter(sessions.values()))
+        return await db.run_sync(
+            lambda session: endpoint(**kwargs, **{name: session for name in sessions})
+        )
+
+    handler.__name__ = endpoint.__name__
+    handler.__doc__ = endpoint.__doc__
+    handler.__signature__ = signature.replace(parameters=parameters)
+    return handler
+
+
+def use_async_routes(app: FastAPI, session_dependencies) -> None:
+    """
+    Replace the ASYNC_ROUTES handlers of `app` with async endpoints, in
+    place so route matching order is unchanged.
+    """
+    routes = app.router.routes
+    for index, route in enumerate(list(routes)):
+        if not isinstance(route, APIRoute):
+            continue
+        if not any((route.path, method) in ASYNC_ROUTES for method in route.methods):
+            continue
+        app.router.add_api_route(
+            route.path,
+            asyncify(route.endpoint, session_dependencies),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            responses=route.responses,
+            name=route.name,
+        )
+        routes[index] = routes.pop()
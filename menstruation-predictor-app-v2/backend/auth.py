@@ -0,0 +1,319 @@
+# backend/auth.py
+"""
+Token authentication and the cached current-user dependency.
+
+/register and /login return a signed access token (a JWT, HS256 with the
+local AUTH_SECRET_KEYS). Every user endpoint reads it from the
+`Authorization: Bearer` header through current_user(). Checking the
+token needs no DB round-trip. The user's profile and cycle settings are
+then served from user_cache, a short-TTL per-process LRU that crud clears
+on profile, settings and account writes. A cache miss costs one joined
+query.
+
+AUTH_SECRET_KEYS is a comma-separated list: the first key signs, all keys
+verify, so keys can be rotated without logging everyone out. The keys
+are loaded by load_keys() when the app starts (main.lifespan), which
+fails startup if it is unset, unless AUTH_DEV_RANDOM_KEY=1 asks for a
+random per-process key (development only: tokens stop working after a
+restart and across workers).
+
+Tokens carry the user's token_version ("ver"), which crud bumps whenever
+the password is set or reset. current_user() rejects tokens with an older
+version, so a password change logs out every other session (immediately
+on this worker, within USER_CACHE_TTL on the others).
+
+ADMIN_EMAILS (comma-separated) lists the accounts that may read
+operational endpoints such as /ai/faq/metrics (admin_user()).
+
+The old `user_id` query parameter is still accepted, but it must match
+the token.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import ReadSessionLocal, get_async_sessionmaker
+
+ADMIN_EMAILS = frozenset(
+    e.strip().lower() for e in os.environ.get("ADMIN_EMAILS", "").split(",") if e.strip()
+)
+ACCESS_TOKEN_TTL = int(os.environ.get("ACCESS_TOKEN_TTL", 7 * 24 * 3600))  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+class TokenError(ValueError):
+    pass
+
+
+_keys = []
+_keys_by_kid = {}
+
+
+def load_keys() -> None:
+    """
+    Read AUTH_SECRET_KEYS. Called at startup; raises RuntimeError when no
+    key is configured and AUTH_DEV_RANDOM_KEY is not set.
+    """
+    global _keys, _keys_by_kid
+    keys = [k.encode("utf-8") for k in os.environ.get("AUTH_SECRET_KEYS", "").split(",") if k]
+    if not keys:
+        if os.environ.get("AUTH_DEV_RANDOM_KEY", "").lower() not in ("1", "true", "yes"):
+            raise RuntimeError(
+                "AUTH_SECRET_KEYS is not set; set it, or AUTH_DEV_RANDOM_KEY=1 for a throwaway development key"
+            )
+        logger.warning("AUTH_SECRET_KEYS not set; using a random key, tokens will not survive a restart")
+        keys = [secrets.token_bytes(32)]
+    _keys_by_kid = {_kid(k): k for k in keys}
+    _keys = keys
+
+
+def _signing_keys() -> list:
+    # Scripts and tests that skip the app's lifespan load the keys on first use
+    if not _keys:
+        load_keys()
+    return _keys
+
+
+class Claims(NamedTuple):
+    user_id: int
+    version: int
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _kid(key: bytes) -> str:
+    return hashlib.sha256(key).hexdigest()[:8]
+
+
+def _sign(signing_input: bytes, key: bytes) -> bytes:
+    return hmac.new(key, signing_input, hashlib.sha256).digest()
+
+
+def issue_token(
+    user_id: int, version: int = 0, now: Optional[float] = None, ttl: int = ACCESS_TOKEN_TTL
+) -> str:
+    now = int(now if now is not None else time.time())
+    key = _signing_keys()[0]
+    header = _b64(json.dumps({"alg": "HS256", "typ": "JWT", "kid": _kid(key)}).encode())
+    payload = _b64(json.dumps(
+        {"sub": str(user_id), "ver": version, "iat": now, "exp": now + ttl}
+    ).encode())
+    signing_input = f"{header}.{payload}".encode("ascii")
+    return f"{header}.{payload}.{_b64(_sign(signing_input, key))}"
+
+
+def verify_token(token: str, now: Optional[float] = None) -> Claims:
+    """User id and token version from a valid, unexpired token; raises TokenError otherwise."""
+    _signing_keys()
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_unb64(header_b64))
+        key = _keys_by_kid.get(header.get("kid"))
+        if key is None or header.get("alg") != "HS256":
+            raise TokenError("Unknown signing key")
+        expected = _sign(f"{header_b64}.{payload_b64}".encode("ascii"), key)
+        if not hmac.compare_digest(expected, _unb64(signature_b64)):
+            raise TokenError("Bad signature")
+        payload = json.loads(_unb64(payload_b64))
+        claims = Claims(int(payload["sub"]), int(payload.get("ver", 0)))
+        expires = payload["exp"]
+    except TokenError:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise TokenError("Malformed token") from e
+    if expires < (now if now is not None else time.time()):
+        raise TokenError("Token expired")
+    return claims
+
+
+# Cached user / settings --------------------------------------------------
+
+@dataclass(frozen=True)
+class AuthContext:
+    """The authenticated user as immutable snapshots, safe to share between requests."""
+    user_id: int
+    user: schemas.UserProfile
+    settings: Optional[schemas.CycleSettingsResponse]
+    token_version: int = 0
+
+
+class UserCache:
+    """
+    LRU of AuthContext per user id with a TTL. crud invalidates an entry on
+    writes; like the prediction cache it is per process, so the TTL bounds
+    how stale another worker's copy can get.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[AuthContext]:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._data.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, context: AuthContext) -> None:
+        with self._lock:
+            self._data[context.user_id] = (time.monotonic() + self.ttl, context)
+            self._data.move_to_end(context.user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = UserCache(
+    maxsize=int(os.environ.get("USER_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("USER_CACHE_TTL", 30)),
+)
+
+
+def _context_query(user_id: int):
+    return (
+        select(models.User, models.CycleSettings)
+        .outerjoin(models.CycleSettings, models.CycleSettings.user_id == models.User.id)
+        .where(models.User.id == user_id)
+    )
+
+
+def _context(row) -> Optional[AuthContext]:
+    if row is None:
+        return None
+    user, settings = row
+    return AuthContext(
+        user_id=user.id,
+        user=schemas.UserProfile.model_validate(user, from_attributes=True),
+        settings=schemas.CycleSettingsResponse.model_validate(settings, from_attributes=True)
+        if settings is not None else None,
+        token_version=user.token_version or 0,
+    )
+
+
+def load_context(db: Session, user_id: int) -> Optional[AuthContext]:
+    return _context(db.execute(_context_query(user_id)).first())
+
+
+async def load_context_async(db: AsyncSession, user_id: int) -> Optional[AuthContext]:
+    return _context((await db.execute(_context_query(user_id))).first())
+
+
+# Dependencies ------------------------------------------------------------
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def token_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+    user_id: Optional[int] = Query(None, description="Deprecated; must match the token"),
+) -> Claims:
+    if credentials is None:
+        raise HTTPException(
+            status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        claims = verify_token(credentials.credentials)
+    except TokenError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    if user_id is not None and user_id != claims.user_id:
+        raise HTTPException(status_code=403, detail="user_id does not match the access token")
+    return claims
+
+
+def _not_found() -> HTTPException:
+    return HTTPException(status_code=401, detail="User not found", headers={"WWW-Authenticate": "Bearer"})
+
+
+def _checked(context: Optional[AuthContext], claims: Claims) -> AuthContext:
+    if context is None:
+        raise _not_found()
+    if context.token_version != claims.version:
+        raise HTTPException(
+            status_code=401, detail="Token revoked", headers={"WWW-Authenticate": "Bearer"}
+        )
+    return context
+
+
+def cached_context(user_id: int) -> Optional[AuthContext]:
+    context = user_cache.get(user_id)
+    if context is None:
+        with ReadSessionLocal() as db:
+            context = load_context(db, user_id)
+        if context is not None:
+            user_cache.set(context)
+    return context
+
+
+def current_user(claims: Claims = Depends(token_claims)) -> AuthContext:
+    return _checked(cached_context(claims.user_id), claims)
+
+
+async def current_user_async(claims: Claims = Depends(token_claims)) -> AuthContext:
+    context = user_cache.get(claims.user_id)
+    if context is None:
+        async with get_async_sessionmaker()() as db:
+            context = await load_context_async(db, claims.user_id)
+        if context is not None:
+            user_cache.set(context)
+    return _checked(context, claims)
+
+
+def admin_user(auth: AuthContext = Depends(current_user)) -> AuthContext:
+    if auth.user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admins only")
+    return auth
+
+
+def optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+) -> Optional[AuthContext]:
+    """The token's user if a valid token was sent, else None (public endpoints)."""
+    if credentials is None:
+        return None
+    try:
+        claims = verify_token(credentials.credentials)
+    except TokenError:
+        return None
+    context = cached_context(claims.user_id)
+    if context is None or context.token_version != claims.version:
+        return None
+    return context
@@ -0,0 +1,163 @@
+# backend/bench_faq.py
+"""
+FAQ cache benchmark against the local stub model.
+
+Starts fake_gemini_server.py in-process and the API with uvicorn on a
+throwaway database (as bench_load.py does), registers a few users and
+asks a realistic mix of questions: popular questions in several
+phrasings, canned questions and a long tail of one-off ones, some of them
+streamed. Prints where answers came from and their latency, the number of
+429s, how many calls reached the model, and the server's
+/ai/faq/metrics:
+
+    python bench_faq.py --requests 500 --delay 0.02
+    python bench_faq.py --rate-per-minute 5 --burst 2    # watch the limiter
+
+Run it with FAQ_SIMILARITY=1.01 to see the hit rate without similarity
+matching.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+
+from bench_load import start_server
+from fake_gemini_server import FakeGeminiHandler, make_server
+
+# Each group is one question asked in different words
+POPULAR = (
+    ("Is a 35-day cycle normal?", "is a 35 day cycle normal", "Is it normal to have a 35 day cycle?",
+     "35-day cycles - is that normal?"),
+    ("Can stress delay my period?", "does stress delay periods", "Can stress delay a period?"),
+    ("Why do I get cramps during my period?", "why do i get cramps on my period",
+     "Why do I get cramps during periods?"),
+    ("Is spotting between periods normal?", "spotting between periods, is that normal?"),
+    ("Does exercise help with period pain?", "does exercise help period pain?"),
+    ("Is it normal to have a 21-day cycle?", "is a 21 day cycle normal"),
+    ("Can I get pregnant on my period?", "can you get pregnant during your period?"),
+)
+CANNED = ("What's a normal cycle length?", "How long should a period last?", "What is PMS?",
+          "when do I ovulate", "How do I export my data?")
+ACTIVITIES = ("swim", "run", "do yoga", "lift weights", "go to the sauna", "drink coffee",
+              "take a bath", "fly", "donate blood", "hike", "cycle to work", "drink alcohol")
+ADMIN_EMAIL = "faq-bench-admin@example.com"  # may read /ai/faq/metrics
+FACTORS = ("travel", "fasting", "night shifts", "caffeine", "a cold", "antibiotics",
+           "losing weight", "a new job", "jet lag", "dehydration", "vitamin D", "sugar")
+
+
+def next_question(rng: random.Random) -> str:
+    roll = rng.random()
+    if roll < 0.6:
+        group = POPULAR[min(int(rng.expovariate(0.5)), len(POPULAR) - 1)]
+        return rng.choice(group)
+    if roll < 0.75:
+        return rng.choice(CANNED)
+    if rng.random() < 0.5:
+        return f"Is it okay to {rng.choice(ACTIVITIES)} during my period?"
+    return f"Can {rng.choice(FACTORS)} affect my cycle?"
+
+
+async def register(client, users):
+    run = random.randrange(10**9)
+    emails = [f"faq{run}-{i}@example.com" for i in range(users)] + [ADMIN_EMAIL]
+    headers = []
+    for email in emails:
+        res = await client.post("/register", json={"email": email, "password": "benchpass"})
+        res.raise_for_status()
+        headers.append({"Authorization": f"Bearer {res.json()['access_token']}"})
+    return headers[:-1], headers[-1]
+
+
+async def ask(client, question, headers, stream):
+    if not stream:
+        res = await client.post("/ai/faq", json={"question": question}, headers=headers)
+        return res.status_code, res.json().get("source") if res.status_code == 200 else None
+    async with client.stream(
+        "POST", "/ai/faq", json={"question": question},
+        headers={**headers, "Accept": "text/event-stream"},
+    ) as res:
+        source = None
+        async for line in res.aiter_lines():
+            if line.startswith("data:") and '"source"' in line:
+                source = json.loads(line[5:])["source"]
+        return res.status_code, source
+
+
+async def run(url, args):
+    rng = random.Random(args.seed)
+    latencies = defaultdict(list)
+    statuses = defaultdict(int)
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        users, admin = await register(client, args.users)
+        queue = asyncio.Queue()
+        for _ in range(args.requests):
+            queue.put_nowait((next_question(rng), rng.choice(users), rng.random() < args.stream_ratio))
+
+        async def worker():
+            while not queue.empty():
+                question, headers, stream = queue.get_nowait()
+                started = time.perf_counter()
+                status, source = await ask(client, question, headers, stream)
+                statuses[status] += 1
+                if status == 200:
+                    latencies[source].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        metrics = (await client.get("/ai/faq/metrics", headers=admin)).json()
+
+    print(f"{args.requests} questions in {elapsed:.1f} s, statuses {dict(statuses)}")
+    for source in ("canned", "cache", "similar", "model"):
+        values = sorted(latencies.get(source, ()))
+        if values:
+            print(
+                f"  {source:<8} {len(values):5d}  p50 {statistics.median(values):8.1f} ms  "
+                f"p95 {values[int(len(values) * 0.95) - 1]:8.1f} ms"
+            )
+    answered = sum(len(v) for v in latencies.values())
+    print(f"  hit rate {1 - len(latencies.get('model', ())) / max(answered, 1):.1%}, "
+          f"model calls {FakeGeminiHandler.requests}")
+    print("server metrics:", json.dumps(metrics, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAQ cache / rate limit benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--stream-ratio", type=float, default=0.2, help="Share of SSE requests")
+    parser.add_argument("--delay", type=float, default=0.02, help="Stub model delay per word")
+    parser.add_argument("--rate-per-minute", type=float, default=600)
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8200)
+    args = parser.parse_args()
+
+    gemini = make_server(args.port + 1, args.delay)
+    threading.Thread(target=gemini.serve_forever, daemon=True).start()
+    os.environ["GOOGLE_AI_API_BASE"] = f"http://127.0.0.1:{args.port + 1}"
+    os.environ["FAQ_RATE_PER_MINUTE"] = str(args.rate_per_minute)
+    os.environ["FAQ_RATE_BURST"] = str(args.burst)
+    os.environ["ADMIN_EMAILS"] = ADMIN_EMAIL
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proc, url = start_server("sync", "on", args.port, os.path.join(tmp, "bench.db"))
+        try:
+            asyncio.run(run(url, args))
+        finally:
+            proc.terminate()
+            proc.wait()
+            gemini.shutdown()
+
+
+if __name__ == "__main__":
+    main()
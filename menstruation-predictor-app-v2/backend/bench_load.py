@@ -0,0 +1,183 @@
+# backend/bench_load.py
+"""
+Load benchmark for /predictions and /periods.
+
+Starts uvicorn on a throwaway SQLite file (the dev cycle_app.db is not
+touched), registers some users with a few years of period logs, then
+fires concurrent requests with httpx and prints throughput and latency.
+
+    python bench_load.py --mode both --concurrency 200 --requests 5000
+
+--mode sync|async|both picks USE_ASYNC_DB for the server and
+--tuning on|off|both the SQLite profile (SQLITE_TUNING: WAL, pragmas,
+pooled write + read-only connections), so
+
+    python bench_load.py --mode sync --tuning both --write-ratio 0.3
+
+compares concurrent read/write throughput before and after. Use --url to
+benchmark an already running server instead (users are still registered
+through the API).
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+
+async def seed(client: httpx.AsyncClient, users: int, periods_per_user: int) -> list[dict]:
+    """Register users with settings and period logs; returns their auth headers."""
+    run = random.randrange(10**9)
+    users_auth = []
+    for i in range(users):
+        res = await client.post("/register", json={
+            "email": f"bench{run}-{i}@example.com",
+            "password": "benchpass",
+        })
+        res.raise_for_status()
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+        await client.post("/settings", headers=headers, json={
+            "average_cycle_length": 28,
+            "average_period_length": 5,
+        })
+        start = date.today() - timedelta(days=28 * periods_per_user)
+        for _ in range(periods_per_user):
+            await client.post("/periods", headers=headers, json={
+                "start_date": start.isoformat(),
+                "end_date": (start + timedelta(days=4)).isoformat(),
+            })
+            start += timedelta(days=random.randint(25, 32))
+        users_auth.append(headers)
+    return users_auth
+
+
+async def hammer(client, users_auth, total, concurrency, write_ratio):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            headers = random.choice(users_auth)
+            roll = random.random()
+            started = time.perf_counter()
+            try:
+                if roll < write_ratio:
+                    day = date.today() - timedelta(days=random.randint(0, 3650))
+                    res = await client.post("/periods", headers=headers, json={
+                        "start_date": day.isoformat(),
+                        "end_date": (day + timedelta(days=4)).isoformat(),
+                        "exclude_from_stats": True,
+                    })
+                elif roll < (1 + write_ratio) / 2:
+                    res = await client.get("/periods", headers=headers)
+                else:
+                    res = await client.get("/predictions", headers=headers)
+                if res.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return elapsed, latencies, errors
+
+
+def report(label, elapsed, latencies, errors):
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(
+        f"{label:>9}: {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {p(0.50):7.1f} ms  p95 {p(0.95):7.1f} ms  p99 {p(0.99):7.1f} ms  "
+        f"mean {statistics.mean(latencies) * 1000:7.1f} ms  errors {errors}"
+    )
+
+
+async def run_against(url, args, label):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        users_auth = await seed(client, args.users, args.periods)
+        await hammer(client, users_auth, min(200, args.requests), min(20, args.concurrency), args.write_ratio)
+        elapsed, latencies, errors = await hammer(
+            client, users_auth, args.requests, args.concurrency, args.write_ratio
+        )
+    report(label, elapsed, latencies, errors)
+
+
+def start_server(mode, tuning, port, db_path):
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    env["USE_ASYNC_DB"] = "1" if mode == "async" else ""
+    env["SQLITE_TUNING"] = "1" if tuning == "on" else "0"
+    env.setdefault("GOOGLE_AI_API_KEY", "bench")
+    env.setdefault("AUTH_SECRET_KEYS", "bench")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{url}/health", timeout=1)
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError(f"uvicorn ({mode}) did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for /predictions and /periods")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--tuning", choices=["on", "off", "both"], default="on",
+                        help="SQLite WAL/pragma/pool profile")
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--periods", type=int, default=36, help="Period logs per seeded user")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="Share of POST /periods")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"{args.users} users x {args.periods} periods, writes {args.write_ratio:.0%}"
+    )
+
+    if args.url:
+        asyncio.run(run_against(args.url, args, "remote"))
+        return
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    tunings = ["off", "on"] if args.tuning == "both" else [args.tuning]
+    runs = [(mode, tuning) for mode in modes for tuning in tunings]
+    for i, (mode, tuning) in enumerate(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            proc, url = start_server(mode, tuning, args.port + i, os.path.join(tmp, "bench.db"))
+            try:
+                asyncio.run(run_against(url, args, f"{mode}/{tuning}"))
+            finally:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    main()
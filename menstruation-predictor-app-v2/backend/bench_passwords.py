@@ -0,0 +1,102 @@
+# backend/bench_passwords.py
+"""
+Pick password hashing cost parameters for a login latency budget.
+
+For each candidate setting (scrypt N values, plus argon2id memory costs
+if argon2-cffi is installed) this measures the single-hash time, then
+replays a steady stream of logins at --rate per second through the same
+bounded pool /login uses (passwords.verify_async) and records the latency
+of each login. For each algorithm, the strongest setting whose p95 stays
+under --target-ms is the recommendation:
+
+    python bench_passwords.py --rate 20 --target-ms 250
+    python bench_passwords.py --rate 50 --workers 4 --duration 20
+
+Settings whose average pool utilisation (rate x hash time / workers) is
+1 or more cannot keep up at that rate and are skipped without a run.
+Only hashing is measured: add the DB and HTTP time from bench_load.py.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import passwords
+
+SCRYPT_N = [2 ** k for k in range(12, 18)]
+ARGON2_MEMORY_KIB = [8 * 1024, 19 * 1024, 46 * 1024, 64 * 1024]
+
+
+def candidates():
+    for n in SCRYPT_N:
+        yield f"scrypt N=2^{n.bit_length() - 1} r=8 p=1", passwords.ScryptHasher(n=n, r=8, p=1)
+    try:
+        for memory in ARGON2_MEMORY_KIB:
+            yield f"argon2id m={memory // 1024}MiB t=2 p=1", passwords.Argon2Hasher(
+                time_cost=2, memory_cost=memory, parallelism=1
+            )
+    except RuntimeError:
+        pass  # argon2-cffi not installed
+
+
+def hash_time(hasher, samples: int = 5) -> float:
+    stored = hasher.hash("correct horse")
+    started = time.perf_counter()
+    for _ in range(samples):
+        hasher.verify("correct horse", stored)
+    return (time.perf_counter() - started) / samples
+
+
+async def replay(stored: str, rate: float, duration: float) -> list[float]:
+    """Open-loop arrivals every 1/rate s; returns each login's latency in ms."""
+    latencies = []
+
+    async def login(arrival: float):
+        await passwords.verify_async("correct horse", stored)
+        latencies.append((time.perf_counter() - arrival) * 1000)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        arrival = start + i / rate
+        await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+        tasks.append(asyncio.create_task(login(arrival)))
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password hashing cost benchmark")
+    parser.add_argument("--rate", type=float, default=20, help="Peak logins per second")
+    parser.add_argument("--target-ms", type=float, default=250, help="p95 login latency budget")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per setting")
+    parser.add_argument("--workers", type=int, default=passwords.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+
+    print(f"{args.rate:g} logins/s, {args.workers} hashing threads, p95 target {args.target_ms:g} ms")
+    best = {}
+    for label, hasher in candidates():
+        single = hash_time(hasher)
+        utilisation = args.rate * single / args.workers
+        if utilisation >= 1:
+            print(f"{label:<26} hash {single * 1000:7.1f} ms  utilisation {utilisation:5.2f}  skipped")
+            continue
+
+        passwords.configure(hasher=hasher, workers=args.workers)
+        latencies = sorted(asyncio.run(replay(hasher.hash("correct horse"), args.rate, args.duration)))
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        ok = p95 <= args.target_ms
+        print(
+            f"{label:<26} hash {single * 1000:7.1f} ms  utilisation {utilisation:5.2f}  "
+            f"p50 {statistics.median(latencies):7.1f} ms  p95 {p95:7.1f} ms  {'ok' if ok else 'too slow'}"
+        )
+        if ok:
+            best[hasher.name] = label  # candidates run from cheapest to strongest
+    for label in best.values():
+        print(f"Recommended: {label}")
+    if not best:
+        print("No setting meets the target; add hashing threads/CPUs")
+
+
+if __name__ == "__main__":
+    main()
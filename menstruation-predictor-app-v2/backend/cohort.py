@@ -0,0 +1,320 @@
+# backend/cohort.py
+"""
+Batch predictions for every user at once, for the nightly reminder run.
+
+All period logs are loaded into flat NumPy arrays sorted by (user, start)
+with an offsets array marking each user's slice, so cycle/period averages,
+next period, ovulation and fertile window are computed for the whole cohort
+with a handful of vectorized operations. The arithmetic is
+predictions.average_lengths() / prediction_offsets(), the same functions
+behind GET /predictions, so results match the endpoint exactly. With
+PREDICTION_MODEL other than "mean", each user's model cycle length
+(cycle_model.model_cycle_length) is loaded alongside and replaces the average.
+
+    python cohort.py --date 2025-01-31        # print due reminders
+    python cohort.py --synthetic 1000000      # timing on generated data
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.orm import Session
+
+import cycle_model
+import models
+from predictions import average_lengths, prediction_offsets
+
+NO_DATE = np.datetime64("NaT", "D")
+
+# Reminder kinds emitted by due_notifications()
+PERIOD_SOON = "period_soon"
+PERIOD_END = "period_end"
+FERTILE_WINDOW = "fertile_window"
+OVULATION = "ovulation"
+
+
+@dataclass
+class Cohort:
+    """Column arrays for U users and P period logs (sorted by user, start)."""
+    user_ids: np.ndarray  # int64[U], ascending
+    default_cycle: np.ndarray  # int64[U]
+    default_period: np.ndarray  # int64[U]
+    first_period_start: np.ndarray  # datetime64[D][U], NaT if unset
+    irregular: np.ndarray  # bool[U]
+    pregnancy: np.ndarray  # bool[U]
+    show_fertile_window: np.ndarray  # bool[U]
+    notify_period: np.ndarray  # bool[U]
+    reminder_days_before: np.ndarray  # int64[U]
+    notify_period_end: np.ndarray  # bool[U]
+    notify_fertile_window: np.ndarray  # bool[U]
+    notify_ovulation: np.ndarray  # bool[U]
+    offsets: np.ndarray  # int64[U + 1]; user i owns rows offsets[i]:offsets[i+1]
+    starts: np.ndarray  # datetime64[D][P]
+    ends: np.ndarray  # datetime64[D][P]
+    excluded: np.ndarray  # bool[P]
+    # float64[U] model cycle length, NaN: keep the average; None for "mean"
+    model_cycle: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.user_ids)
+
+
+@dataclass
+class CohortPredictions:
+    """Per-user prediction arrays; rows where valid is False have no prediction."""
+    user_ids: np.ndarray
+    valid: np.ndarray
+    cycle_length: np.ndarray
+    period_length: np.ndarray
+    last_period_start: np.ndarray
+    next_period_start: np.ndarray
+    next_period_end: np.ndarray
+    ovulation_day: np.ndarray
+    fertile_window_start: np.ndarray
+    fertile_window_end: np.ndarray
+    cycle_day_today: np.ndarray
+
+
+def _dates(values) -> np.ndarray:
+    """ISO strings / date objects / None -> datetime64[D] (None -> NaT)."""
+    return np.array([v if v is not None else "NaT" for v in values], dtype="datetime64[D]")
+
+
+def load_cohort(db: Session, model: str = cycle_model.PREDICTION_MODEL) -> Cohort:
+    """Read settings and period logs for all users with cycle settings."""
+    CS, NS, PL = models.CycleSettings, models.NotificationSettings, models.PeriodLog
+    CLS = models.CycleLengthStats
+
+    user_rows = db.execute(
+        select(
+            CS.user_id,
+            CS.average_cycle_length,
+            CS.average_period_length,
+            type_coerce(CS.first_period_start_date, String),
+            CS.irregular_cycle_mode,
+            CS.pregnancy_mode,
+            CS.show_fertile_window,
+            NS.notify_period,
+            NS.period_reminder_days_before,
+            NS.notify_period_end,
+            NS.notify_fertile_window,
+            NS.notify_ovulation,
+        )
+        .outerjoin(NS, NS.user_id == CS.user_id)
+        .order_by(CS.user_id)
+    ).all()
+    cols = list(zip(*user_rows)) if user_rows else [()] * 12
+
+    user_ids = np.array(cols[0], dtype=np.int64)
+
+    def flags(col, default):
+        return np.array([default if v is None else bool(v) for v in col], dtype=bool)
+
+    # Raw strings skip per-row date objects; stored as YYYY-MM-DD
+    period_rows = db.execute(
+        select(
+            PL.user_id,
+            type_coerce(PL.start_date, String),
+            type_coerce(PL.end_date, String),
+            PL.exclude_from_stats,
+        )
+        .where(PL.user_id.in_(select(CS.user_id)))
+        .order_by(PL.user_id, PL.start_date)
+    ).all()
+    pcols = list(zip(*period_rows)) if period_rows else [()] * 4
+    period_users = np.array(pcols[0], dtype=np.int64)
+
+    model_cycle = None
+    if model != "mean":
+        estimates = {
+            row.user_id: cycle_model.estimate(row, model).cycle_length
+            for row in db.execute(
+                select(CLS.user_id, CLS.n, CLS.mean, CLS.m2, CLS.ewma, CLS.ewvar, CLS.recent)
+                .where(CLS.user_id.in_(select(CS.user_id)))
+            )
+        }
+        model_cycle = np.array(
+            [np.nan if estimates.get(u) is None else estimates[u] for u in cols[0]], dtype=np.float64
+        )
+
+    return Cohort(
+        user_ids=user_ids,
+        default_cycle=np.array(cols[1], dtype=np.int64),
+        default_period=np.array(cols[2], dtype=np.int64),
+        first_period_start=_dates(cols[3]),
+        irregular=flags(cols[4], False),
+        pregnancy=flags(cols[5], False),
+        show_fertile_window=flags(cols[6], True),
+        notify_period=flags(cols[7], False),
+        reminder_days_before=np.array([2 if v is None else v for v in cols[8]], dtype=np.int64),
+        notify_period_end=flags(cols[9], False),
+        notify_fertile_window=flags(cols[10], False),
+        notify_ovulation=flags(cols[11], False),
+        offsets=np.searchsorted(period_users, np.append(user_ids, np.iinfo(np.int64).max)).astype(np.int64)
+        if len(user_ids) else np.zeros(1, dtype=np.int64),
+        starts=_dates(pcols[1]),
+        ends=_dates(pcols[2]),
+        excluded=np.array([bool(v) for v in pcols[3]], dtype=bool),
+        model_cycle=model_cycle,
+    )
+
+
+def predict(cohort: Cohort, today: Optional[date] = None) -> CohortPredictions:
+    """Vectorized equivalent of predictions.cycle_stats() + build_prediction()."""
+    n_users = len(cohort)
+    counts = np.diff(cohort.offsets)
+    group = np.repeat(np.arange(n_users), counts)  # user index per period row
+
+    # All logs: last start per user (rows are sorted by start within a user)
+    has_periods = counts > 0
+    last_start = np.full(n_users, NO_DATE)
+    last_start[has_periods] = cohort.starts[cohort.offsets[1:][has_periods] - 1]
+
+    # Included logs: count, summed lengths, first/last start
+    inc = ~cohort.excluded
+    inc_group = group[inc]
+    inc_starts = cohort.starts[inc]
+    inc_lengths = (cohort.ends[inc] - inc_starts).astype(np.int64) + 1
+    inc_count = np.bincount(inc_group, minlength=n_users)
+    length_sum = np.bincount(inc_group, weights=inc_lengths, minlength=n_users).astype(np.int64)
+
+    span = np.zeros(n_users, dtype=np.int64)
+    if len(inc_group):
+        boundary = np.flatnonzero(np.diff(inc_group)) + 1
+        first_idx = np.concatenate(([0], boundary))
+        last_idx = np.concatenate((boundary - 1, [len(inc_group) - 1]))
+        owners = inc_group[first_idx]
+        span[owners] = (inc_starts[last_idx] - inc_starts[first_idx]).astype(np.int64)
+
+    cycle, period = average_lengths(
+        cohort.default_cycle, cohort.default_period, inc_count, span, length_sum
+    )
+    if cohort.model_cycle is not None:
+        known = ~np.isnan(cohort.model_cycle)
+        cycle = np.where(known, np.rint(np.where(known, cohort.model_cycle, 0)), cycle).astype(np.int64)
+
+    anchor = np.where(has_periods, last_start, cohort.first_period_start)
+    valid = ~np.isnat(anchor)
+
+    next_start, next_end, ovulation, fertile_start, fertile_end = (
+        anchor + offset.astype("timedelta64[D]")
+        for offset in prediction_offsets(cycle, period)
+    )
+    today64 = np.datetime64(today or date.today(), "D")
+    cycle_day = np.where(valid, np.maximum((today64 - anchor).astype(np.int64) + 1, 0), 0)
+
+    return CohortPredictions(
+        user_ids=cohort.user_ids,
+        valid=valid,
+        cycle_length=cycle,
+        period_length=period,
+        last_period_start=anchor,
+        next_period_start=next_start,
+        next_period_end=next_end,
+        ovulation_day=ovulation,
+        fertile_window_start=fertile_start,
+        fertile_window_end=fertile_end,
+        cycle_day_today=cycle_day,
+    )
+
+
+def due_notifications(cohort: Cohort, preds: CohortPredictions, day: date) -> list[tuple]:
+    """
+    (user_id, kind, event_date) for reminders that fire on `day`.
+
+    Users in pregnancy mode get none; fertile/ovulation reminders also
+    respect show_fertile_window.
+    """
+    day64 = np.datetime64(day, "D")
+    active = preds.valid & ~cohort.pregnancy
+    fertile_ok = active & cohort.show_fertile_window
+
+    rules = [
+        (PERIOD_SOON, active & cohort.notify_period,
+         preds.next_period_start - cohort.reminder_days_before.astype("timedelta64[D]"),
+         preds.next_period_start),
+        (PERIOD_END, active & cohort.notify_period_end, preds.next_period_end, preds.next_period_end),
+        (FERTILE_WINDOW, fertile_ok & cohort.notify_fertile_window,
+         preds.fertile_window_start, preds.fertile_window_start),
+        (OVULATION, fertile_ok & cohort.notify_ovulation, preds.ovulation_day, preds.ovulation_day),
+    ]
+
+    due = []
+    for kind, enabled, fire_on, event in rules:
+        idx = np.flatnonzero(enabled & (fire_on == day64))
+        due.extend(
+            (int(uid), kind, ev.item())
+            for uid, ev in zip(preds.user_ids[idx], event[idx])
+        )
+    return due
+
+
+def synthetic_cohort(n_users: int, periods_per_user: int = 12, seed: int = 0) -> Cohort:
+    """Random cohort for benchmarks: ~periods_per_user logs each, some excluded."""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 2 * periods_per_user + 1, n_users)
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    total = int(offsets[-1])
+    group = np.repeat(np.arange(n_users), counts)
+
+    first = np.datetime64("2020-01-01") + rng.integers(0, 365, n_users).astype("timedelta64[D]")
+    gaps = rng.integers(21, 40, total)
+    # Days since the user's first log: running sum of gaps, restarted per user
+    before = np.cumsum(gaps) - gaps
+    before -= before[offsets[group]]
+    starts = first[group] + before.astype("timedelta64[D]")
+    ends = starts + rng.integers(2, 8, total).astype("timedelta64[D]")
+
+    ones = np.ones(n_users, dtype=bool)
+    return Cohort(
+        user_ids=np.arange(1, n_users + 1, dtype=np.int64),
+        default_cycle=np.full(n_users, 28, dtype=np.int64),
+        default_period=np.full(n_users, 5, dtype=np.int64),
+        first_period_start=np.where(rng.random(n_users) < 0.5, first, NO_DATE),
+        irregular=rng.random(n_users) < 0.1,
+        pregnancy=rng.random(n_users) < 0.02,
+        show_fertile_window=ones,
+        notify_period=ones,
+        reminder_days_before=rng.integers(1, 4, n_users),
+        notify_period_end=rng.random(n_users) < 0.3,
+        notify_fertile_window=ones,
+        notify_ovulation=ones,
+        offsets=offsets,
+        starts=starts,
+        ends=ends,
+        excluded=rng.random(total) < 0.05,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cohort predictions / due reminders")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--synthetic", type=int, help="Benchmark on N generated users instead of the DB")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.synthetic:
+        cohort = synthetic_cohort(args.synthetic)
+    else:
+        from database import SessionLocal
+
+        with SessionLocal() as db:
+            cohort = load_cohort(db)
+    loaded = time.perf_counter()
+    preds = predict(cohort, today=args.date)
+    predicted = time.perf_counter()
+    due = due_notifications(cohort, preds, args.date)
+    finished = time.perf_counter()
+
+    print(
+        f"{len(cohort)} users, {len(cohort.starts)} period logs: "
+        f"load {loaded - started:.2f}s, predict {predicted - loaded:.2f}s, "
+        f"due {finished - predicted:.2f}s -> {len(due)} reminders for {args.date}"
+    )
+    if not args.synthetic:
+        for user_id, kind, event_date in due:
+            print(user_id, kind, event_date)
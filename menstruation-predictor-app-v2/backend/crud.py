@@ -6,27 +6,28 @@ from datetime import datetime, timedelta
 from models import PasswordResetToken
 
 
+from sqlalchemy import delete, func, insert, inspect, select, update
 from sqlalchemy.orm import Session
 
+import cycle_model
 import models
+import outbox
+import passwords
+import period_io
 import schemas
+import scheduler
+from auth import user_cache
+from predictions import prediction_cache
 
 
-# Password helpers (demo-level; use a stronger approach in production)
+# Password helpers (algorithms and cost settings live in passwords.py)
 
 def hash_password(password: str) -> str:
-    salt = secrets.token_hex(16)
-    h = hashlib.sha256((salt + password).encode("utf-8")).hexdigest()
-    return f"{salt}${h}"
+    return passwords.hash_password(password)
 
 
 def verify_password(password: str, stored: str) -> bool:
-    try:
-        salt, h = stored.split("$", 1)
-    except ValueError:
-        return False
-    new_h = hashlib.sha256((salt + password).encode("utf-8")).hexdigest()
-    return secrets.compare_digest(new_h, h)
+    return passwords.verify(password, stored)[0]
 
 
 # Users
@@ -39,13 +40,16 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
 
-def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
+def create_user(
+    db: Session, user_in: schemas.UserCreate, password_hash: Optional[str] = None
+) -> models.User:
+    """password_hash: precomputed (e.g. on the hashing pool); hashed here if omitted."""
     if get_user_by_email(db, user_in.email):
         raise ValueError("Email already registered")
 
     user = models.User(
         email=user_in.email,
-        password_hash=hash_password(user_in.password),
+        password_hash=password_hash or hash_password(user_in.password),
         age=user_in.age,
         height_cm=user_in.height_cm,
         weight_kg=user_in.weight_kg,
@@ -65,18 +69,42 @@ def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
     # Create default settings & notifications
     settings = models.CycleSettings(user_id=user.id)
     notifications = models.NotificationSettings(user_id=user.id)
+    stats = models.CycleStats(user_id=user.id)
+    length_stats = models.CycleLengthStats(user_id=user.id)
     db.add(settings)
     db.add(notifications)
+    db.add(stats)
+    db.add(length_stats)
+    scheduler.reschedule_user(db, user.id)
     db.commit()
     return user
 
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[models.User]:
     user = get_user_by_email(db, email)
-    if not user:
-        return None
-    if not verify_password(password, user.password_hash):
+    matches, needs_rehash = passwords.verify(password, user.password_hash if user else None)
+    if not matches:
         return None
+    if needs_rehash:
+        store_rehashed_password(db, user, hash_password(password))
+    return user
+
+
+def set_password_hash(db: Session, user: models.User, password_hash: str) -> models.User:
+    """New password: also revokes every token issued before (see auth.py)."""
+    user.password_hash = password_hash
+    user.token_version = (user.token_version or 0) + 1
+    db.commit()
+    db.refresh(user)
+    user_cache.invalidate(user.id)
+    return user
+
+
+def store_rehashed_password(db: Session, user: models.User, password_hash: str) -> models.User:
+    """Same password under current hash settings (login upgrade); tokens stay valid."""
+    user.password_hash = password_hash
+    db.commit()
+    db.refresh(user)
     return user
 
 
@@ -85,6 +113,7 @@ def update_user_profile(db: Session, user: models.User, profile: schemas.UserBas
         setattr(user, field, value)
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user.id)
     return user
 
 
@@ -109,8 +138,11 @@ def upsert_cycle_settings(
     for field, value in data.dict().items():
         setattr(settings, field, value)
 
+    scheduler.reschedule_user(db, user_id)
     db.commit()
     db.refresh(settings)
+    prediction_cache.invalidate(user_id)
+    user_cache.invalidate(user_id)
     return settings
 
 
@@ -135,6 +167,7 @@ def upsert_notification_settings(
     for field, value in data.dict().items():
         setattr(settings, field, value)
 
+    scheduler.reschedule_user(db, user_id)
     db.commit()
     db.refresh(settings)
     return settings
@@ -145,6 +178,8 @@ def upsert_notification_settings(
 def create_period_log(
     db: Session, user_id: int, period_in: schemas.PeriodLogCreate
 ) -> models.PeriodLog:
+    stats = lock_cycle_stats(db, user_id)
+    length_stats = get_or_create_cycle_length_stats(db, user_id)
     period = models.PeriodLog(
         user_id=user_id,
         start_date=period_in.start_date,
@@ -153,8 +188,14 @@ def create_period_log(
         exclude_from_stats=period_in.exclude_from_stats,
     )
     db.add(period)
+    _stats_add(stats, period.start_date, period.end_date, period.exclude_from_stats)
+    if not period.exclude_from_stats and not cycle_model.append_start(length_stats, period.start_date):
+        # Back-dated log: the gaps around it change
+        rebuild_cycle_length_stats(db, user_id)
+    scheduler.reschedule_user(db, user_id)
     db.commit()
     db.refresh(period)
+    prediction_cache.invalidate(user_id)
     return period
 
 
@@ -167,28 +208,249 @@ def list_period_logs(db: Session, user_id: int) -> list[models.PeriodLog]:
     )
 
 
+def import_period_logs(db: Session, user_id: int, rows) -> tuple[int, int]:
+    """
+    Insert validated (row_number, PeriodLogCreate) rows in one transaction.
+    Rows identical to stored logs are skipped; overlaps raise
+    period_io.PeriodImportError. Returns (inserted, duplicates).
+    """
+    PL = models.PeriodLog
+    lock_cycle_stats(db, user_id)
+    existing = db.query(PL.start_date, PL.end_date).filter(PL.user_id == user_id).all()
+    to_insert, duplicates = period_io.check_rows(rows, existing)
+    if not to_insert:
+        return 0, duplicates
+
+    db.execute(insert(PL), [dict(p.dict(), user_id=user_id) for p in to_insert])
+    recompute_cycle_stats(db, user_id)
+    rebuild_cycle_length_stats(db, user_id)
+    scheduler.reschedule_user(db, user_id)
+    db.commit()
+    prediction_cache.invalidate(user_id)
+    return len(to_insert), duplicates
+
+
+def iter_period_rows(db: Session, user_id: int, batch_size: int = 1000):
+    """(start, end, flow_intensity, exclude_from_stats) tuples, fetched batch by batch."""
+    PL = models.PeriodLog
+    return db.execute(
+        select(PL.start_date, PL.end_date, PL.flow_intensity, PL.exclude_from_stats)
+        .where(PL.user_id == user_id)
+        .order_by(PL.start_date.asc())
+        .execution_options(yield_per=batch_size)
+    )
+
+
 def update_period_log(
     db: Session, user_id: int, period_id: int, updates: schemas.PeriodLogUpdate
 ) -> Optional[models.PeriodLog]:
+    stats = lock_cycle_stats(db, user_id)
     period = (
         db.query(models.PeriodLog)
         .filter(
             models.PeriodLog.id == period_id,
             models.PeriodLog.user_id == user_id,
         )
+        .populate_existing()
         .first()
     )
     if not period:
+        db.rollback()
         return None
 
+    before = (period.start_date, period.end_date, period.exclude_from_stats)
+
     data = updates.dict(exclude_unset=True)
     for field, value in data.items():
         setattr(period, field, value)
+
+    after = (period.start_date, period.end_date, period.exclude_from_stats)
+    if after != before:
+        needs_bounds = _stats_remove(stats, *before)
+        _stats_add(stats, *after)
+        if needs_bounds:
+            db.flush()
+            _refresh_stats_bounds(db, stats)
+        rebuild_cycle_length_stats(db, user_id)
+        scheduler.reschedule_user(db, user_id)
+
     db.commit()
     db.refresh(period)
+    prediction_cache.invalidate(user_id)
     return period
 
 
+# Cycle statistics (running totals behind /predictions)
+
+def _period_length(start: date, end: date) -> int:
+    return (end - start).days + 1
+
+
+def _stats_add(stats: models.CycleStats, start: date, end: date, excluded: bool) -> None:
+    stats.period_count += 1
+    if stats.last_period_start is None or start > stats.last_period_start:
+        stats.last_period_start = start
+    if excluded:
+        return
+    stats.included_count += 1
+    stats.period_length_sum += _period_length(start, end)
+    if stats.first_included_start is None or start < stats.first_included_start:
+        stats.first_included_start = start
+    if stats.last_included_start is None or start > stats.last_included_start:
+        stats.last_included_start = start
+
+
+def _stats_remove(stats: models.CycleStats, start: date, end: date, excluded: bool) -> bool:
+    """Subtract one log; returns True if the min/max dates must be re-read."""
+    stats.period_count -= 1
+    needs_bounds = start == stats.last_period_start
+    if not excluded:
+        stats.included_count -= 1
+        stats.period_length_sum -= _period_length(start, end)
+        needs_bounds = needs_bounds or start in (
+            stats.first_included_start, stats.last_included_start
+        )
+    return needs_bounds
+
+
+def _refresh_stats_bounds(db: Session, stats: models.CycleStats) -> None:
+    PL = models.PeriodLog
+    stats.last_period_start = (
+        db.query(func.max(PL.start_date)).filter(PL.user_id == stats.user_id).scalar()
+    )
+    stats.first_included_start, stats.last_included_start = (
+        db.query(func.min(PL.start_date), func.max(PL.start_date))
+        .filter(PL.user_id == stats.user_id, PL.exclude_from_stats.is_(False))
+        .one()
+    )
+
+
+def get_cycle_stats(db: Session, user_id: int) -> Optional[models.CycleStats]:
+    return (
+        db.query(models.CycleStats)
+        .filter(models.CycleStats.user_id == user_id)
+        .first()
+    )
+
+
+def recompute_cycle_stats(db: Session, user_id: int) -> models.CycleStats:
+    """Rebuild a user's stats row from their period logs (no commit)."""
+    stats = get_cycle_stats(db, user_id)
+    if not stats:
+        stats = models.CycleStats(user_id=user_id)
+        db.add(stats)
+    stats.period_count = 0
+    stats.included_count = 0
+    stats.period_length_sum = 0
+    stats.last_period_start = None
+    stats.first_included_start = None
+    stats.last_included_start = None
+    for p in list_period_logs(db, user_id):
+        _stats_add(stats, p.start_date, p.end_date, p.exclude_from_stats)
+    return stats
+
+
+def lock_cycle_stats(db: Session, user_id: int) -> models.CycleStats:
+    """
+    The user's stats row, locked until the transaction ends, so concurrent
+    period writes for one user are applied one after the other instead of
+    overwriting each other's totals. Call before reading anything the write
+    depends on. The no-op UPDATE takes the row lock on PostgreSQL and the
+    write lock on SQLite, which has no SELECT ... FOR UPDATE.
+    """
+    CS = models.CycleStats
+    db.execute(
+        update(CS)
+        .where(CS.user_id == user_id)
+        .values(period_count=CS.period_count)
+        .execution_options(synchronize_session=False)
+    )
+    stats = db.query(CS).filter(CS.user_id == user_id).populate_existing().first()
+    return stats or recompute_cycle_stats(db, user_id)
+
+
+def get_cycle_length_stats(db: Session, user_id: int) -> Optional[models.CycleLengthStats]:
+    return (
+        db.query(models.CycleLengthStats)
+        .filter(models.CycleLengthStats.user_id == user_id)
+        .first()
+    )
+
+
+def rebuild_cycle_length_stats(db: Session, user_id: int) -> models.CycleLengthStats:
+    """Recompute a user's cycle-length statistics from their included starts (no commit)."""
+    length_stats = get_cycle_length_stats(db, user_id)
+    if not length_stats:
+        length_stats = models.CycleLengthStats(user_id=user_id)
+        db.add(length_stats)
+    db.flush()
+    PL = models.PeriodLog
+    starts = [
+        start for (start,) in
+        db.query(PL.start_date)
+        .filter(PL.user_id == user_id, PL.exclude_from_stats.is_(False))
+        .order_by(PL.start_date.asc())
+    ]
+    cycle_model.rebuild(length_stats, starts)
+    return length_stats
+
+
+def get_or_create_cycle_length_stats(db: Session, user_id: int) -> models.CycleLengthStats:
+    return get_cycle_length_stats(db, user_id) or rebuild_cycle_length_stats(db, user_id)
+
+
+def _prediction_inputs_query():
+    return (
+        select(models.CycleSettings, models.CycleStats, models.CycleLengthStats)
+        .outerjoin(models.CycleStats, models.CycleStats.user_id == models.CycleSettings.user_id)
+        .outerjoin(
+            models.CycleLengthStats,
+            models.CycleLengthStats.user_id == models.CycleSettings.user_id,
+        )
+    )
+
+
+def get_prediction_inputs(db: Session, user_id: int):
+    """
+    (settings, stats, length_stats) for a user in one query; all None if
+    the user has no settings row. The stats rows are None for users not yet
+    backfilled.
+    """
+    row = db.execute(
+        _prediction_inputs_query().where(models.CycleSettings.user_id == user_id)
+    ).first()
+    return tuple(row) if row else (None, None, None)
+
+
+def backfill_cycle_stats(db: Session, batch_size: int = 500) -> int:
+    """Create stats rows for users that have none (e.g. after upgrading)."""
+    missing = [
+        user_id for (user_id,) in
+        db.query(models.User.id)
+        .outerjoin(models.CycleStats, models.CycleStats.user_id == models.User.id)
+        .filter(models.CycleStats.id.is_(None))
+        .all()
+    ]
+    for i, user_id in enumerate(missing, 1):
+        recompute_cycle_stats(db, user_id)
+        if i % batch_size == 0:
+            db.commit()
+
+    missing_lengths = [
+        user_id for (user_id,) in
+        db.query(models.User.id)
+        .outerjoin(models.CycleLengthStats, models.CycleLengthStats.user_id == models.User.id)
+        .filter(models.CycleLengthStats.id.is_(None))
+        .all()
+    ]
+    for i, user_id in enumerate(missing_lengths, 1):
+        rebuild_cycle_length_stats(db, user_id)
+        if i % batch_size == 0:
+            db.commit()
+    db.commit()
+    return len(missing) + len(missing_lengths)
+
+
 # Export / delete
 
 def delete_user_and_data(db: Session, user_id: int) -> None:
@@ -197,21 +459,30 @@ def delete_user_and_data(db: Session, user_id: int) -> None:
         return
     db.delete(user)
     db.commit()
+    prediction_cache.invalidate(user_id)
+    user_cache.invalidate(user_id)
+
+
+def reset_token_hash(token: str) -> bytes:
+    # The token is 256 random bits, so a plain SHA-256 is enough
+    return hashlib.sha256(token.encode("utf-8")).digest()
 
 
-def create_password_reset_token(db: Session, user: models.User, ttl_minutes: int = 30) -> PasswordResetToken:
+def create_password_reset_token(db: Session, user: models.User, ttl_minutes: int = 30) -> str:
+    """
+    Add a new reset token's hash and return the token itself (for the
+    email). No commit: the caller commits it together with the email.
+    """
     token = secrets.token_urlsafe(32)
     expires_at = datetime.utcnow() + timedelta(minutes=ttl_minutes)
     prt = PasswordResetToken(
         user_id=user.id,
-        token=token,
+        token_hash=reset_token_hash(token),
         expires_at=expires_at,
         used=False,
     )
     db.add(prt)
-    db.commit()
-    db.refresh(prt)
-    return prt
+    return token
 
 
 def get_valid_reset_token(db: Session, token: str) -> Optional[PasswordResetToken]:
@@ -219,7 +490,7 @@ def get_valid_reset_token(db: Session, token: str) -> Optional[PasswordResetToke
     return (
         db.query(PasswordResetToken)
         .filter(
-            PasswordResetToken.token == token,
+            PasswordResetToken.token_hash == reset_token_hash(token),
             PasswordResetToken.used.is_(False),
             PasswordResetToken.expires_at > now,
         )
@@ -227,12 +498,77 @@ def get_valid_reset_token(db: Session, token: str) -> Optional[PasswordResetToke
     )
 
 
+def purge_reset_tokens(db: Session, now: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    """
+    Delete expired (including used) reset tokens in batches of batch_size,
+    one commit each, so the write lock is never held for long. Returns the
+    number deleted.
+    """
+    now = now or datetime.utcnow()
+    deleted = 0
+    while True:
+        batch = (
+            select(PasswordResetToken.id)
+            .where(PasswordResetToken.expires_at <= now)
+            .limit(batch_size)
+        )
+        count = db.execute(
+            delete(PasswordResetToken).where(PasswordResetToken.id.in_(batch.scalar_subquery()))
+        ).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def drop_plaintext_reset_tokens(bind) -> bool:
+    """
+    Reset tokens used to be stored in plain text. They only live for 30
+    minutes, so an old table is dropped (for create_all to recreate)
+    rather than migrated. Returns True if it was.
+    """
+    inspector = inspect(bind)
+    if not inspector.has_table(PasswordResetToken.__tablename__):
+        return False
+    columns = {c["name"] for c in inspector.get_columns(PasswordResetToken.__tablename__)}
+    if "token_hash" in columns:
+        return False
+    PasswordResetToken.__table__.drop(bind)
+    return True
+
+
+def add_token_version_column(bind) -> bool:
+    """
+    users.token_version was added after the table; create_all() does not
+    alter existing tables, so add the column (0 for everyone) if missing.
+    Returns True if it was added.
+    """
+    inspector = inspect(bind)
+    if not inspector.has_table(models.User.__tablename__):
+        return False
+    columns = {c["name"] for c in inspector.get_columns(models.User.__tablename__)}
+    if "token_version" in columns:
+        return False
+    with bind.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0")
+    return True
+
+
+def queue_email(db: Session, email) -> None:
+    """
+    Store an email in the outbox, committing it with whatever else the
+    session holds, and wake the sender; returns without sending.
+    """
+    outbox.enqueue(db, email)
+    db.commit()
+    outbox.wake()
+
+
 def mark_reset_token_used(db: Session, prt: PasswordResetToken) -> None:
     prt.used = True
+    prt.expires_at = datetime.utcnow()  # due for purge_reset_tokens right away
     db.commit()
 
 def set_user_password(db: Session, user: models.User, new_password: str) -> models.User:
-    user.password_hash = hash_password(new_password)
-    db.commit()
-    db.refresh(user)
-    return user
+    return set_password_hash(db, user, hash_password(new_password))
+
@@ -0,0 +1,198 @@
+# backend/cycle_model.py
+"""
+Statistical cycle-length models and prediction intervals.
+
+Running statistics live in models.CycleLengthStats and are updated in O(1)
+per appended cycle (push_cycle): a Welford mean/variance over all cycles,
+an exponentially weighted mean/variance, and a short window of recent
+cycle lengths for the robust estimate. Models (PREDICTION_MODEL):
+
+- "mean":   plain average of all cycles (the original behaviour; the point
+            prediction is exactly the one from predictions.average_lengths)
+- "ewma":   exponentially weighted mean, so recent cycles count more
+- "robust": median of the recent window after dropping cycles more than
+            OUTLIER_MADS scaled MADs from it (e.g. a missed log that
+            doubles one cycle)
+
+Every model also reports a standard deviation, turned into an interval for
+the next period start and the fertile window. Users in irregular cycle
+mode get the wider IRREGULAR_COVERAGE interval. Compare models offline
+with evaluate_models.py.
+"""
+import math
+import os
+import statistics
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+import schemas
+from predictions import FERTILE_WINDOW_HALF_WIDTH, OVULATION_BEFORE_NEXT_PERIOD, build_prediction
+
+MODELS = ("mean", "ewma", "robust")
+PREDICTION_MODEL = os.environ.get("PREDICTION_MODEL", "mean")
+
+EWMA_ALPHA = 0.3
+WINDOW = 12
+OUTLIER_MADS = 3.0
+MAD_TO_SD = 1.4826  # MAD -> standard deviation for normal data
+PRIOR_SD = 3.0  # days; used until a user has enough cycles
+MIN_SD = 1.0
+
+COVERAGE = 0.8
+IRREGULAR_COVERAGE = 0.95
+Z_SCORES = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.96}
+
+
+@dataclass
+class Estimate:
+    model: str
+    cycle_length: Optional[float]  # None: no cycles yet, keep the settings default
+    sd: float
+    n: int
+
+
+# Running statistics ----------------------------------------------------
+
+def reset(stats) -> None:
+    stats.n = 0
+    stats.mean = 0.0
+    stats.m2 = 0.0
+    stats.ewma = None
+    stats.ewvar = 0.0
+    stats.recent = ""
+    stats.last_start = None
+
+
+def recent_window(stats) -> list[int]:
+    return [int(x) for x in stats.recent.split(",") if x] if stats.recent else []
+
+
+def push_cycle(stats, length: int) -> None:
+    """Add one cycle length; O(1) (the window is bounded by WINDOW)."""
+    stats.n = (stats.n or 0) + 1
+    delta = length - (stats.mean or 0.0)
+    stats.mean = (stats.mean or 0.0) + delta / stats.n
+    stats.m2 = (stats.m2 or 0.0) + delta * (length - stats.mean)
+
+    if stats.ewma is None:
+        stats.ewma, stats.ewvar = float(length), 0.0
+    else:
+        diff = length - stats.ewma
+        incr = EWMA_ALPHA * diff
+        stats.ewma += incr
+        stats.ewvar = (1 - EWMA_ALPHA) * ((stats.ewvar or 0.0) + diff * incr)
+
+    window = recent_window(stats)[-(WINDOW - 1):] + [length]
+    stats.recent = ",".join(str(x) for x in window)
+
+
+def append_start(stats, start: date) -> bool:
+    """
+    Extend the statistics with a newer included period start. Returns False
+    (nothing changed) if start is not after the last one; rebuild() then.
+    """
+    if stats.last_start is None:
+        stats.last_start = start
+        return True
+    if start < stats.last_start:
+        return False
+    push_cycle(stats, (start - stats.last_start).days)
+    stats.last_start = start
+    return True
+
+
+def rebuild(stats, included_starts: list[date]) -> None:
+    """Recompute from the sorted start dates of included periods."""
+    reset(stats)
+    for start in included_starts:
+        append_start(stats, start)
+
+
+# Estimates and intervals -------------------------------------------------
+
+def _robust(window: list[int]):
+    med = statistics.median(window)
+    mad = statistics.median(abs(x - med) for x in window)
+    if mad == 0:
+        inliers = [x for x in window if abs(x - med) <= 1] or window
+    else:
+        inliers = [x for x in window if abs(x - med) <= OUTLIER_MADS * MAD_TO_SD * mad]
+    centre = statistics.median(inliers)
+    spread = statistics.stdev(inliers) if len(inliers) > 1 else PRIOR_SD
+    # Rejected cycles still happen; don't let the interval shrink below the MAD
+    return centre, max(spread, MAD_TO_SD * mad)
+
+
+def estimate(stats, model: str = PREDICTION_MODEL) -> Estimate:
+    n = (stats.n or 0) if stats is not None else 0
+    if n == 0:
+        return Estimate(model, None, PRIOR_SD, 0)
+
+    if model == "ewma":
+        centre, sd = stats.ewma, math.sqrt(stats.ewvar or 0.0)
+    elif model == "robust":
+        centre, sd = _robust(recent_window(stats))
+    else:
+        centre, sd = stats.mean, math.sqrt(stats.m2 / (n - 1)) if n > 1 else PRIOR_SD
+
+    if n < 3:
+        # Two cycles say little about spread; lean on the prior
+        sd = max(sd, PRIOR_SD)
+    # Predictive spread: next cycle's variance plus the estimate's own
+    sd *= math.sqrt(1 + 1 / n)
+    return Estimate(model, centre, max(sd, MIN_SD), n)
+
+
+def interval_half_width(sd: float, coverage: float) -> int:
+    """Days either side of a predicted date for the given coverage."""
+    return max(1, int(math.ceil(Z_SCORES[coverage] * sd)))
+
+
+def model_cycle_length(cycle_length: int, length_stats, model: str = PREDICTION_MODEL) -> int:
+    """
+    The cycle length to predict with: the model's estimate, or cycle_length
+    (the predictions.average_lengths() value) for "mean" and for users
+    without cycles yet. Shared by /predictions, the scheduler and cohort.py.
+    """
+    if model == "mean":
+        return cycle_length
+    est = estimate(length_stats, model)
+    return cycle_length if est.cycle_length is None else int(round(est.cycle_length))
+
+
+def predict(
+    settings,
+    cycle_length: int,
+    period_length: int,
+    last_period_start: date,
+    length_stats,
+    today: Optional[date] = None,
+    model: str = PREDICTION_MODEL,
+) -> schemas.PredictionResponse:
+    """
+    build_prediction() with the configured model's cycle length and
+    prediction intervals. cycle_length / period_length / last_period_start
+    come from predictions.cycle_stats*(); the "mean" model keeps them.
+    """
+    est = estimate(length_stats, model)
+    cycle_length = model_cycle_length(cycle_length, length_stats, model)
+
+    response = build_prediction(settings, cycle_length, period_length, last_period_start, today=today)
+
+    coverage = IRREGULAR_COVERAGE if settings.irregular_cycle_mode else COVERAGE
+    half_width = interval_half_width(est.sd, coverage)
+    ovulation_offset = cycle_length - OVULATION_BEFORE_NEXT_PERIOD
+
+    response.prediction_model = model
+    response.cycle_length_sd = round(est.sd, 2)
+    response.interval_coverage = coverage
+    response.next_period_start_earliest = response.next_period_start - timedelta(days=half_width)
+    response.next_period_start_latest = response.next_period_start + timedelta(days=half_width)
+    response.fertile_window_earliest = last_period_start + timedelta(
+        days=ovulation_offset - FERTILE_WINDOW_HALF_WIDTH - half_width
+    )
+    response.fertile_window_latest = last_period_start + timedelta(
+        days=ovulation_offset + FERTILE_WINDOW_HALF_WIDTH + half_width
+    )
+    return response
@@ -1,11 +1,104 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./cycle_app.db"
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./cycle_app.db")
+
+# USE_ASYNC_DB=1 serves the data endpoints with async handlers on an
+# AsyncEngine (aiosqlite locally, asyncpg for postgresql URLs).
+USE_ASYNC_DB = os.environ.get("USE_ASYNC_DB", "").lower() in ("1", "true", "yes")
+
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# SQLite production profile (SQLITE_TUNING=0 turns it off, e.g. to compare):
+# WAL so readers don't block on the writer, synchronous=NORMAL (durable
+# across app crashes; the last commits may roll back on power loss),
+# memory-mapped reads, a larger page cache and a busy timeout instead of
+# immediate "database is locked" errors.
+SQLITE_TUNING = os.environ.get("SQLITE_TUNING", "1").lower() not in ("0", "false", "no")
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # KiB, i.e. 64 MiB per connection
+    "busy_timeout": 5000,  # ms
+    "temp_store": "MEMORY",
+}
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", 40))
+
+
+def _apply_sqlite_pragmas(engine, read_only=False):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            if read_only and name == "journal_mode":
+                continue  # set once by the writer; persistent in the file
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def _make_engine(pool_size, read_only=False):
+    if not IS_SQLITE:
+        return create_engine(SQLALCHEMY_DATABASE_URL, pool_size=pool_size, max_overflow=pool_size)
+    if not SQLITE_TUNING:
+        return create_engine(
+            SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+        )
+    new_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": 5},
+        pool_size=pool_size,
+        max_overflow=pool_size,
+        pool_timeout=10,
+    )
+    _apply_sqlite_pragmas(new_engine, read_only=read_only)
+    return new_engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+engine = _make_engine(DB_POOL_SIZE)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Separate pool for GET endpoints. With WAL these connections read
+# concurrently with the writer; query_only=ON makes accidental writes fail.
+read_engine = _make_engine(DB_READ_POOL_SIZE, read_only=True) if IS_SQLITE and SQLITE_TUNING else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync URL onto its async driver (sqlite -> aiosqlite, postgresql -> asyncpg)."""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_sessionmaker():
+    """AsyncSession factory, created on first use so sync mode never needs aiosqlite."""
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(
+            os.environ.get("ASYNC_DATABASE_URL") or async_database_url(SQLALCHEMY_DATABASE_URL)
+        )
+        if IS_SQLITE and SQLITE_TUNING:
+            _apply_sqlite_pragmas(_async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker
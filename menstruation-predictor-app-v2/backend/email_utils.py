@@ -1,8 +1,26 @@
 # backend/email_utils.py
+"""
+Email messages and transports.
+
+Emails are not sent from request handlers: they go to the outbox
+(outbox.py), whose worker hands them to a transport. Pick one with
+EMAIL_TRANSPORT:
+
+- "gmail" (default): Gmail API with the service account below. The
+  authenticated service is built once and reused for every send.
+- "smtp:<host>:<port>": plain SMTP, e.g. a local debugging server
+  (`python -m aiosmtpd -n -l localhost:8025`)
+- "file:<path>": append one JSON line per email (handy in tests)
+- "console": print them
+"""
 import base64
+import json
+import os
+import smtplib
+import threading
+from dataclasses import asdict, dataclass
 from email.mime.text import MIMEText
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from typing import Optional
 
 
 # You must create a Google Cloud project + service account with Gmail API enabled,
@@ -12,19 +30,14 @@ GMAIL_SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
 GMAIL_SENDER = "your-sender-email@gmail.com"  # must be allowed / delegated
 
 
-def get_gmail_service():
-  creds = service_account.Credentials.from_service_account_file(
-      SERVICE_ACCOUNT_FILE,
-      scopes=GMAIL_SCOPES,
-  )
-  # For domain-wide delegation, you may need: creds = creds.with_subject(GMAIL_SENDER)
-  service = build("gmail", "v1", credentials=creds)
-  return service
-
+@dataclass
+class Email:
+  to: str
+  subject: str
+  body: str
 
-def send_password_reset_email(to_email: str, reset_link: str):
-  service = get_gmail_service()
 
+def password_reset_email(to_email: str, reset_link: str) -> Email:
   body = f"""
 Hi there,
 
@@ -39,13 +52,102 @@ If you didn't request this, you can safely ignore this email.
 Love,
 PinkCycle 🩷
 """
+  return Email(to=to_email, subject="PinkCycle password reset", body=body)
+
 
-  message = MIMEText(body)
-  message["to"] = to_email
+def mime_message(email: Email) -> MIMEText:
+  message = MIMEText(email.body)
+  message["to"] = email.to
   message["from"] = GMAIL_SENDER
-  message["subject"] = "PinkCycle password reset"
+  message["subject"] = email.subject
+  return message
+
+
+class EmailTransport:
+  def send(self, email: Email) -> None:
+    raise NotImplementedError
+
+  def close(self) -> None:
+    pass
+
+
+class GmailTransport(EmailTransport):
+  def __init__(self):
+    self._service = None
+    self._lock = threading.Lock()
+
+  def get_service(self):
+    """Credentials and discovery are loaded once, on the first send."""
+    with self._lock:
+      if self._service is None:
+        # Imported here: the Google API client is slow to import and only
+        # needed when an email is actually sent
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
+        creds = service_account.Credentials.from_service_account_file(
+            SERVICE_ACCOUNT_FILE,
+            scopes=GMAIL_SCOPES,
+        )
+        # For domain-wide delegation, you may need: creds = creds.with_subject(GMAIL_SENDER)
+        self._service = build("gmail", "v1", credentials=creds, cache_discovery=False)
+      return self._service
+
+  def send(self, email):
+    encoded_message = base64.urlsafe_b64encode(mime_message(email).as_bytes()).decode()
+    self.get_service().users().messages().send(userId="me", body={"raw": encoded_message}).execute()
+
+
+class SmtpTransport(EmailTransport):
+  """Keeps one SMTP connection open between sends; reconnects after an error."""
+
+  def __init__(self, host: str, port: int):
+    self.host = host
+    self.port = port
+    self._smtp = None
+
+  def send(self, email):
+    if self._smtp is None:
+      self._smtp = smtplib.SMTP(self.host, self.port, timeout=10)
+    try:
+      self._smtp.send_message(mime_message(email))
+    except Exception:
+      self.close()
+      raise
+
+  def close(self):
+    if self._smtp is not None:
+      try:
+        self._smtp.quit()
+      except (smtplib.SMTPException, OSError):
+        pass
+      self._smtp = None
+
+
+class FileTransport(EmailTransport):
+  def __init__(self, path: str):
+    self.path = path
+    self._lock = threading.Lock()
+
+  def send(self, email):
+    with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+      fh.write(json.dumps(asdict(email)) + "\n")
+
+
+class ConsoleTransport(EmailTransport):
+  def send(self, email):
+    print(f"Email to {email.to}: {email.subject}\n{email.body}")
 
-  encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-  send_body = {"raw": encoded_message}
 
-  service.users().messages().send(userId="me", body=send_body).execute()
+def get_transport(spec: Optional[str] = None) -> EmailTransport:
+  spec = spec or os.environ.get("EMAIL_TRANSPORT", "gmail")
+  if spec == "gmail":
+    return GmailTransport()
+  if spec == "console":
+    return ConsoleTransport()
+  if spec.startswith("file:"):
+    return FileTransport(spec[len("file:"):])
+  if spec.startswith("smtp:"):
+    host, _, port = spec[len("smtp:"):].rpartition(":")
+    return SmtpTransport(host or "localhost", int(port))
+  raise ValueError(f"Unknown email transport: {spec}")
@@ -0,0 +1,132 @@
+# backend/evaluate_models.py
+"""
+Offline comparison of the cycle prediction models in cycle_model.py.
+
+Each user's history is replayed in order: after every logged start the
+running statistics are updated exactly as crud does (cycle_model.
+append_start), each model predicts the next start, and the prediction is
+scored against the start that actually followed.
+
+    python evaluate_models.py --synthetic 2000          # generated histories
+    python evaluate_models.py --db                      # replay the database
+    python evaluate_models.py --synthetic 2000 --coverage 0.95
+
+Reported per model: mean absolute error and RMSE in days, share of
+predictions within +/-2 days, how often the real start fell inside the
+prediction interval, and the mean interval width.
+"""
+import argparse
+import math
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+import cycle_model
+
+DEFAULT_CYCLE_LENGTH = 28  # CycleSettings.average_cycle_length default
+
+
+@dataclass
+class Score:
+    errors: list = field(default_factory=list)
+    covered: int = 0
+    width: int = 0
+
+    def add(self, error: int, half_width: int) -> None:
+        self.errors.append(error)
+        self.covered += abs(error) <= half_width
+        self.width += 2 * half_width + 1
+
+    def row(self, model: str) -> str:
+        err = np.abs(np.array(self.errors, dtype=float))
+        n = len(err)
+        if not n:
+            return f"{model:<8} (no predictions)"
+        return (
+            f"{model:<8} {err.mean():6.2f} {math.sqrt((err ** 2).mean()):6.2f} "
+            f"{(err <= 2).mean():8.1%} {self.covered / n:9.1%} {self.width / n:7.1f} {n:8d}"
+        )
+
+
+def synthetic_histories(n_users: int, seed: int = 0) -> list[list[date]]:
+    """
+    Included period starts per user: each user has their own mean and
+    spread, a slow drift, occasional outlier cycles and missed logs (a gap
+    that spans two cycles).
+    """
+    rng = np.random.default_rng(seed)
+    histories = []
+    for _ in range(n_users):
+        mean = rng.normal(29, 2.5)
+        sd = rng.uniform(0.8, 5.0)
+        drift = rng.normal(0, 0.15)
+        start = date(2022, 1, 1) + timedelta(days=int(rng.integers(0, 60)))
+        starts = [start]
+        for i in range(int(rng.integers(4, 25))):
+            length = rng.normal(mean + drift * i, sd)
+            if rng.random() < 0.05:
+                length += rng.choice((-1, 1)) * rng.uniform(8, 15)  # unusual cycle
+            if rng.random() < 0.05:
+                length += rng.normal(mean, sd)  # missed log
+            start += timedelta(days=max(15, int(round(length))))
+            starts.append(start)
+        histories.append(starts)
+    return histories
+
+
+def db_histories() -> list[list[date]]:
+    from database import SessionLocal
+    import models
+
+    PL = models.PeriodLog
+    histories: dict[int, list[date]] = {}
+    with SessionLocal() as db:
+        rows = (
+            db.query(PL.user_id, PL.start_date)
+            .filter(PL.exclude_from_stats.is_(False))
+            .order_by(PL.user_id, PL.start_date)
+        )
+        for user_id, start in rows:
+            histories.setdefault(user_id, []).append(start)
+    return list(histories.values())
+
+
+def evaluate(histories: list[list[date]], coverage: float = cycle_model.COVERAGE,
+             models=cycle_model.MODELS) -> dict[str, Score]:
+    scores = {model: Score() for model in models}
+    for starts in histories:
+        stats = SimpleNamespace()
+        cycle_model.reset(stats)
+        for start, actual in zip(starts, starts[1:]):
+            cycle_model.append_start(stats, start)
+            for model in models:
+                est = cycle_model.estimate(stats, model)
+                length = DEFAULT_CYCLE_LENGTH if est.cycle_length is None else int(round(est.cycle_length))
+                predicted = start + timedelta(days=length)
+                scores[model].add(
+                    (actual - predicted).days, cycle_model.interval_half_width(est.sd, coverage)
+                )
+    return scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare cycle prediction models")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--synthetic", type=int, metavar="USERS", help="Evaluate on N generated users")
+    source.add_argument("--db", action="store_true", help="Replay the histories in DATABASE_URL")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--coverage", type=float, default=cycle_model.COVERAGE,
+        choices=sorted(cycle_model.Z_SCORES),
+    )
+    args = parser.parse_args()
+
+    histories = synthetic_histories(args.synthetic, args.seed) if args.synthetic else db_histories()
+    scores = evaluate(histories, args.coverage)
+
+    print(f"{len(histories)} users, nominal interval coverage {args.coverage:.0%}")
+    print(f"{'model':<8} {'MAE':>6} {'RMSE':>6} {'<=2 days':>8} {'coverage':>9} {'width':>7} {'n':>8}")
+    for model, score in scores.items():
+        print(score.row(model))
@@ -0,0 +1,170 @@
+# backend/exporter.py
+"""
+Streaming data export.
+
+Rows are read through yield_per cursors and serialized batch by batch,
+so memory stays flat however many period logs an account has. Two
+layouts:
+
+- iter_json():  one JSON document shaped like schemas.ExportBundle
+- iter_zip():   a zip with one NDJSON file per table (user, cycle_settings,
+                notification_settings, periods), built on the fly
+
+Either can be wrapped in gzip_chunks(). Callers open the session with
+begin_snapshot() so all reads for one export happen in one transaction and
+the export is a consistent snapshot. The same code exports every user at once for the admin job:
+
+    python exporter.py --all export-all.zip
+    python exporter.py --user 12 --format json --gzip > user-12.json.gz
+"""
+import argparse
+import io
+import json
+import sys
+import zipfile
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+
+BATCH_SIZE = 1000
+
+# (name, model, response schema, column matched against the user id)
+TABLES = (
+    ("user", models.User, schemas.UserProfile, models.User.id),
+    ("cycle_settings", models.CycleSettings, schemas.CycleSettingsResponse,
+     models.CycleSettings.user_id),
+    ("notification_settings", models.NotificationSettings, schemas.NotificationSettingsResponse,
+     models.NotificationSettings.user_id),
+    ("periods", models.PeriodLog, schemas.PeriodLogResponse, models.PeriodLog.user_id),
+)
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(row: dict) -> str:
+    return json.dumps(row, default=_json_default)
+
+
+def begin_snapshot(db: Session) -> None:
+    """
+    Start the session's read transaction explicitly. pysqlite only issues
+    BEGIN before writes, so on SQLite every SELECT would otherwise see the
+    database as of that statement; other drivers already run the whole
+    session in one transaction.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        db.connection().exec_driver_sql("BEGIN")
+
+
+def iter_rows(db: Session, model, schema, user_column, user_id: Optional[int] = None,
+              batch_size: int = BATCH_SIZE) -> Iterator[list[dict]]:
+    """
+    Batches of dicts with the schema's fields, read straight from the
+    columns (no ORM objects). user_id=None reads the whole table.
+    """
+    fields = list(schema.model_fields)
+    query = select(*(getattr(model, f) for f in fields)).order_by(model.id)
+    if user_id is not None:
+        query = query.where(user_column == user_id)
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield [dict(zip(fields, row)) for row in partition]
+
+
+def iter_json(db: Session, user_id: int) -> Iterator[str]:
+    """schemas.ExportBundle as JSON text, one chunk per batch of periods."""
+    head = {}
+    for name, model, schema, column in TABLES[:-1]:
+        rows = [row for batch in iter_rows(db, model, schema, column, user_id) for row in batch]
+        head[name] = rows[0] if rows else None
+    yield dumps(head)[:-1] + ', "periods": ['
+
+    _, model, schema, column = TABLES[-1]
+    separator = ""
+    for batch in iter_rows(db, model, schema, column, user_id):
+        yield separator + ", ".join(dumps(row) for row in batch)
+        separator = ", "
+    yield "]}"
+
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable file object that collects what ZipFile writes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(db: Session, user_id: Optional[int] = None) -> Iterator[bytes]:
+    """Zip of <table>.ndjson files for one user, or for everyone if user_id is None."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, model, schema, column in TABLES:
+            # force_zip64: sizes are unknown up front when streaming
+            with zf.open(f"{name}.ndjson", "w", force_zip64=True) as fh:
+                for batch in iter_rows(db, model, schema, column, user_id):
+                    fh.write("".join(dumps(row) + "\n" for row in batch).encode("utf-8"))
+                    data = sink.drain()
+                    if data:
+                        yield data
+    yield sink.drain()
+
+
+def gzip_chunks(chunks: Iterable, level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export PinkCycle data")
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument("--user", type=int, help="Export one user")
+    who.add_argument("--all", action="store_true", help="Export every user (zip only)")
+    parser.add_argument("--format", choices=("json", "ndjson-zip"), default="ndjson-zip")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("output", nargs="?", help="Output file (default: stdout)")
+    args = parser.parse_args()
+    if args.all and args.format == "json":
+        parser.error("--all only supports --format ndjson-zip")
+
+    from database import ReadSessionLocal
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    with ReadSessionLocal() as db:
+        begin_snapshot(db)
+        if args.format == "json":
+            chunks = iter_json(db, args.user)
+        else:
+            chunks = iter_zip(db, None if args.all else args.user)
+        if args.gzip:
+            chunks = gzip_chunks(chunks)
+        for chunk in chunks:
+            out.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+    out.flush()
+    if args.output:
+        out.close()
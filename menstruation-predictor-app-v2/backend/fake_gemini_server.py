@@ -0,0 +1,92 @@
+# backend/fake_gemini_server.py
+"""
+Tiny local stand-in for the Gemini API, for trying the AI endpoints offline.
+
+    python fake_gemini_server.py --port 8765 --delay 0.05
+
+then start the API with:
+
+    GOOGLE_AI_API_KEY=fake GOOGLE_AI_API_BASE=http://127.0.0.1:8765 uvicorn main:app
+
+Handles `:generateContent` and `:streamGenerateContent?alt=sse`; the
+streamed answer arrives one word every `--delay` seconds, and the
+non-streamed one after the same total time. `requests` counts the calls
+(bench_faq.py reads it to check how many questions reached the model).
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_ANSWER = (
+    "Cycles between 21 and 35 days are common, and they can vary a little "
+    "from month to month. If something feels off, please talk to a doctor. 💕"
+)
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    delay = 0.05
+    requests = 0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _event(self, text, final=False):
+        event = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+        if final:
+            event["candidates"][0]["finishReason"] = "STOP"
+        return event
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        path = self.path.split("?", 1)[0]
+        FakeGeminiHandler.requests += 1
+        words = FAKE_ANSWER.split(" ")
+
+        if path.endswith(":generateContent"):
+            time.sleep(self.delay * len(words))
+            body = json.dumps(self._event(FAKE_ANSWER, final=True)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if not path.endswith(":streamGenerateContent"):
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            text = word if i == 0 else " " + word
+            event = self._event(text, final=(i == len(words) - 1))
+            self._write_chunk(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+            time.sleep(self.delay)
+        self._write_chunk(b"")
+
+
+def make_server(port=8765, delay=0.05, host="127.0.0.1"):
+    handler = type("Handler", (FakeGeminiHandler,), {"delay": delay})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Gemini API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.delay, args.host)
+    print(f"Fake Gemini listening on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,404 @@
+# backend/faq.py
+"""
+FAQ answering without a model call where possible.
+
+/ai/faq asks, in order:
+
+1. CANNED_ANSWERS: reviewed answers to the most common questions, served
+   to everyone without touching Gemini.
+2. faq_cache: earlier model answers, keyed by the app context (the user's
+   goal etc.) and the normalized question. normalize() lowercases, drops
+   punctuation and stopwords, strips plural "s" and sorts the words, so
+   "Is a 35-day cycle normal?" and "is 35 day cycles normal" share a key.
+3. If the key is new, a TF-IDF cosine match over the stored questions
+   (FAQ_SIMILARITY, default 0.8) catches rephrasings. A match must contain
+   the same numbers, negations and medical qualifiers (QUALIFIERS), so
+   "21-day cycle" never gets the "35-day cycle" answer and "normal cycle
+   while breastfeeding" never gets the general "normal cycle" one. This
+   applies to the canned answers too.
+4. Gemini, at most FAQ_RATE_PER_MINUTE calls per user (or client IP when
+   signed out) with bursts of FAQ_RATE_BURST. Canned and cached answers do
+   not count against the limit.
+
+faq_metrics counts each source and keeps recent latencies for
+GET /ai/faq/metrics. Everything is per process, like the prediction
+cache. bench_faq.py replays a question mix against fake_gemini_server.py.
+"""
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Optional
+
+FAQ_CACHE_SIZE = int(os.environ.get("FAQ_CACHE_SIZE", 2000))
+FAQ_CACHE_TTL = float(os.environ.get("FAQ_CACHE_TTL", 24 * 3600))  # seconds
+FAQ_SIMILARITY = float(os.environ.get("FAQ_SIMILARITY", 0.8))
+FAQ_RATE_PER_MINUTE = float(os.environ.get("FAQ_RATE_PER_MINUTE", 10))
+FAQ_RATE_BURST = int(os.environ.get("FAQ_RATE_BURST", 5))
+
+STOPWORDS = frozenset("""
+a about am an and any are as at be been being but by can could did do does doing for
+from get got had has have having how i if in into is it its me my myself of on or our
+please should so some than that the their them then there these they this those to
+too us was we were what when where which while who why will with would you your
+""".split())
+NEGATIONS = frozenset({"no", "not", "never", "without", "dont", "cant", "isnt", "doesnt"})
+# Word stems that change the medical answer; "pregnan" covers pregnant/pregnancy
+QUALIFIERS = (
+    "pregnan", "breastfe", "nursing", "postpartum", "birth", "miscarr", "abortion",
+    "pill", "contracept", "iud", "implant", "injection", "hormon", "medication", "antibiotic",
+    "menopaus", "perimenopaus", "pcos", "endometrio", "thyroid", "diabet", "teen", "surgery",
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokens(question: str) -> list[str]:
+    words = []
+    for word in _WORD.findall(question.lower().replace("'", "")):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def normalize(question: str) -> str:
+    """Cache key: the question's distinct content words, sorted."""
+    return " ".join(sorted(set(tokens(question))))
+
+
+def _qualifier(word: str) -> Optional[str]:
+    return next((stem for stem in QUALIFIERS if word.startswith(stem)), None)
+
+
+def _guard(words) -> frozenset:
+    """What a similar question must share exactly: numbers, negations and qualifier stems."""
+    guard = set()
+    for w in words:
+        if w.isdigit() or w in NEGATIONS:
+            guard.add(w)
+        else:
+            stem = _qualifier(w)
+            if stem:
+                guard.add(stem)
+    return frozenset(guard)
+
+
+class TfidfIndex:
+    """
+    Cosine similarity over TF-IDF vectors of normalized questions, with an
+    inverted index so a lookup only scores documents sharing a word with
+    the query. IDF comes from the current documents, so entries can be
+    added and removed at any time.
+    """
+
+    def __init__(self):
+        self._docs = {}  # doc id -> Counter of words
+        self._postings = {}  # word -> set of doc ids
+        self._guards = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc_id, words: list[str]) -> None:
+        self.remove(doc_id)
+        counts = Counter(words)
+        self._docs[doc_id] = counts
+        self._guards[doc_id] = _guard(counts)
+        for word in counts:
+            self._postings.setdefault(word, set()).add(doc_id)
+
+    def remove(self, doc_id) -> None:
+        counts = self._docs.pop(doc_id, None)
+        if counts is None:
+            return
+        del self._guards[doc_id]
+        for word in counts:
+            ids = self._postings[word]
+            ids.discard(doc_id)
+            if not ids:
+                del self._postings[word]
+
+    def _idf(self, word: str) -> float:
+        return math.log((1 + len(self._docs)) / (1 + len(self._postings.get(word, ())))) + 1
+
+    def _vector(self, counts: Counter) -> dict:
+        vector = {w: c * self._idf(w) for w, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {w: v / norm for w, v in vector.items()}
+
+    def best(self, words: list[str], accept=None) -> tuple[Optional[object], float]:
+        """(doc id, cosine) of the closest document with the same guard words."""
+        counts = Counter(words)
+        guard = _guard(counts)
+        query = self._vector(counts)
+        candidates = set().union(*(self._postings.get(w, ()) for w in counts)) if counts else ()
+        best_id, best_score = None, 0.0
+        for doc_id in candidates:
+            if self._guards[doc_id] != guard or (accept is not None and not accept(doc_id)):
+                continue
+            doc = self._vector(self._docs[doc_id])
+            score = sum(v * doc.get(w, 0.0) for w, v in query.items())
+            if score > best_score:
+                best_id, best_score = doc_id, score
+        return best_id, best_score
+
+
+# Canned answers ----------------------------------------------------------
+
+# (phrasings, answer). Any phrasing matches by key or by similarity.
+CANNED_ANSWERS = (
+    (
+        ("What is a normal cycle length?", "How long is a normal menstrual cycle?",
+         "How many days is a normal cycle?"),
+        "A cycle is counted from the first day of one period to the first day of the next. "
+        "For adults, anything from about 21 to 35 days is common, and it is normal for the "
+        "length to change by a few days from month to month. If your cycles are often "
+        "shorter than 21 or longer than 35 days, or suddenly change, it is worth talking to "
+        "a doctor. 💕",
+    ),
+    (
+        ("How long does a period last?", "How long is a normal period?",
+         "How many days should my period last?"),
+        "Most periods last between 2 and 7 days, with the heaviest flow in the first couple "
+        "of days. Bleeding for more than 7 days, soaking a pad or tampon every hour, or "
+        "passing large clots is a good reason to see a doctor. 💕",
+    ),
+    (
+        ("How does PinkCycle predict my next period?", "How are predictions calculated?",
+         "How accurate are the predictions?"),
+        "PinkCycle estimates your cycle length from the cycles you have logged (or uses the "
+        "cycle length from your settings until you have logged at least two periods) and "
+        "adds it to your last period start. The range shown around the date comes from how "
+        "much your cycles have varied: the more regular they are, the narrower it gets. "
+        "Logging every period keeps predictions accurate.",
+    ),
+    (
+        ("What is the fertile window?", "When am I most fertile?", "What are my fertile days?"),
+        "The fertile window is the few days around ovulation when pregnancy is most likely. "
+        "PinkCycle estimates ovulation about 14 days before your next predicted period and "
+        "shows the days around it as your fertile window. These are estimates, so please "
+        "don't rely on them alone for contraception, and talk to a doctor about options that "
+        "suit you.",
+    ),
+    (
+        ("What is ovulation?", "When do I ovulate?"),
+        "Ovulation is when an ovary releases an egg, usually around 14 days before the next "
+        "period starts. In a 28-day cycle that is around day 14, but it shifts with your "
+        "cycle length and can vary from month to month. PinkCycle shows your estimated "
+        "ovulation day on the predictions page.",
+    ),
+    (
+        ("What is PMS?", "What are PMS symptoms?"),
+        "PMS (premenstrual syndrome) is a set of physical and emotional changes in the days "
+        "before a period, such as bloating, tender breasts, tiredness, irritability or low "
+        "mood. It usually eases once the period starts. Gentle exercise, sleep and regular "
+        "meals help many people. If symptoms get in the way of daily life, a doctor can help. 💕",
+    ),
+    (
+        ("Why is my period late?", "What can make a period late?"),
+        "A period can be late because of stress, illness, travel, big changes in weight or "
+        "exercise, breastfeeding, hormonal contraception, or pregnancy. A cycle that is a few "
+        "days off now and then is common. If there is any chance you could be pregnant, take "
+        "a test, and see a doctor if your period is very late or this keeps happening.",
+    ),
+    (
+        ("What does exclude from stats do?", "Why would I exclude a period from stats?"),
+        "Excluding a period from stats keeps it in your history but leaves it out of the "
+        "averages behind your predictions. Use it for an unusual cycle, for example after "
+        "illness or a change in contraception, so it does not pull future predictions off.",
+    ),
+    (
+        ("How do I export my data?", "How do I delete my account?"),
+        "Open Settings → Data Management. “Export my data” downloads everything PinkCycle "
+        "stores about you as a JSON file. “Delete account & data” permanently removes your "
+        "account and all logged data; export first if you want to keep a copy.",
+    ),
+)
+
+
+class CannedAnswers:
+    def __init__(self, table=CANNED_ANSWERS, threshold: float = FAQ_SIMILARITY):
+        self.threshold = threshold
+        self._answers = {}
+        self._index = TfidfIndex()
+        for phrasings, answer in table:
+            for question in phrasings:
+                key = normalize(question)
+                self._answers[key] = answer
+                self._index.add(key, tokens(question))
+
+    def get(self, question: str) -> Optional[str]:
+        answer = self._answers.get(normalize(question))
+        if answer is None:
+            key, score = self._index.best(tokens(question))
+            if key is not None and score >= self.threshold:
+                answer = self._answers[key]
+        return answer
+
+
+canned_answers = CannedAnswers()
+
+
+# Answer cache ------------------------------------------------------------
+
+class FaqCache:
+    """
+    LRU with a TTL of model answers per (app context, normalized question),
+    plus a TF-IDF index over the same entries for near-duplicate lookups.
+    """
+
+    def __init__(self, maxsize: int = 2000, ttl: float = 24 * 3600, threshold: float = 0.8):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._data = OrderedDict()
+        self._index = TfidfIndex()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _live(self, key) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._data[key]
+            self._index.remove(key)
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def get(self, question: str, context: Optional[str]) -> tuple[Optional[str], bool]:
+        """(answer, similar): similar is True for a TF-IDF match rather than the same key."""
+        words = tokens(question)
+        with self._lock:
+            answer = self._live((context, normalize(question)))
+            if answer is not None:
+                self.hits += 1
+                return answer, False
+            key, score = self._index.best(words, accept=lambda k: k[0] == context)
+            if key is not None and score >= self.threshold:
+                answer = self._live(key)
+                if answer is not None:
+                    self.similar_hits += 1
+                    return answer, True
+            self.misses += 1
+            return None, False
+
+    def set(self, question: str, context: Optional[str], answer: str) -> None:
+        key = (context, normalize(question))
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, answer)
+            self._data.move_to_end(key)
+            self._index.add(key, tokens(question))
+            while len(self._data) > self.maxsize:
+                old, _ = self._data.popitem(last=False)
+                self._index.remove(old)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._index = TfidfIndex()
+
+
+faq_cache = FaqCache(maxsize=FAQ_CACHE_SIZE, ttl=FAQ_CACHE_TTL, threshold=FAQ_SIMILARITY)
+
+
+# Rate limiting -----------------------------------------------------------
+
+class RateLimiter:
+    """Token bucket per key: `burst` calls at once, refilled at per_minute / 60 per second."""
+
+    def __init__(self, per_minute: float = 10, burst: int = 5, max_keys: int = 100000):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def acquire(self, key) -> float:
+        """0 if the call may go ahead, otherwise seconds until it may."""
+        now = time.monotonic()
+        with self._lock:
+            available, last = self._buckets.get(key, (self.burst, now))
+            available = min(self.burst, available + (now - last) * self.rate)
+            if available >= 1:
+                self._buckets[key] = (available - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (available, now)
+                wait = (1 - available) / self.rate if self.rate > 0 else math.inf
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+rate_limiter = RateLimiter(per_minute=FAQ_RATE_PER_MINUTE, burst=FAQ_RATE_BURST)
+
+
+# Metrics -----------------------------------------------------------------
+
+SOURCES = ("canned", "cache", "similar", "model")
+
+
+class FaqMetrics:
+    """Answer counts per source, rate-limited and failed calls, recent latencies."""
+
+    def __init__(self, samples: int = 1000):
+        self._lock = threading.Lock()
+        self._samples = samples
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = Counter()
+            self.latencies = {source: deque(maxlen=self._samples) for source in SOURCES}
+
+    def answered(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self.counts[source] += 1
+            self.latencies[source].append(seconds * 1000)
+
+    def count(self, event: str) -> None:
+        with self._lock:
+            self.counts[event] += 1
+
+    @staticmethod
+    def _percentile(ordered: list, q: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            answered = sum(self.counts[s] for s in SOURCES)
+            without_model = answered - self.counts["model"]
+            sources = {}
+            for source in SOURCES:
+                ordered = sorted(self.latencies[source])
+                sources[source] = {
+                    "count": self.counts[source],
+                    "p50_ms": self._percentile(ordered, 0.5),
+                    "p95_ms": self._percentile(ordered, 0.95),
+                }
+            return {
+                "answered": answered,
+                "hit_rate": round(without_model / answered, 4) if answered else None,
+                "rate_limited": self.counts["rate_limited"],
+                "errors": self.counts["error"],
+                "sources": sources,
+                "cache_entries": len(faq_cache),
+            }
+
+
+faq_metrics = FaqMetrics()
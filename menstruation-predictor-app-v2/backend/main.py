@@ -1,20 +1,87 @@
-from datetime import date, timedelta
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import date
 from typing import List, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from email_utils import send_password_reset_email
+from email_utils import password_reset_email
 from urllib.parse import urlencode
-from ai_client import answer_faq
+from ai_client import FALLBACK_ANSWER, answer_faq, stream_faq
 
-import models, schemas, crud
-from database import Base, engine, SessionLocal
+import models, schemas, crud, predictions, cycle_model, period_io, exporter, passwords, outbox
+from faq import canned_answers, faq_cache, faq_metrics, rate_limiter
+from auth import AuthContext, admin_user, current_user, issue_token, load_keys, optional_user
+from database import Base, engine, SessionLocal, ReadSessionLocal, USE_ASYNC_DB
 
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Menstruation Predictor API (Accounts + Settings)")
+
+def init_db():
+    """Create missing tables and stats rows; run once per worker at startup."""
+    if crud.drop_plaintext_reset_tokens(engine):
+        logger.warning("Dropped password_reset_tokens with plain-text tokens; outstanding reset links are void")
+    if crud.add_token_version_column(engine):
+        logger.info("Added users.token_version")
+    Base.metadata.create_all(bind=engine)
+
+    # Stats rows for users created before cycle_stats existed
+    with SessionLocal() as db:
+        crud.backfill_cycle_stats(db)
+
+
+RESET_TOKEN_SWEEP_SECONDS = float(os.environ.get("RESET_TOKEN_SWEEP_SECONDS", 3600))
+
+
+def purge_reset_tokens():
+    with SessionLocal() as db:
+        return crud.purge_reset_tokens(db), outbox.purge_failed(db)
+
+
+async def sweep_reset_tokens():
+    """
+    Delete expired and used reset tokens, and emails (reset links) the
+    outbox gave up on, every RESET_TOKEN_SWEEP_SECONDS.
+    """
+    while True:
+        try:
+            tokens, emails = await run_in_threadpool(purge_reset_tokens)
+            if tokens:
+                logger.info("Purged %d expired password reset tokens", tokens)
+            if emails:
+                logger.info("Purged %d undeliverable emails", emails)
+        except Exception:
+            logger.exception("Reset token sweep failed")
+        await asyncio.sleep(RESET_TOKEN_SWEEP_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Kept out of import time so `import main` stays fast and touches
+    # nothing (see test_startup.py); external clients are lazy too
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    load_keys()
+    await run_in_threadpool(init_db)
+    worker = outbox.OutboxWorker() if outbox.EMAIL_OUTBOX_WORKER else None
+    if worker:
+        worker.start()
+    sweeper = asyncio.create_task(sweep_reset_tokens()) if RESET_TOKEN_SWEEP_SECONDS > 0 else None
+    yield
+    if sweeper:
+        sweeper.cancel()
+    if worker:
+        worker.stop()
+
+
+app = FastAPI(title="Menstruation Predictor API (Accounts + Settings)", lifespan=lifespan)
 
 # CORS for local frontend dev
 app.add_middleware(
@@ -34,11 +101,13 @@ def get_db():
         db.close()
 
 
-def get_user_or_404(db: Session, user_id: int):
-    user = crud.get_user(db, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+def get_read_db():
+    """Session from the read-only pool; use for endpoints that never write."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 
 @app.get("/health")
@@ -48,36 +117,63 @@ def health_check():
 
 # Auth & profile ---------------------------------------------------------
 
-@app.post("/register", response_model=schemas.UserProfile)
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+# Password hashing runs on the bounded pool in passwords.py; DB work stays
+# on the request threadpool.
+
+async def on_hash_pool(fn, *args):
+    try:
+        return await fn(*args)
+    except passwords.HashPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many requests, try again", headers={"Retry-After": "1"})
+
+
+def auth_response(user: models.User) -> schemas.AuthResponse:
+    profile = schemas.UserProfile.model_validate(user, from_attributes=True)
+    return schemas.AuthResponse(**profile.model_dump(), access_token=issue_token(user.id, user.token_version))
+
+
+@app.post("/register", response_model=schemas.AuthResponse)
+async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(crud.get_user_by_email, db, user_in.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    password_hash = await on_hash_pool(passwords.hash_password_async, user_in.password)
     try:
-        user = crud.create_user(db, user_in)
+        user = await run_in_threadpool(crud.create_user, db, user_in, password_hash)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return user
+    return auth_response(user)
 
 
-@app.post("/login", response_model=schemas.UserProfile)
-def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, user_in.email, user_in.password)
-    if not user:
+@app.post("/login", response_model=schemas.AuthResponse)
+async def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(crud.get_user_by_email, db, user_in.email)
+    matches, needs_rehash = await on_hash_pool(
+        passwords.verify_async, user_in.password, user.password_hash if user else None
+    )
+    if not matches:
         raise HTTPException(status_code=401, detail="Invalid email or password")
-    return user
+    if needs_rehash:
+        # Legacy SHA-256 or outdated cost settings: store a current hash
+        password_hash = await on_hash_pool(passwords.hash_password_async, user_in.password)
+        user = await run_in_threadpool(crud.store_rehashed_password, db, user, password_hash)
+    return auth_response(user)
 
 
 @app.get("/me", response_model=schemas.UserProfile)
-def get_profile(user_id: int = Query(...), db: Session = Depends(get_db)):
-    user = get_user_or_404(db, user_id)
-    return user
+def get_profile(auth: AuthContext = Depends(current_user)):
+    return auth.user
 
 
 @app.put("/me", response_model=schemas.UserProfile)
 def update_profile(
     profile: schemas.UserBase,
-    user_id: int = Query(...),
+    auth: AuthContext = Depends(current_user),
     db: Session = Depends(get_db),
 ):
-    user = get_user_or_404(db, user_id)
+    user = crud.get_user(db, auth.user_id)
+    if user is None:
+        # Deleted since the cached context was loaded
+        raise HTTPException(status_code=401, detail="User not found", headers={"WWW-Authenticate": "Bearer"})
     user = crud.update_user_profile(db, user, profile)
     return user
 
@@ -85,31 +181,27 @@ def update_profile(
 # Settings ---------------------------------------------------------------
 
 @app.get("/settings", response_model=schemas.CycleSettingsResponse)
-def read_settings(user_id: int = Query(...), db: Session = Depends(get_db)):
-    get_user_or_404(db, user_id)
-    settings = crud.get_cycle_settings(db, user_id)
-    if not settings:
+def read_settings(auth: AuthContext = Depends(current_user)):
+    if not auth.settings:
         raise HTTPException(status_code=404, detail="Settings not configured yet")
-    return settings
+    return auth.settings
 
 
 @app.post("/settings", response_model=schemas.CycleSettingsResponse)
 def set_settings(
     settings_in: schemas.CycleSettingsCreate,
-    user_id: int = Query(...),
+    auth: AuthContext = Depends(current_user),
     db: Session = Depends(get_db),
 ):
-    get_user_or_404(db, user_id)
-    settings = crud.upsert_cycle_settings(db, user_id, settings_in)
+    settings = crud.upsert_cycle_settings(db, auth.user_id, settings_in)
     return settings
 
 
 @app.get("/notification-settings", response_model=schemas.NotificationSettingsResponse)
 def read_notification_settings(
-    user_id: int = Query(...), db: Session = Depends(get_db)
+    auth: AuthContext = Depends(current_user), db: Session = Depends(get_read_db)
 ):
-    get_user_or_404(db, user_id)
-    settings = crud.get_notification_settings(db, user_id)
+    settings = crud.get_notification_settings(db, auth.user_id)
     if not settings:
         raise HTTPException(status_code=404, detail="Notification settings not found")
     return settings
@@ -118,11 +210,10 @@ def read_notification_settings(
 @app.post("/notification-settings", response_model=schemas.NotificationSettingsResponse)
 def set_notification_settings(
     settings_in: schemas.NotificationSettingsCreate,
-    user_id: int = Query(...),
+    auth: AuthContext = Depends(current_user),
     db: Session = Depends(get_db),
 ):
-    get_user_or_404(db, user_id)
-    settings = crud.upsert_notification_settings(db, user_id, settings_in)
+    settings = crud.upsert_notification_settings(db, auth.user_id, settings_in)
     return settings
 
 
@@ -131,32 +222,81 @@ def set_notification_settings(
 @app.post("/periods", response_model=schemas.PeriodLogResponse)
 def add_period(
     period_in: schemas.PeriodLogCreate,
-    user_id: int = Query(...),
+    auth: AuthContext = Depends(current_user),
     db: Session = Depends(get_db),
 ):
-    get_user_or_404(db, user_id)
     if period_in.end_date < period_in.start_date:
         raise HTTPException(status_code=400, detail="End date cannot be before start date")
-    period = crud.create_period_log(db, user_id, period_in)
+    period = crud.create_period_log(db, auth.user_id, period_in)
     return period
 
 
 @app.get("/periods", response_model=List[schemas.PeriodLogResponse])
-def list_periods(user_id: int = Query(...), db: Session = Depends(get_db)):
-    get_user_or_404(db, user_id)
-    periods = crud.list_period_logs(db, user_id)
+def list_periods(auth: AuthContext = Depends(current_user), db: Session = Depends(get_read_db)):
+    periods = crud.list_period_logs(db, auth.user_id)
     return periods
 
 
+async def read_period_rows(request: Request):
+    """Validated import rows from a JSON list, a text/csv body or a multipart "file" upload."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        upload = (await request.form()).get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail='Expected a CSV file in the "file" field')
+        return period_io.parse_csv_rows(period_io.decode_csv(await upload.read()))
+    body = await request.body()
+    if content_type.startswith("text/csv"):
+        return period_io.parse_csv_rows(period_io.decode_csv(body))
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON list or CSV")
+    return period_io.parse_json_rows(items)
+
+
+@app.post("/periods/bulk", response_model=schemas.PeriodImportResult)
+async def import_periods(
+    request: Request, auth: AuthContext = Depends(current_user), db: Session = Depends(get_db)
+):
+    """
+    Import many period logs in one transaction (all or nothing). Rows
+    identical to stored logs are skipped; invalid or overlapping rows fail
+    the request with a 422 listing every bad row.
+    """
+    try:
+        rows = await read_period_rows(request)
+        inserted, duplicates = await run_in_threadpool(crud.import_period_logs, db, auth.user_id, rows)
+    except period_io.PeriodImportError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    return schemas.PeriodImportResult(inserted=inserted, skipped_duplicates=duplicates)
+
+
+def period_csv_stream(user_id: int):
+    # Own session: the generator outlives the request's dependencies
+    with ReadSessionLocal() as db:
+        yield from period_io.iter_csv(crud.iter_period_rows(db, user_id))
+
+
+@app.get("/periods/export")
+def export_periods(auth: AuthContext = Depends(current_user)):
+    """Period logs as CSV, streamed in batches (importable via /periods/bulk)."""
+    user_id = auth.user_id
+    return StreamingResponse(
+        period_csv_stream(user_id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="periods-{user_id}.csv"'},
+    )
+
+
 @app.patch("/periods/{period_id}", response_model=schemas.PeriodLogResponse)
 def update_period(
     period_id: int,
     updates: schemas.PeriodLogUpdate,
-    user_id: int = Query(...),
+    auth: AuthContext = Depends(current_user),
     db: Session = Depends(get_db),
 ):
-    get_user_or_404(db, user_id)
-    period = crud.update_period_log(db, user_id, period_id, updates)
+    period = crud.update_period_log(db, auth.user_id, period_id, updates)
     if not period:
         raise HTTPException(status_code=404, detail="Period log not found")
     return period
@@ -165,126 +305,90 @@ def update_period(
 # Predictions ------------------------------------------------------------
 
 def compute_cycle_stats(db: Session, user_id: int):
-    settings = crud.get_cycle_settings(db, user_id)
+    settings, stats, length_stats = crud.get_prediction_inputs(db, user_id)
     if not settings:
         raise HTTPException(status_code=400, detail="Settings must be configured before predictions")
 
-    periods = crud.list_period_logs(db, user_id)
-
-    # Determine cycle length from included logs
-    included_periods = [p for p in periods if not p.exclude_from_stats]
-
-    cycle_length = settings.average_cycle_length
-    period_length = settings.average_period_length
-
-    if len(included_periods) >= 2:
-        diffs = []
-        for prev, nxt in zip(included_periods, included_periods[1:]):
-            diffs.append((nxt.start_date - prev.start_date).days)
-        if diffs:
-            cycle_length = int(round(sum(diffs) / len(diffs)))
-
-    if included_periods:
-        lengths = [
-            (p.end_date - p.start_date).days + 1
-            for p in included_periods
-        ]
-        if lengths:
-            period_length = int(round(sum(lengths) / len(lengths)))
-
-    if periods:
-        last_period_start = periods[-1].start_date
-    else:
-        if not settings.first_period_start_date:
-            raise HTTPException(
-                status_code=400,
-                detail="No period logs or first period start date set",
-            )
-        last_period_start = settings.first_period_start_date
+    try:
+        if stats is not None:
+            cycle_length, period_length, last_period_start = predictions.cycle_stats_from_record(settings, stats)
+        else:
+            # Not backfilled yet: fall back to the full history
+            periods = crud.list_period_logs(db, user_id)
+            cycle_length, period_length, last_period_start = predictions.cycle_stats(settings, periods)
+    except predictions.PredictionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return settings, cycle_length, period_length, last_period_start
+    return settings, cycle_length, period_length, last_period_start, length_stats
 
 
 @app.get("/predictions", response_model=schemas.PredictionResponse)
-def get_predictions(user_id: int = Query(...), db: Session = Depends(get_db)):
-    get_user_or_404(db, user_id)
-    settings, cycle_length, period_length, last_period_start = compute_cycle_stats(db, user_id)
-
-    # If pregnancy or irregular mode is active, we still compute, but mark flags
-    if settings.irregular_cycle_mode:
-        irregular = True
-    else:
-        irregular = False
-
-    next_period_start = last_period_start + timedelta(days=cycle_length)
-    next_period_end = next_period_start + timedelta(days=period_length - 1)
-
-    ovulation_day = last_period_start + timedelta(days=cycle_length - 14)
-    fertile_window_start = ovulation_day - timedelta(days=2)
-    fertile_window_end = ovulation_day + timedelta(days=2)
-
+def get_predictions(auth: AuthContext = Depends(current_user), db: Session = Depends(get_read_db)):
+    user_id = auth.user_id
     today = date.today()
-    cycle_day_today = (today - last_period_start).days + 1
-
-    return schemas.PredictionResponse(
-        next_period_start=next_period_start,
-        next_period_end=next_period_end,
-        ovulation_day=ovulation_day,
-        fertile_window_start=fertile_window_start,
-        fertile_window_end=fertile_window_end,
-        cycle_day_today=max(cycle_day_today, 0),
-        cycle_length_used=cycle_length,
-        period_length_used=period_length,
-        irregular_cycle_mode=irregular,
-        pregnancy_mode=settings.pregnancy_mode,
-        lactation_mode=settings.lactation_mode,
-        show_fertile_window=settings.show_fertile_window,
+    cached = predictions.prediction_cache.get(user_id, today)
+    if cached is not None:
+        return cached
+
+    settings, cycle_length, period_length, last_period_start, length_stats = compute_cycle_stats(db, user_id)
+    response = cycle_model.predict(
+        settings, cycle_length, period_length, last_period_start, length_stats, today=today
     )
+    predictions.prediction_cache.set(user_id, today, response)
+    return response
 
 
 @app.get("/cycle-history", response_model=schemas.CycleHistoryResponse)
-def cycle_history(user_id: int = Query(...), db: Session = Depends(get_db)):
-    get_user_or_404(db, user_id)
-    periods = crud.list_period_logs(db, user_id)
-    items: list[schemas.CycleHistoryItem] = []
-
-    for idx, p in enumerate(periods):
-        cycle_length = None
-        if idx + 1 < len(periods):
-            cycle_length = (periods[idx + 1].start_date - p.start_date).days
-        items.append(
-            schemas.CycleHistoryItem(
-                start_date=p.start_date,
-                end_date=p.end_date,
-                cycle_length=cycle_length,
-                excluded_from_stats=p.exclude_from_stats,
-            )
-        )
-
-    return schemas.CycleHistoryResponse(periods=items)
+def cycle_history(auth: AuthContext = Depends(current_user), db: Session = Depends(get_read_db)):
+    periods = crud.list_period_logs(db, auth.user_id)
+    return predictions.build_cycle_history(periods)
 
 
 # Export & delete --------------------------------------------------------
 
-@app.get("/export-data", response_model=schemas.ExportBundle)
-def export_data(user_id: int = Query(...), db: Session = Depends(get_db)):
-    user = get_user_or_404(db, user_id)
-    cycle_settings = crud.get_cycle_settings(db, user_id)
-    notification_settings = crud.get_notification_settings(db, user_id)
-    periods = crud.list_period_logs(db, user_id)
-
-    return schemas.ExportBundle(
-        user=user,
-        cycle_settings=cycle_settings,
-        notification_settings=notification_settings,
-        periods=periods,
+def export_stream(user_id: int, fmt: str, gzip: bool):
+    # Own session: the generator outlives the request's dependencies
+    with ReadSessionLocal() as db:
+        exporter.begin_snapshot(db)
+        chunks = exporter.iter_json(db, user_id) if fmt == "json" else exporter.iter_zip(db, user_id)
+        yield from exporter.gzip_chunks(chunks) if gzip else chunks
+
+
+@app.get(
+    "/export-data",
+    response_class=StreamingResponse,
+    responses={200: {
+        "model": schemas.ExportBundle,
+        "description": "ExportBundle JSON, or a zip of NDJSON files for format=ndjson-zip",
+        "content": {"application/zip": {"schema": {"type": "string", "format": "binary"}}},
+    }},
+)
+def export_data(
+    auth: AuthContext = Depends(current_user),
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson-zip)$"),
+    gzip: bool = Query(False),
+):
+    """
+    Streamed export. format=json (default) is an ExportBundle document;
+    format=ndjson-zip is a zip with one NDJSON file per table. gzip=true
+    compresses the JSON document with Content-Encoding: gzip.
+    """
+    user_id = auth.user_id
+    if fmt == "ndjson-zip":
+        return StreamingResponse(
+            export_stream(user_id, fmt, gzip=False),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="pinkcycle-export-{user_id}.zip"'},
+        )
+    headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"} if gzip else {}
+    return StreamingResponse(
+        export_stream(user_id, fmt, gzip), media_type="application/json", headers=headers
     )
 
 
 @app.delete("/account")
-def delete_account(user_id: int = Query(...), db: Session = Depends(get_db)):
-    get_user_or_404(db, user_id)
-    crud.delete_user_and_data(db, user_id)
+def delete_account(auth: AuthContext = Depends(current_user), db: Session = Depends(get_db)):
+    crud.delete_user_and_data(db, auth.user_id)
     return {"status": "deleted"}
 
 @app.post("/request-password-reset")
@@ -296,61 +400,182 @@ def request_password_reset(
         # Don't reveal whether email exists
         return {"status": "ok"}
 
-    prt = crud.create_password_reset_token(db, user, ttl_minutes=30)
+    # Not committed yet: queue_email commits the token and its email together
+    token = crud.create_password_reset_token(db, user, ttl_minutes=30)
 
     # Build reset link – adjust base URL to match your frontend
     base_frontend_url = "http://127.0.0.1:5173/reset-password"
-    query = urlencode({"token": prt.token})
+    query = urlencode({"token": token})
     reset_link = f"{base_frontend_url}?{query}"
 
-    # Send via Gmail API
-    try:
-        send_password_reset_email(user.email, reset_link)
-    except Exception as e:
-        print("Error sending reset email:", e)
-        # You might want to log this; still don't leak details to client
+    # Sent by the outbox worker, so provider latency and errors never
+    # reach (or leak through) this response
+    crud.queue_email(db, password_reset_email(user.email, reset_link))
 
     return {"status": "ok"}
 
 
 @app.post("/reset-password")
-def reset_password(
+async def reset_password(
     payload: schemas.PasswordResetConfirm, db: Session = Depends(get_db)
 ):
-    prt = crud.get_valid_reset_token(db, payload.token)
+    prt = await run_in_threadpool(crud.get_valid_reset_token, db, payload.token)
     if not prt:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    user = crud.get_user(db, prt.user_id)
+    user = await run_in_threadpool(crud.get_user, db, prt.user_id)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid token")
 
-    crud.set_user_password(db, user, payload.new_password)
-    crud.mark_reset_token_used(db, prt)
+    password_hash = await on_hash_pool(passwords.hash_password_async, payload.new_password)
+    await run_in_threadpool(crud.set_password_hash, db, user, password_hash)
+    await run_in_threadpool(crud.mark_reset_token_used, db, prt)
     return {"status": "password_updated"}
 
+def faq_app_context(auth: Optional[AuthContext]) -> Optional[str]:
+    # Optional: personalize with the signed-in user's settings (goal, etc.)
+    if auth is None:
+        return None
+    user = auth.user
+    return (
+        f"User goal: {user.goal}. "
+        f"Uses hormonal contraceptives: {getattr(user, 'uses_hormonal_contraceptives', False)}. "
+        "Answer at a general educational level and remind them to see a doctor for medical issues."
+    )
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def faq_local_answer(question: str, app_context: Optional[str]):
+    """(answer, source) from the canned table or the cache; answer is None on a miss."""
+    answer = canned_answers.get(question)
+    if answer is not None:
+        return answer, "canned"
+    answer, similar = faq_cache.get(question, app_context)
+    return answer, "similar" if similar else "cache"
+
+
+def faq_rate_limit(auth: Optional[AuthContext], request: Request) -> None:
+    key = auth.user_id if auth else f"ip:{request.client.host if request.client else ''}"
+    wait = rate_limiter.acquire(key)
+    if wait:
+        faq_metrics.count("rate_limited")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many questions, please wait a moment.",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+def faq_event_stream(question: str, app_context: Optional[str], started: float):
+    """
+    Server-sent events for the FAQ answer: one `data: {"delta": ...}` per
+    chunk, then `event: done` with the full answer. The first chunk is
+    fetched before the response starts so failures still return a 500.
+    """
+    chunks = stream_faq(question, app_context=app_context)
+    try:
+        first = next(chunks, "")
+    except Exception:
+        logger.exception("AI FAQ error")
+        faq_metrics.count("error")
+        raise HTTPException(status_code=500, detail="AI assistant is currently unavailable.")
+
+    def events():
+        parts = [first]
+        if first:
+            yield sse_event({"delta": first})
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield sse_event({"delta": chunk})
+        except Exception:
+            logger.exception("AI FAQ stream error")
+            faq_metrics.count("error")
+            yield sse_event({"detail": "AI assistant is currently unavailable."}, event="error")
+            return
+        answer = "".join(parts).strip()
+        if answer:
+            faq_cache.set(question, app_context, answer)
+        faq_metrics.answered("model", time.perf_counter() - started)
+        yield sse_event({"answer": answer, "source": "model"}, event="done")
+
+    return events()
+
+
+def faq_cached_stream(answer: str, source: str):
+    yield sse_event({"delta": answer})
+    yield sse_event({"answer": answer, "source": source}, event="done")
+
+
 @app.post("/ai/faq", response_model=schemas.FAQResponse)
-def ai_faq(payload: schemas.FAQRequest, db: Session = Depends(get_db)):
+def ai_faq(
+    payload: schemas.FAQRequest,
+    request: Request,
+    auth: Optional[AuthContext] = Depends(optional_user),
+):
     """
     Answer FAQs about menstruation and how to use PinkCycle
     using Gemini 2.5 Flash.
+
+    Canned and cached answers are served without a model call (faq.py);
+    only questions that reach Gemini count against the per-user rate limit.
+    Clients sending `Accept: text/event-stream` get the answer streamed
+    as server-sent events (see faq_event_stream); others get one JSON body.
     """
-    app_context = None
-
-    # Optional: personalize with user settings (goal, etc.)
-    if payload.user_id:
-        user = crud.get_user(db, payload.user_id)
-        if user:
-            app_context = (
-                f"User goal: {user.goal}. "
-                f"Uses hormonal contraceptives: {getattr(user, 'uses_hormonal_contraceptives', False)}. "
-                "Answer at a general educational level and remind them to see a doctor for medical issues."
+    started = time.perf_counter()
+    app_context = faq_app_context(auth)
+    streaming = "text/event-stream" in request.headers.get("accept", "")
+
+    answer, source = faq_local_answer(payload.question, app_context)
+    if answer is not None:
+        faq_metrics.answered(source, time.perf_counter() - started)
+        if streaming:
+            return StreamingResponse(
+                faq_cached_stream(answer, source),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
             )
+        return schemas.FAQResponse(answer=answer, source=source)
+
+    faq_rate_limit(auth, request)
+
+    if streaming:
+        return StreamingResponse(
+            faq_event_stream(payload.question, app_context, started),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
+        )
 
     try:
         ans = answer_faq(payload.question, app_context=app_context)
-    except Exception as e:
-        print("AI FAQ error:", e)
+    except Exception:
+        logger.exception("AI FAQ error")
+        faq_metrics.count("error")
         raise HTTPException(status_code=500, detail="AI assistant is currently unavailable.")
 
-    return schemas.FAQResponse(answer=ans)
\ No newline at end of file
+    if ans != FALLBACK_ANSWER:
+        faq_cache.set(payload.question, app_context, ans)
+    faq_metrics.answered("model", time.perf_counter() - started)
+    return schemas.FAQResponse(answer=ans)
+
+
+@app.get("/ai/faq/metrics")
+def ai_faq_metrics(auth: AuthContext = Depends(admin_user)):
+    """Where FAQ answers came from (hit rate) and their latency percentiles."""
+    return faq_metrics.snapshot()
+
+
+# Async mode -------------------------------------------------------------
+
+if USE_ASYNC_DB:
+    from async_api import use_async_routes
+
+    # Serve the data endpoints above on an AsyncSession
+    use_async_routes(app, session_dependencies=(get_db, get_read_db))
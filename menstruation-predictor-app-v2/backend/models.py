@@ -1,5 +1,8 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Date, Boolean, ForeignKey, DateTime
+from sqlalchemy import (
+    Column, Integer, String, Text, Date, Boolean, ForeignKey, DateTime, Float, Index, LargeBinary,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 from database import Base
 from sqlalchemy import DateTime
@@ -11,6 +14,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
+    # Bumped on every password change; tokens with an older "ver" are rejected
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     age = Column(Integer, nullable=True)
     height_cm = Column(Integer, nullable=True)
@@ -38,6 +43,15 @@ class User(Base):
     periods = relationship(
         "PeriodLog", back_populates="user", cascade="all, delete-orphan"
     )
+    cycle_stats = relationship(
+        "CycleStats", back_populates="user", uselist=False, cascade="all, delete-orphan"
+    )
+    reminders = relationship(
+        "ScheduledReminder", back_populates="user", cascade="all, delete-orphan"
+    )
+    cycle_length_stats = relationship(
+        "CycleLengthStats", back_populates="user", uselist=False, cascade="all, delete-orphan"
+    )
 
 
 class CycleSettings(Base):
@@ -96,13 +110,114 @@ class PeriodLog(Base):
 
     user = relationship("User", back_populates="periods")
 
+class CycleStats(Base):
+    """
+    Running totals over a user's period logs, kept in step by crud on every
+    period write so /predictions reads one row instead of the whole history.
+
+    Mean of consecutive cycle lengths telescopes to
+    (last_included_start - first_included_start) / (included_count - 1),
+    so only the first/last included start dates are needed.
+    """
+    __tablename__ = "cycle_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+
+    period_count = Column(Integer, nullable=False, default=0)  # all logs
+    last_period_start = Column(Date, nullable=True)  # over all logs
+
+    included_count = Column(Integer, nullable=False, default=0)  # not excluded
+    period_length_sum = Column(Integer, nullable=False, default=0)  # days, inclusive
+    first_included_start = Column(Date, nullable=True)
+    last_included_start = Column(Date, nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User", back_populates="cycle_stats")
+
+
+class CycleLengthStats(Base):
+    """
+    Running statistics over the user's cycle lengths (gaps between
+    consecutive included period starts), for the prediction models in
+    cycle_model.py. Appending a newer period updates them in O(1); other
+    edits rebuild them from the period starts.
+    """
+    __tablename__ = "cycle_length_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+
+    # Welford running mean / sum of squared deviations
+    n = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+
+    # Exponentially weighted mean / variance
+    ewma = Column(Float, nullable=True)
+    ewvar = Column(Float, nullable=False, default=0.0)
+
+    recent = Column(String, nullable=False, default="")  # last cycle lengths, comma-separated
+    last_start = Column(Date, nullable=True)  # latest included start the gaps run up to
+
+    user = relationship("User", back_populates="cycle_length_stats")
+
+
+class ScheduledReminder(Base):
+    """
+    Next firing time of one reminder type for one user. The scheduler reads
+    rows with next_fire_at <= now through the index, so a tick only touches
+    due reminders no matter how many users there are.
+    """
+    __tablename__ = "scheduled_reminders"
+    __table_args__ = (UniqueConstraint("user_id", "kind", name="uq_reminder_user_kind"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)  # period_soon, period_end, fertile_window, ovulation, daily_log, medication
+    next_fire_at = Column(DateTime, nullable=False, index=True)  # UTC
+    event_date = Column(Date, nullable=True)  # the predicted day the reminder is about
+    last_fired_at = Column(DateTime, nullable=True)
+
+    user = relationship("User", back_populates="reminders")
+
+
 class PasswordResetToken(Base):
+    """
+    Only the SHA-256 of the emailed token is stored, so a leaked table
+    can't reset passwords. The (token_hash, used, expires_at) index answers
+    the lookup on its own; the expires_at index serves the sweeper, which
+    deletes expired rows (a used token expires when it is used).
+    """
     __tablename__ = "password_reset_tokens"
+    __table_args__ = (
+        Index("ix_password_reset_tokens_lookup", "token_hash", "used", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    token = Column(String, unique=True, index=True, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    token_hash = Column(LargeBinary(32), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     used = Column(Boolean, default=False)
 
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+
+class OutboxEmail(Base):
+    """
+    An email waiting for the outbox worker (outbox.py), which picks up rows
+    with next_attempt_at <= now through the index. Sent rows are deleted;
+    rows that ran out of attempts keep next_attempt_at NULL and the last
+    error for inspection until outbox.purge_failed() removes them.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    next_attempt_at = Column(DateTime, nullable=True, index=True)  # UTC; NULL once given up
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
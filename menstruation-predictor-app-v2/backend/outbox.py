@@ -0,0 +1,232 @@
+# backend/outbox.py
+"""
+Email outbox.
+
+Request handlers only insert an email_outbox row (enqueue(), committed
+with the rest of the request) and wake the worker, so they return in
+milliseconds whatever the email provider is doing. The worker claims due
+rows in batches, sends them through one long-lived transport
+(email_utils.py; the Gmail service is authenticated once) and deletes
+them once sent. A failed send is retried after EMAIL_RETRY_BASE seconds,
+doubling up to EMAIL_RETRY_MAX, for EMAIL_MAX_ATTEMPTS attempts. After
+that the row stays with next_attempt_at NULL and its last error until
+purge_failed() deletes it, EMAIL_FAILED_RETENTION after it was queued
+(the API's reset token sweeper runs it), so bodies such as reset links
+are not kept indefinitely.
+
+The API runs the worker in a background thread (EMAIL_OUTBOX_WORKER=0
+turns that off). It can also run on its own:
+
+    python outbox.py                          # loop
+    python outbox.py --once --transport file:mail.jsonl
+
+Claiming a batch pushes its rows' next_attempt_at EMAIL_CLAIM_SECONDS
+ahead in one UPDATE, so several workers never pick the same row, and a
+worker that dies mid-batch only delays those emails. Delivery is
+at-least-once.
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+import models
+from email_utils import Email, EmailTransport, get_transport
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_SLEEP_SECONDS = 60
+EMAIL_MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", 8))
+EMAIL_RETRY_BASE = float(os.environ.get("EMAIL_RETRY_BASE", 30))  # seconds
+EMAIL_RETRY_MAX = float(os.environ.get("EMAIL_RETRY_MAX", 3600))
+EMAIL_CLAIM_SECONDS = float(os.environ.get("EMAIL_CLAIM_SECONDS", 300))
+EMAIL_FAILED_RETENTION = float(os.environ.get("EMAIL_FAILED_RETENTION", 24 * 3600))  # seconds
+EMAIL_OUTBOX_WORKER = os.environ.get("EMAIL_OUTBOX_WORKER", "1").lower() not in ("0", "false", "no")
+
+
+def enqueue(db: Session, email: Email, now: Optional[datetime] = None) -> models.OutboxEmail:
+    """Add an email to the outbox; it is sent once the caller commits."""
+    row = models.OutboxEmail(
+        to_email=email.to,
+        subject=email.subject,
+        body=email.body,
+        next_attempt_at=now or datetime.utcnow(),
+        attempts=0,
+    )
+    db.add(row)
+    return row
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next try after `attempts` failures, with ±20 % jitter."""
+    return min(EMAIL_RETRY_MAX, EMAIL_RETRY_BASE * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+
+def claim(db: Session, now: datetime, batch_size: int = BATCH_SIZE) -> list:
+    """Lease up to batch_size due emails to this worker and return them."""
+    due = (
+        select(models.OutboxEmail.id)
+        .where(models.OutboxEmail.next_attempt_at <= now)
+        .order_by(models.OutboxEmail.next_attempt_at)
+        .limit(batch_size)
+    )
+    rows = db.execute(
+        update(models.OutboxEmail)
+        .where(models.OutboxEmail.id.in_(due.scalar_subquery()), models.OutboxEmail.next_attempt_at <= now)
+        .values(next_attempt_at=now + timedelta(seconds=EMAIL_CLAIM_SECONDS))
+        .returning(
+            models.OutboxEmail.id,
+            models.OutboxEmail.to_email,
+            models.OutboxEmail.subject,
+            models.OutboxEmail.body,
+            models.OutboxEmail.attempts,
+        )
+    ).all()
+    db.commit()
+    return rows
+
+
+def run_due(db: Session, transport: EmailTransport, now: Optional[datetime] = None,
+            batch_size: int = BATCH_SIZE) -> int:
+    """Send every email due at `now`, batch by batch. Returns how many were sent."""
+    now = now or datetime.utcnow()
+    sent = 0
+    while True:
+        rows = claim(db, now, batch_size)
+        if not rows:
+            return sent
+
+        sent_ids = []
+        for row in rows:
+            try:
+                transport.send(Email(to=row.to_email, subject=row.subject, body=row.body))
+            except Exception as e:
+                attempts = row.attempts + 1
+                logger.warning("Email %s failed (attempt %d): %s", row.id, attempts, e)
+                db.execute(
+                    update(models.OutboxEmail)
+                    .where(models.OutboxEmail.id == row.id)
+                    .values(
+                        attempts=attempts,
+                        last_error=str(e)[:500],
+                        next_attempt_at=now + timedelta(seconds=retry_delay(attempts))
+                        if attempts < EMAIL_MAX_ATTEMPTS else None,
+                    )
+                )
+            else:
+                sent_ids.append(row.id)
+        if sent_ids:
+            db.execute(delete(models.OutboxEmail).where(models.OutboxEmail.id.in_(sent_ids)))
+        db.commit()
+        sent += len(sent_ids)
+
+
+def purge_failed(db: Session, now: Optional[datetime] = None,
+                 retention: float = EMAIL_FAILED_RETENTION, batch_size: int = 1000) -> int:
+    """
+    Delete emails that ran out of attempts and were queued more than
+    `retention` seconds ago, in batches with one commit each. Returns the
+    number deleted.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=retention)
+    deleted = 0
+    while True:
+        batch = (
+            select(models.OutboxEmail.id)
+            .where(models.OutboxEmail.next_attempt_at.is_(None), models.OutboxEmail.created_at <= cutoff)
+            .limit(batch_size)
+        )
+        count = db.execute(
+            delete(models.OutboxEmail).where(models.OutboxEmail.id.in_(batch.scalar_subquery()))
+        ).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def seconds_until_next(db: Session, now: datetime, cap: float = MAX_SLEEP_SECONDS) -> float:
+    nxt = db.scalar(select(func.min(models.OutboxEmail.next_attempt_at)))
+    if nxt is None:
+        return cap
+    return min(cap, max(0.0, (nxt - now).total_seconds()))
+
+
+# Worker ------------------------------------------------------------------
+
+_wake = threading.Event()
+
+
+def wake() -> None:
+    """Tell a worker in this process that new email is waiting."""
+    _wake.set()
+
+
+def run_forever(transport: EmailTransport, stop: Optional[threading.Event] = None,
+                batch_size: int = BATCH_SIZE) -> None:
+    from database import SessionLocal
+
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        _wake.clear()
+        try:
+            with SessionLocal() as db:
+                run_due(db, transport, batch_size=batch_size)
+                pause = seconds_until_next(db, datetime.utcnow())
+        except Exception:
+            logger.exception("Email outbox error")
+            pause = MAX_SLEEP_SECONDS
+        _wake.wait(pause)
+    transport.close()
+
+
+class OutboxWorker:
+    """run_forever() on a daemon thread; started and stopped by the API's lifespan."""
+
+    def __init__(self, transport: Optional[EmailTransport] = None):
+        self.transport = transport
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=run_forever,
+            args=(self.transport or get_transport(), self._stop),
+            name="email-outbox",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PinkCycle email outbox worker")
+    parser.add_argument("--transport", help='"gmail", "smtp:<host>:<port>", "file:<path>" or "console"')
+    parser.add_argument("--once", action="store_true", help="Send what is due now and exit")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    transport = get_transport(args.transport)
+
+    if args.once:
+        with SessionLocal() as db:
+            print(f"Sent {run_due(db, transport, batch_size=args.batch_size)} emails")
+        transport.close()
+    else:
+        run_forever(transport, batch_size=args.batch_size)
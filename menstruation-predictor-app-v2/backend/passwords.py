@@ -0,0 +1,268 @@
+# backend/passwords.py
+"""
+Password hashing.
+
+PASSWORD_HASHER picks the algorithm for new hashes:
+
+- "scrypt" (default, standard library): SCRYPT_N / SCRYPT_R / SCRYPT_P
+- "argon2": argon2id via argon2-cffi (`pip install argon2-cffi`):
+  ARGON2_TIME_COST / ARGON2_MEMORY_COST (KiB) / ARGON2_PARALLELISM
+
+verify() accepts every format ever stored: the original salted SHA-256
+("<salt>$<sha256>"), scrypt and argon2. It also reports whether the hash
+should be replaced: a legacy hash, another algorithm, or different cost
+parameters. The login handler then stores a fresh hash, so users move to
+the current settings as they log in.
+
+Hashing is deliberately slow, so the *_async functions run it on a
+dedicated pool of PASSWORD_HASH_WORKERS threads (hashlib.scrypt and
+argon2 release the GIL). A login burst then queues there instead of
+occupying the event loop or the request threadpool. Once
+PASSWORD_HASH_MAX_PENDING calls are waiting, HashPoolBusy is raised so
+the API can answer 503 instead of letting latency grow without bound.
+bench_passwords.py helps pick the cost parameters.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt")
+
+SCRYPT_N = int(os.environ.get("SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("SCRYPT_P", 1))
+SCRYPT_DKLEN = 32
+
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", 19456))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", 1))
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 256))
+
+
+class HashPoolBusy(RuntimeError):
+    """Too many password hashes already queued."""
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class PasswordHasher:
+    name = ""
+
+    def hash(self, password: str) -> str:
+        raise NotImplementedError
+
+    def verify(self, password: str, stored: str) -> bool:
+        raise NotImplementedError
+
+    def identifies(self, stored: str) -> bool:
+        raise NotImplementedError
+
+    def needs_rehash(self, stored: str) -> bool:
+        return False
+
+
+class LegacySha256Hasher(PasswordHasher):
+    """The original "<hex salt>$<sha256(salt + password)>"; verify only."""
+    name = "sha256"
+
+    def hash(self, password: str) -> str:
+        raise RuntimeError("Legacy SHA-256 hashes are no longer created")
+
+    def identifies(self, stored: str) -> bool:
+        salt, sep, digest = stored.partition("$")
+        return bool(sep) and len(digest) == 64 and "$" not in digest
+
+    def verify(self, password: str, stored: str) -> bool:
+        salt, _, digest = stored.partition("$")
+        new_digest = hashlib.sha256((salt + password).encode("utf-8")).hexdigest()
+        return secrets.compare_digest(new_digest, digest)
+
+
+class ScryptHasher(PasswordHasher):
+    """scrypt$<n>$<r>$<p>$<salt>$<key>, base64 without padding."""
+    name = "scrypt"
+
+    def __init__(self, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P):
+        self.n, self.r, self.p = n, r, p
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+            maxmem=min(128 * r * (n + p + 2) + 1024 * 1024, 2 ** 31 - 1), dklen=SCRYPT_DKLEN,
+        )
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return f"scrypt${self.n}${self.r}${self.p}${_b64(salt)}${_b64(key)}"
+
+    def identifies(self, stored: str) -> bool:
+        return stored.startswith("scrypt$")
+
+    def _params(self, stored: str):
+        _, n, r, p, salt, key = stored.split("$")
+        return int(n), int(r), int(p), _unb64(salt), _unb64(key)
+
+    def verify(self, password: str, stored: str) -> bool:
+        try:
+            n, r, p, salt, key = self._params(stored)
+        except ValueError:
+            return False
+        return hmac.compare_digest(self._derive(password, salt, n, r, p), key)
+
+    def needs_rehash(self, stored: str) -> bool:
+        n, r, p, _, _ = self._params(stored)
+        return (n, r, p) != (self.n, self.r, self.p)
+
+
+class Argon2Hasher(PasswordHasher):
+    """argon2id in the standard PHC string format, via argon2-cffi."""
+    name = "argon2"
+
+    def __init__(self, time_cost: int = ARGON2_TIME_COST, memory_cost: int = ARGON2_MEMORY_COST,
+                 parallelism: int = ARGON2_PARALLELISM):
+        try:
+            import argon2
+        except ImportError as e:
+            raise RuntimeError("PASSWORD_HASHER=argon2 needs `pip install argon2-cffi`") from e
+        self._errors = argon2.exceptions
+        self._hasher = argon2.PasswordHasher(
+            time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism,
+            type=argon2.Type.ID,
+        )
+
+    def hash(self, password: str) -> str:
+        return self._hasher.hash(password)
+
+    def identifies(self, stored: str) -> bool:
+        return stored.startswith("$argon2")
+
+    def verify(self, password: str, stored: str) -> bool:
+        try:
+            return self._hasher.verify(stored, password)
+        except (self._errors.VerificationError, self._errors.InvalidHashError):
+            return False
+
+    def needs_rehash(self, stored: str) -> bool:
+        return self._hasher.check_needs_rehash(stored)
+
+
+def make_hasher(name: str = PASSWORD_HASHER, **params) -> PasswordHasher:
+    if name == "scrypt":
+        return ScryptHasher(**params)
+    if name == "argon2":
+        return Argon2Hasher(**params)
+    raise ValueError(f"Unknown password hasher: {name}")
+
+
+_hasher: Optional[PasswordHasher] = None
+_legacy = LegacySha256Hasher()
+
+
+def get_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = make_hasher()
+    return _hasher
+
+
+def _known_hasher(stored: str) -> Optional[PasswordHasher]:
+    current = get_hasher()
+    if current.identifies(stored):
+        return current
+    if stored.startswith("scrypt$"):
+        return ScryptHasher()
+    if stored.startswith("$argon2"):
+        return Argon2Hasher()
+    if _legacy.identifies(stored):
+        return _legacy
+    return None
+
+
+def hash_password(password: str) -> str:
+    return get_hasher().hash(password)
+
+
+def verify(password: str, stored: Optional[str]) -> tuple[bool, bool]:
+    """(matches, needs_rehash) for a stored hash in any supported format."""
+    hasher = _known_hasher(stored) if stored else None
+    if hasher is None:
+        # Unknown user or hash: spend the same time, so timing reveals nothing
+        get_hasher().verify(password, _dummy_hash())
+        return False, False
+    if not hasher.verify(password, stored):
+        return False, False
+    current = get_hasher()
+    return True, hasher is not current or current.needs_rehash(stored)
+
+
+_dummy = None
+
+
+def _dummy_hash() -> str:
+    global _dummy
+    if _dummy is None:
+        _dummy = get_hasher().hash(secrets.token_urlsafe(16))
+    return _dummy
+
+
+# Bounded hashing pool ----------------------------------------------------
+
+_pool: Optional[ThreadPoolExecutor] = None
+_workers = PASSWORD_HASH_WORKERS
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="pwhash")
+    return _pool
+
+
+def configure(hasher: Optional[PasswordHasher] = None, workers: Optional[int] = None) -> None:
+    """Swap the hasher and/or the pool size (used by bench_passwords.py)."""
+    global _hasher, _dummy, _pool, _workers
+    if hasher is not None:
+        _hasher, _dummy = hasher, None
+    if workers is not None:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool, _workers = None, workers
+
+
+async def _run(fn, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise HashPoolBusy("Password hashing queue is full")
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_async(password: str, stored: Optional[str]) -> tuple[bool, bool]:
+    return await _run(verify, password, stored)
@@ -0,0 +1,148 @@
+# backend/period_io.py
+"""
+Period log import / export.
+
+parse_json_rows() / parse_csv_rows() validate every row up front and
+collect all errors (with row numbers) instead of stopping at the first.
+check_rows() then drops exact duplicates of the user's existing
+(start, end) pairs and sorts the rest together with them to find overlaps
+in a single pass, so crud can insert everything in one transaction. iter_csv() writes logs in
+the same column layout, so an export can be imported again unchanged.
+"""
+import csv
+import io
+from typing import Iterable, Optional
+
+from pydantic import ValidationError
+
+import schemas
+
+CSV_FIELDS = ("start_date", "end_date", "flow_intensity", "exclude_from_stats")
+MAX_IMPORT_ROWS = 10000
+CSV_CHUNK_ROWS = 500
+
+TRUE_VALUES = {"1", "true", "yes", "y"}
+
+
+class PeriodImportError(ValueError):
+    """Raised with every row error found; errors is a list of {"row", "error"}."""
+
+    def __init__(self, errors: list[dict]):
+        super().__init__(f"{len(errors)} invalid rows")
+        self.errors = errors
+
+
+def _validate(rows: Iterable[tuple[int, dict]]) -> list[tuple[int, schemas.PeriodLogCreate]]:
+    valid, errors = [], []
+    for row_number, data in rows:
+        if len(valid) + len(errors) >= MAX_IMPORT_ROWS:
+            raise PeriodImportError([{"row": row_number, "error": f"More than {MAX_IMPORT_ROWS} rows"}])
+        if not isinstance(data, dict):
+            errors.append({"row": row_number, "error": "Expected an object"})
+            continue
+        try:
+            period = schemas.PeriodLogCreate(**data)
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            errors.append({"row": row_number, "error": message})
+            continue
+        if period.end_date < period.start_date:
+            errors.append({"row": row_number, "error": "End date cannot be before start date"})
+            continue
+        valid.append((row_number, period))
+    if errors:
+        raise PeriodImportError(errors)
+    return valid
+
+
+def parse_json_rows(items) -> list[tuple[int, schemas.PeriodLogCreate]]:
+    if not isinstance(items, list):
+        raise PeriodImportError([{"row": 0, "error": "Expected a list of period logs"}])
+    return _validate(enumerate(items, 1))
+
+
+def _csv_value(field: str, value: Optional[str]):
+    value = (value or "").strip()
+    if field == "exclude_from_stats":
+        return value.lower() in TRUE_VALUES
+    return value or None
+
+
+def decode_csv(data: bytes) -> str:
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise PeriodImportError([{"row": 0, "error": "CSV must be UTF-8 encoded"}])
+
+
+def parse_csv_rows(text: str) -> list[tuple[int, schemas.PeriodLogCreate]]:
+    """Rows are numbered by CSV line, the header being line 1."""
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    missing = {"start_date", "end_date"} - set(reader.fieldnames or ())
+    if missing:
+        raise PeriodImportError([{"row": 1, "error": f"Missing columns: {', '.join(sorted(missing))}"}])
+    return _validate(
+        (reader.line_num, {f: _csv_value(f, row.get(f)) for f in CSV_FIELDS if f in row})
+        for row in reader
+    )
+
+
+def check_rows(new_rows, existing):
+    """
+    Split validated rows into (to_insert, duplicates) against the user's
+    existing (start_date, end_date) pairs and each other. A row identical
+    to one already stored (or earlier in the upload) is a duplicate and
+    skipped, so re-importing a file is harmless; any other overlap is an
+    error. Duplicates are matched exactly against a set first, since stored
+    logs may overlap each other; then one sort and one pass over all intervals.
+    """
+    seen = set(existing)
+    kept, duplicates = [], 0
+    for row, p in new_rows:
+        if (p.start_date, p.end_date) in seen:
+            duplicates += 1
+            continue
+        seen.add((p.start_date, p.end_date))
+        kept.append((row, p))
+
+    intervals = sorted(
+        [(start, end, 0, None) for start, end in existing]
+        + [(p.start_date, p.end_date, 1, (row, p)) for row, p in kept],
+        key=lambda x: (x[0], x[1], x[2]),
+    )
+    to_insert, errors = [], []
+    prev = None
+    for start, end, is_new, item in intervals:
+        if prev is not None and start <= prev[1] and (is_new or prev[2]):
+            row = item[0] if is_new else prev[3][0]
+            errors.append({
+                "row": row,
+                "error": f"Overlaps the period {prev[0]} – {prev[1]}" if is_new
+                else f"Overlaps the stored period {start} – {end}",
+            })
+        if is_new:
+            to_insert.append(item[1])
+        if prev is None or end >= prev[1]:
+            prev = (start, end, is_new, item)
+    if errors:
+        raise PeriodImportError(sorted(errors, key=lambda e: e["row"]))
+    return to_insert, duplicates
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterable[str]:
+    """CSV text (header first) for (start_date, end_date, flow_intensity, exclude) tuples."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_FIELDS)
+    pending = 0
+    for start, end, flow, excluded in rows:
+        writer.writerow((start.isoformat(), end.isoformat(), flow or "", "true" if excluded else "false"))
+        pending += 1
+        if pending == CSV_CHUNK_ROWS:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue()
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+
+import schemas
+
+
+# Pure prediction math, shared by the sync and async endpoints and the
+# cohort engine (cohort.py). Inputs are already-loaded rows (CycleSettings,
+# PeriodLog list sorted by start_date); nothing here touches the database.
+# average_lengths() and prediction_offsets() take scalars or NumPy arrays,
+# so per-user and batch predictions run the same arithmetic.
+
+OVULATION_BEFORE_NEXT_PERIOD = 14  # days
+FERTILE_WINDOW_HALF_WIDTH = 2  # days either side of ovulation
+
+class PredictionError(ValueError):
+    """Raised when there is not enough data to predict."""
+
+
+def average_lengths(default_cycle, default_period, included_count, included_span, period_length_sum):
+    """
+    (cycle_length, period_length) as int64 arrays (0-d for scalar input).
+
+    included_span is last - first included start date in days: the mean of
+    consecutive cycle lengths telescopes to span / (count - 1). Rounding is
+    half-to-even, like Python's round().
+    """
+    n = np.asarray(included_count, dtype=np.int64)
+    cycle = np.where(
+        n >= 2,
+        np.rint(np.asarray(included_span, dtype=np.int64) / np.maximum(n - 1, 1)),
+        default_cycle,
+    ).astype(np.int64)
+    period = np.where(
+        n >= 1,
+        np.rint(np.asarray(period_length_sum, dtype=np.int64) / np.maximum(n, 1)),
+        default_period,
+    ).astype(np.int64)
+    return cycle, period
+
+
+def prediction_offsets(cycle_length, period_length):
+    """
+    Day offsets from the last period start:
+    (next_start, next_end, ovulation, fertile_start, fertile_end).
+    """
+    next_start = cycle_length
+    next_end = next_start + period_length - 1
+    ovulation = cycle_length - OVULATION_BEFORE_NEXT_PERIOD
+    return (
+        next_start,
+        next_end,
+        ovulation,
+        ovulation - FERTILE_WINDOW_HALF_WIDTH,
+        ovulation + FERTILE_WINDOW_HALF_WIDTH,
+    )
+
+
+def _last_start(settings, has_periods: bool, last_period_start):
+    if has_periods:
+        return last_period_start
+    if not settings.first_period_start_date:
+        raise PredictionError("No period logs or first period start date set")
+    return settings.first_period_start_date
+
+
+def cycle_stats(settings, periods: list):
+    """Return (cycle_length, period_length, last_period_start)."""
+    # Determine cycle length from included logs
+    included_periods = [p for p in periods if not p.exclude_from_stats]
+
+    span = 0
+    if included_periods:
+        span = (included_periods[-1].start_date - included_periods[0].start_date).days
+    lengths = sum((p.end_date - p.start_date).days + 1 for p in included_periods)
+
+    cycle_length, period_length = average_lengths(
+        settings.average_cycle_length,
+        settings.average_period_length,
+        len(included_periods),
+        span,
+        lengths,
+    )
+    last_period_start = _last_start(settings, bool(periods), periods[-1].start_date if periods else None)
+    return int(cycle_length), int(period_length), last_period_start
+
+
+def cycle_stats_from_record(settings, stats):
+    """
+    Same result as cycle_stats(), from a models.CycleStats row instead of
+    the full period list.
+    """
+    span = 0
+    if stats.included_count:
+        span = (stats.last_included_start - stats.first_included_start).days
+
+    cycle_length, period_length = average_lengths(
+        settings.average_cycle_length,
+        settings.average_period_length,
+        stats.included_count,
+        span,
+        stats.period_length_sum,
+    )
+    last_period_start = _last_start(settings, stats.period_count > 0, stats.last_period_start)
+    return int(cycle_length), int(period_length), last_period_start
+
+
+def build_prediction(
+    settings,
+    cycle_length: int,
+    period_length: int,
+    last_period_start: date,
+    today: Optional[date] = None,
+) -> schemas.PredictionResponse:
+    # If pregnancy or irregular mode is active, we still compute, but mark flags
+    irregular = bool(settings.irregular_cycle_mode)
+
+    (
+        next_period_start,
+        next_period_end,
+        ovulation_day,
+        fertile_window_start,
+        fertile_window_end,
+    ) = (
+        last_period_start + timedelta(days=int(offset))
+        for offset in prediction_offsets(cycle_length, period_length)
+    )
+
+    today = today or date.today()
+    cycle_day_today = (today - last_period_start).days + 1
+
+    return schemas.PredictionResponse(
+        next_period_start=next_period_start,
+        next_period_end=next_period_end,
+        ovulation_day=ovulation_day,
+        fertile_window_start=fertile_window_start,
+        fertile_window_end=fertile_window_end,
+        cycle_day_today=max(cycle_day_today, 0),
+        cycle_length_used=cycle_length,
+        period_length_used=period_length,
+        irregular_cycle_mode=irregular,
+        pregnancy_mode=settings.pregnancy_mode,
+        lactation_mode=settings.lactation_mode,
+        show_fertile_window=settings.show_fertile_window,
+    )
+
+
+def build_cycle_history(periods: list) -> schemas.CycleHistoryResponse:
+    items: list[schemas.CycleHistoryItem] = []
+
+    for idx, p in enumerate(periods):
+        cycle_length = None
+        if idx + 1 < len(periods):
+            cycle_length = (periods[idx + 1].start_date - p.start_date).days
+        items.append(
+            schemas.CycleHistoryItem(
+                start_date=p.start_date,
+                end_date=p.end_date,
+                cycle_length=cycle_length,
+                excluded_from_stats=p.exclude_from_stats,
+            )
+        )
+
+    return schemas.CycleHistoryResponse(periods=items)
+
+
+class PredictionCache:
+    """
+    In-process LRU of PredictionResponse per user. Entries are keyed by
+    day (cycle_day_today changes at midnight) and dropped by crud on every
+    write that affects predictions. The cache is per process: with several
+    workers a write only clears the local copy, so the TTL bounds how
+    stale another worker's entry can get.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, today: date):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None or entry[0] != today or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self._data.move_to_end(user_id)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, user_id: int, today: date, response) -> None:
+        with self._lock:
+            self._data[user_id] = (today, time.monotonic() + self.ttl, response)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+prediction_cache = PredictionCache(
+    maxsize=int(os.environ.get("PREDICTION_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 300)),
+)
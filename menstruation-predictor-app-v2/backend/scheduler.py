@@ -0,0 +1,262 @@
+# backend/scheduler.py
+"""
+Reminder scheduler.
+
+Each enabled reminder (user x kind) has one scheduled_reminders row holding
+its next firing time. crud calls reschedule_user() on every settings or
+period write, so the rows always reflect the latest prediction. The worker
+loop then only reads rows with next_fire_at <= now through the index,
+sends them in batches through a pluggable sender (senders.py) and moves
+each fired row to its next occurrence. Between ticks it sleeps until the
+earliest next_fire_at (capped), so an idle system does no scanning at all.
+
+    python scheduler.py --backfill            # create rows for existing users
+    python scheduler.py --once                # send what is due now, then exit
+    python scheduler.py --sender file:out.jsonl
+
+Delivery is at-least-once: a batch is sent before its rows are committed.
+Times are UTC (datetime.utcnow, like the rest of the models) until users
+get a timezone setting; daily_log_time / medication_time are "HH:MM".
+"""
+import argparse
+import os
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import cycle_model
+import models
+from cohort import FERTILE_WINDOW, OVULATION, PERIOD_END, PERIOD_SOON
+from predictions import PredictionError, cycle_stats, cycle_stats_from_record, prediction_offsets
+from senders import Notification, NotificationSender, get_sender
+
+DAILY_LOG = "daily_log"
+MEDICATION = "medication"
+
+# Time of day for cycle reminders (period, fertile window, ovulation)
+REMINDER_TIME = os.environ.get("REMINDER_TIME", "09:00")
+
+BATCH_SIZE = 1000
+MAX_SLEEP_SECONDS = 60
+
+MESSAGES = {
+    PERIOD_SOON: "Your period is expected to start on {event_date:%b %d}. 🩷",
+    PERIOD_END: "Your period is expected to end around {event_date:%b %d}.",
+    FERTILE_WINDOW: "Your fertile window is predicted to start today.",
+    OVULATION: "Today is your predicted ovulation day.",
+    DAILY_LOG: "Time for your daily check-in: how are you feeling today?",
+    MEDICATION: "Reminder to take your medication. 💊",
+}
+
+
+def parse_hhmm(value: Optional[str]) -> Optional[dt_time]:
+    try:
+        hours, minutes = (int(x) for x in (value or "").split(":"))
+        return dt_time(hours, minutes)
+    except ValueError:
+        return None
+
+
+def _next_daily(at: dt_time, now: datetime) -> datetime:
+    fire = datetime.combine(now.date(), at)
+    return fire if fire > now else fire + timedelta(days=1)
+
+
+def _next_cycle_fire(event: date, lead_days: int, cycle_length: int, at: dt_time, now: datetime):
+    """First (fire_at, event_date) after now, rolling forward one predicted cycle at a time."""
+    fire = datetime.combine(event - timedelta(days=lead_days), at)
+    if fire <= now:
+        step = max(cycle_length, 1)
+        cycles = (now - fire).days // step + 1
+        event += timedelta(days=cycles * step)
+        fire += timedelta(days=cycles * step)
+    return fire, event
+
+
+def next_fire_times(settings, notifications, stats, periods, now: datetime, length_stats=None) -> dict:
+    """
+    {kind: (fire_at, event_date)} for every enabled reminder.
+    stats may be None, in which case periods (sorted list) are used.
+    length_stats (CycleLengthStats) applies PREDICTION_MODEL like /predictions.
+    """
+    due = {}
+    if notifications is None:
+        return due
+
+    for kind, enabled, at in (
+        (DAILY_LOG, notifications.notify_daily_log, notifications.daily_log_time),
+        (MEDICATION, notifications.notify_medication, notifications.medication_time),
+    ):
+        parsed = parse_hhmm(at)
+        if enabled and parsed:
+            due[kind] = (_next_daily(parsed, now), None)
+
+    if settings is None or settings.pregnancy_mode:
+        return due
+    try:
+        if stats is not None:
+            cycle_length, period_length, last_start = cycle_stats_from_record(settings, stats)
+        else:
+            cycle_length, period_length, last_start = cycle_stats(settings, periods)
+    except PredictionError:
+        return due
+    cycle_length = cycle_model.model_cycle_length(cycle_length, length_stats)
+
+    next_start, next_end, ovulation, fertile_start, _ = (
+        int(x) for x in prediction_offsets(cycle_length, period_length)
+    )
+    fertile_ok = settings.show_fertile_window
+    reminder_at = parse_hhmm(REMINDER_TIME) or dt_time(9, 0)
+
+    for kind, enabled, offset, lead in (
+        (PERIOD_SOON, notifications.notify_period, next_start,
+         notifications.period_reminder_days_before or 0),
+        (PERIOD_END, notifications.notify_period_end, next_end, 0),
+        (FERTILE_WINDOW, fertile_ok and notifications.notify_fertile_window, fertile_start, 0),
+        (OVULATION, fertile_ok and notifications.notify_ovulation, ovulation, 0),
+    ):
+        if enabled:
+            due[kind] = _next_cycle_fire(
+                last_start + timedelta(days=offset), lead, cycle_length, reminder_at, now
+            )
+    return due
+
+
+def reschedule_user(db: Session, user_id: int, now: Optional[datetime] = None) -> None:
+    """Bring a user's scheduled_reminders rows in line with their settings (no commit)."""
+    now = now or datetime.utcnow()
+    db.flush()
+
+    settings = db.query(models.CycleSettings).filter(models.CycleSettings.user_id == user_id).first()
+    notifications = (
+        db.query(models.NotificationSettings)
+        .filter(models.NotificationSettings.user_id == user_id)
+        .first()
+    )
+    stats = db.query(models.CycleStats).filter(models.CycleStats.user_id == user_id).first()
+    length_stats = (
+        db.query(models.CycleLengthStats)
+        .filter(models.CycleLengthStats.user_id == user_id)
+        .first()
+    )
+    periods = []
+    if stats is None:
+        periods = (
+            db.query(models.PeriodLog)
+            .filter(models.PeriodLog.user_id == user_id)
+            .order_by(models.PeriodLog.start_date.asc())
+            .all()
+        )
+
+    wanted = next_fire_times(settings, notifications, stats, periods, now, length_stats)
+    existing = {
+        r.kind: r for r in
+        db.query(models.ScheduledReminder).filter(models.ScheduledReminder.user_id == user_id)
+    }
+
+    for kind, row in existing.items():
+        if kind not in wanted:
+            db.delete(row)
+    for kind, (fire_at, event_date) in wanted.items():
+        row = existing.get(kind)
+        if row is None:
+            row = models.ScheduledReminder(user_id=user_id, kind=kind)
+            db.add(row)
+        row.next_fire_at = fire_at
+        row.event_date = event_date
+
+
+def run_due(db: Session, sender: NotificationSender, now: Optional[datetime] = None,
+            batch_size: int = BATCH_SIZE) -> int:
+    """Send every reminder due at `now`, batch by batch. Returns how many were sent."""
+    now = now or datetime.utcnow()
+    sent = 0
+    while True:
+        rows = (
+            db.query(models.ScheduledReminder, models.User.email)
+            .join(models.User, models.User.id == models.ScheduledReminder.user_id)
+            .filter(models.ScheduledReminder.next_fire_at <= now)
+            .order_by(models.ScheduledReminder.next_fire_at)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return sent
+
+        sender.send_batch([
+            Notification(
+                user_id=r.user_id,
+                email=email,
+                kind=r.kind,
+                event_date=r.event_date,
+                fire_at=r.next_fire_at,
+                message=MESSAGES[r.kind].format(event_date=r.event_date or now.date()),
+            )
+            for r, email in rows
+        ])
+
+        for r, _ in rows:
+            r.last_fired_at = now
+        # Next occurrence from the current prediction; always later than now
+        for user_id in {r.user_id for r, _ in rows}:
+            reschedule_user(db, user_id, now)
+        db.commit()
+        sent += len(rows)
+
+
+def seconds_until_next(db: Session, now: datetime, cap: float = MAX_SLEEP_SECONDS) -> float:
+    nxt = db.query(func.min(models.ScheduledReminder.next_fire_at)).scalar()
+    if nxt is None:
+        return cap
+    return min(cap, max(0.0, (nxt - now).total_seconds()))
+
+
+def run_forever(sender: NotificationSender, batch_size: int = BATCH_SIZE) -> None:
+    from database import SessionLocal
+
+    while True:
+        with SessionLocal() as db:
+            sent = run_due(db, sender, batch_size=batch_size)
+            if sent:
+                print(f"Sent {sent} reminders")
+            pause = seconds_until_next(db, datetime.utcnow())
+        time.sleep(pause)
+
+
+def backfill(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """Schedule reminders for all existing users."""
+    user_ids = [uid for (uid,) in db.query(models.User.id).order_by(models.User.id)]
+    now = datetime.utcnow()
+    for i, user_id in enumerate(user_ids, 1):
+        reschedule_user(db, user_id, now)
+        if i % batch_size == 0:
+            db.commit()
+    db.commit()
+    return len(user_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PinkCycle reminder scheduler")
+    parser.add_argument("--sender", help='"console" or "file:<path>" (default: NOTIFICATION_SENDER)')
+    parser.add_argument("--once", action="store_true", help="Send what is due now and exit")
+    parser.add_argument("--backfill", action="store_true", help="Create reminder rows for all users")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    sender = get_sender(args.sender)
+
+    if args.backfill:
+        with SessionLocal() as db:
+            print(f"Scheduled reminders for {backfill(db, args.batch_size)} users")
+    if args.once:
+        with SessionLocal() as db:
+            print(f"Sent {run_due(db, sender, batch_size=args.batch_size)} reminders")
+    elif not args.backfill:
+        run_forever(sender, batch_size=args.batch_size)
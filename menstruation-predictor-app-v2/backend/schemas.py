@@ -37,6 +37,12 @@ class UserProfile(UserBase):
         orm_mode = True
 
 
+class AuthResponse(UserProfile):
+    """Profile plus the bearer token for the other endpoints."""
+    access_token: str
+    token_type: str = "bearer"
+
+
 # Settings
 
 class CycleSettingsBase(BaseModel):
@@ -112,6 +118,11 @@ class PeriodLogResponse(PeriodLogBase):
         orm_mode = True
 
 
+class PeriodImportResult(BaseModel):
+    inserted: int
+    skipped_duplicates: int
+
+
 # Predictions & history
 
 class PredictionResponse(BaseModel):
@@ -127,6 +138,14 @@ class PredictionResponse(BaseModel):
     pregnancy_mode: bool
     lactation_mode: bool
     show_fertile_window: bool
+    # Prediction intervals (see cycle_model.py)
+    prediction_model: Optional[str] = None
+    cycle_length_sd: Optional[float] = None
+    interval_coverage: Optional[float] = None
+    next_period_start_earliest: Optional[date] = None
+    next_period_start_latest: Optional[date] = None
+    fertile_window_earliest: Optional[date] = None
+    fertile_window_latest: Optional[date] = None
 
 
 class CycleHistoryItem(BaseModel):
@@ -164,4 +183,5 @@ class FAQRequest(BaseModel):
     user_id: int | None = None
 
 class FAQResponse(BaseModel):
-    answer: str
\ No newline at end of file
+    answer: str
+    source: str = "model"  # canned | cache | similar | model
\ No newline at end of file
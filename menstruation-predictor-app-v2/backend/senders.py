@@ -0,0 +1,59 @@
+# backend/senders.py
+"""
+Pluggable delivery for reminder notifications.
+
+The scheduler hands each sender a batch of Notification objects. Pick one
+with NOTIFICATION_SENDER:
+
+- "console" (default): print one line per notification
+- "file:<path>": append one JSON line per notification (handy in tests)
+
+A push or email sender only needs a send_batch() method.
+"""
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Optional
+
+
+@dataclass
+class Notification:
+    user_id: int
+    email: str
+    kind: str
+    event_date: Optional[date]
+    fire_at: datetime
+    message: str
+
+
+class NotificationSender:
+    def send_batch(self, notifications: list[Notification]) -> None:
+        raise NotImplementedError
+
+
+class ConsoleSender(NotificationSender):
+    def send_batch(self, notifications):
+        for n in notifications:
+            print(f"[{n.fire_at:%Y-%m-%d %H:%M}] {n.kind} -> {n.email}: {n.message}")
+
+
+class FileSender(NotificationSender):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_batch(self, notifications):
+        lines = [json.dumps(asdict(n), default=str) for n in notifications]
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write("".join(line + "\n" for line in lines))
+
+
+def get_sender(spec: Optional[str] = None) -> NotificationSender:
+    spec = spec or os.environ.get("NOTIFICATION_SENDER", "console")
+    if spec == "console":
+        return ConsoleSender()
+    if spec.startswith("file:"):
+        return FileSender(spec[len("file:"):])
+    raise ValueError(f"Unknown notification sender: {spec}")
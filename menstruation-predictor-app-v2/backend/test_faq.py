@@ -0,0 +1,167 @@
+# backend/test_faq.py
+"""
+FAQ matching and /ai/faq against the local stub model.
+
+fake_gemini_server.py runs in-process on a free port and the API uses a
+throwaway SQLite file, so nothing leaves the machine:
+
+    python test_faq.py
+    pytest test_faq.py
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from fake_gemini_server import FakeGeminiHandler, make_server
+from faq import CannedAnswers, FaqCache, RateLimiter, _guard, canned_answers, tokens
+
+ADMIN_EMAIL = "faq-admin@example.com"
+
+main = None
+_stub = None
+_tmp = None
+
+
+def setUpModule():
+    global main, _stub, _tmp
+    _stub = make_server(0, delay=0)
+    threading.Thread(target=_stub.serve_forever, daemon=True).start()
+    _tmp = tempfile.TemporaryDirectory()
+    # Read when ai_client / auth / database are imported
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(_tmp.name, 'faq.db')}",
+        "AUTH_SECRET_KEYS": "test",
+        "ADMIN_EMAILS": ADMIN_EMAIL,
+        "GOOGLE_AI_API_KEY": "fake",
+        "GOOGLE_AI_API_BASE": f"http://127.0.0.1:{_stub.server_address[1]}",
+        "EMAIL_OUTBOX_WORKER": "0",
+        "RESET_TOKEN_SWEEP_SECONDS": "0",
+    })
+    import main as app_main
+
+    main = app_main
+
+
+def tearDownModule():
+    _stub.shutdown()
+    _stub.server_close()
+    _tmp.cleanup()
+
+
+class MatchingTests(unittest.TestCase):
+    def test_canned_rephrasing(self):
+        self.assertEqual(
+            canned_answers.get("How long should a period last?"),
+            canned_answers.get("How long does a period last?"),
+        )
+        self.assertIsNotNone(canned_answers.get("How long does a period last?"))
+
+    def test_qualifiers_block_canned_match(self):
+        # A low threshold matches these on the shared words alone
+        canned = CannedAnswers(threshold=0.5)
+        self.assertIsNotNone(canned.get("How long does a period last?"))
+        self.assertIsNone(canned.get("How long does a period last after birth?"))
+        self.assertIsNone(canned.get("What is a normal cycle length while breastfeeding?"))
+        self.assertIsNone(canned.get("How long is a normal period on the pill?"))
+
+    def test_cache_requires_same_numbers_and_qualifiers(self):
+        cache = FaqCache(threshold=0.5)
+        cache.set("Can I get pregnant on my period?", None, "pregnancy answer")
+        cache.set("Is a 35-day cycle normal?", None, "35 answer")
+
+        self.assertEqual(cache.get("can i get pregnant on my period", None), ("pregnancy answer", False))
+        self.assertEqual(cache.get("can you get pregnant during your period", None), ("pregnancy answer", True))
+        self.assertEqual(cache.get("Is a 21-day cycle normal?", None), (None, False))
+        self.assertEqual(cache.get("Is a 35-day cycle normal while breastfeeding?", None), (None, False))
+        # Qualifiers compare by stem: pregnant / pregnancy are the same
+        self.assertEqual(_guard(tokens("while pregnant")), _guard(tokens("in pregnancy")))
+
+
+class EndpointTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+
+        cls.client = TestClient(main.app)
+        cls.client.__enter__()
+        cls.user = cls.register("faq-user@example.com")
+        cls.admin = cls.register(ADMIN_EMAIL)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    @classmethod
+    def register(cls, email):
+        res = cls.client.post("/register", json={"email": email, "password": "testpass"})
+        res.raise_for_status()
+        return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    def setUp(self):
+        main.faq_cache.clear()
+        main.faq_metrics.reset()
+        patcher = mock.patch("main.rate_limiter", RateLimiter(per_minute=600, burst=100))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, question, headers=None):
+        res = self.client.post("/ai/faq", json={"question": question}, headers=headers or {})
+        self.assertEqual(res.status_code, 200, res.text)
+        return res.json()
+
+    def model_calls(self, fn):
+        before = FakeGeminiHandler.requests
+        result = fn()
+        return result, FakeGeminiHandler.requests - before
+
+    def test_model_answer_is_reused(self):
+        first, calls = self.model_calls(lambda: self.ask("Can stress delay my period?"))
+        self.assertEqual((first["source"], calls), ("model", 1))
+
+        again, calls = self.model_calls(lambda: self.ask("does stress delay periods"))
+        self.assertEqual((again["source"], calls), ("cache", 0))
+        self.assertEqual(again["answer"], first["answer"])
+
+    def test_canned_answer_skips_model(self):
+        res, calls = self.model_calls(lambda: self.ask("What is PMS?"))
+        self.assertEqual((res["source"], calls), ("canned", 0))
+
+    def test_qualified_question_reaches_model(self):
+        res, calls = self.model_calls(lambda: self.ask("How long does a period last while breastfeeding?"))
+        self.assertEqual((res["source"], calls), ("model", 1))
+
+    def test_streamed_answer_is_cached(self):
+        with self.client.stream(
+            "POST", "/ai/faq", json={"question": "Why do I get cramps during my period?"},
+            headers={"Accept": "text/event-stream"},
+        ) as res:
+            lines = [line for line in res.iter_lines() if line.startswith("data:")]
+        done = json.loads(lines[-1][5:])
+        self.assertEqual(done["source"], "model")
+        self.assertEqual("".join(json.loads(line[5:])["delta"] for line in lines[:-1]), done["answer"])
+
+        self.assertEqual(self.ask("why do i get cramps during periods")["source"], "cache")
+
+    def test_rate_limit_counts_model_calls_only(self):
+        with mock.patch("main.rate_limiter", RateLimiter(per_minute=1, burst=2)):
+            self.ask("Can travel affect my cycle?", self.user)
+            self.ask("Is it okay to swim during my period?", self.user)
+            self.ask("What is PMS?", self.user)  # canned: free
+            res = self.client.post("/ai/faq", json={"question": "Can fasting affect my cycle?"}, headers=self.user)
+        self.assertEqual(res.status_code, 429)
+        self.assertIn("Retry-After", res.headers)
+
+    def test_metrics_are_admin_only(self):
+        self.ask("What is PMS?")
+        self.assertEqual(self.client.get("/ai/faq/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/ai/faq/metrics", headers=self.user).status_code, 403)
+        res = self.client.get("/ai/faq/metrics", headers=self.admin)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["sources"]["canned"]["count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+# backend/test_startup.py
+"""
+Startup checks, run in fresh interpreters so nothing leaks into (or from)
+the other tests' imported `main`:
+
+- `import main` is fast and touches nothing: it succeeds with no
+  credentials (not even AUTH_SECRET_KEYS), no network and a DATABASE_URL
+  whose file does not exist, leaves that file uncreated, does not import
+  the lazily loaded client libraries, and its median time is within
+  IMPORT_BUDGET_MS (default 1500 ms) over STARTUP_RUNS runs (default 5);
+- the app's lifespan refuses to start without AUTH_SECRET_KEYS and
+  starts with it.
+
+    pytest test_startup.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 1500))
+STARTUP_RUNS = int(os.environ.get("STARTUP_RUNS", 5))
+
+# Only needed on first use; importing them at startup is a regression
+LAZY_MODULES = ("google.genai", "googleapiclient", "google.oauth2", "argon2")
+
+# Settings read from the environment (or .env) that these checks control
+CONTROLLED_ENV = ("GOOGLE_AI_API_KEY", "AUTH_SECRET_KEYS", "AUTH_DEV_RANDOM_KEY", "DATABASE_URL")
+
+IMPORT_PROBE = f"""
+import json, socket, sys, time
+
+def _no_network(*args, **kwargs):
+    raise OSError("network access while importing main")
+
+socket.socket.connect = socket.socket.connect_ex = _no_network
+socket.create_connection = socket.getaddrinfo = _no_network
+
+started = time.perf_counter()
+import main
+seconds = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": seconds,
+    "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+LIFESPAN_PROBE = """
+from fastapi.testclient import TestClient
+import main
+
+with TestClient(main.app) as client:
+    client.get("/health").raise_for_status()
+"""
+
+
+@pytest.fixture
+def startup_env(tmp_path):
+    """
+    Environment for a probe: none of the credentials, a fresh database path,
+    no outbox worker or sweeper threads, and an empty working directory so
+    a developer's .env is not picked up.
+    """
+    env = {k: v for k, v in os.environ.items() if k not in CONTROLLED_ENV}
+    env.update({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}",
+        "EMAIL_OUTBOX_WORKER": "0",
+        "RESET_TOKEN_SWEEP_SECONDS": "0",
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get("PYTHONPATH")])
+        ),
+    })
+    return env
+
+
+def run(env, cwd, code, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=cwd, env=env, capture_output=True, text=True,
+    )
+
+
+def slowest_imports(stderr: str, top: int = 15):
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def test_import_is_fast_and_touches_nothing(startup_env, tmp_path):
+    times = []
+    for _ in range(STARTUP_RUNS):
+        result = run(startup_env, tmp_path, IMPORT_PROBE)
+        assert result.returncode == 0, f"`import main` raised without credentials/network:\n{result.stderr}"
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(report["seconds"] * 1000)
+
+    assert report["loaded"] == [], "imported at startup"
+    assert not (tmp_path / "startup.db").exists(), "the database was created at import time"
+
+    median = statistics.median(times)
+    if median > IMPORT_BUDGET_MS:
+        slowest = slowest_imports(run(startup_env, tmp_path, IMPORT_PROBE, "-X", "importtime").stderr)
+        pytest.fail(
+            f"median `import main` {median:.0f} ms is over the {IMPORT_BUDGET_MS:.0f} ms budget; slowest:\n"
+            + "\n".join(f"  {micros / 1000:8.1f} ms  {name}" for micros, name in slowest)
+        )
+
+
+def test_lifespan_requires_signing_key(startup_env, tmp_path):
+    result = run(startup_env, tmp_path, LIFESPAN_PROBE)
+    assert result.returncode != 0
+    assert "AUTH_SECRET_KEYS is not set" in result.stderr
+
+    result = run({**startup_env, "AUTH_SECRET_KEYS": "startup-test"}, tmp_path, LIFESPAN_PROBE)
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "startup.db").exists(), "the lifespan did not set up the database"
@@ -45,7 +45,9 @@ function App() {
   
   useEffect(() => {
     const storedId = window.localStorage.getItem('pinkcycle_user_id')
-    if (storedId) {
+    const storedToken = window.localStorage.getItem('pinkcycle_token')
+    if (storedId && storedToken) {
+      api.setAuthToken(storedToken)
       const parsed = Number(storedId)
       if (!Number.isNaN(parsed)) {
         api
@@ -56,7 +58,9 @@ function App() {
             refreshCore(parsed)
           })
           .catch(() => {
+            api.setAuthToken(null)
             window.localStorage.removeItem('pinkcycle_user_id')
+            window.localStorage.removeItem('pinkcycle_token')
           })
       }
     }
@@ -97,9 +101,12 @@ function App() {
   }
 
   const handleLoggedIn = (profile) => {
-    setUser(profile)
+    const { access_token: token, token_type: _type, ...userProfile } = profile
+    api.setAuthToken(token)
+    setUser(userProfile)
     setUserId(profile.id)
     window.localStorage.setItem('pinkcycle_user_id', String(profile.id))
+    window.localStorage.setItem('pinkcycle_token', token)
     refreshCore(profile.id)
   }
 
@@ -109,7 +116,9 @@ function App() {
     setPredictions(null)
     setSettings(null)
     setNotifications(null)
+    api.setAuthToken(null)
     window.localStorage.removeItem('pinkcycle_user_id')
+    window.localStorage.removeItem('pinkcycle_token')
   }
 
   const handlePeriodSaved = async () => {
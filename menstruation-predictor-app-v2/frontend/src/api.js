@@ -2,7 +2,18 @@ import axios from 'axios'
 
 const API_BASE = 'http://127.0.0.1:8000'
 
+let authToken = null
+
 export const api = {
+  // Bearer token from /login or /register, sent with every request
+  setAuthToken(token) {
+    authToken = token
+    if (token) {
+      axios.defaults.headers.common.Authorization = `Bearer ${token}`
+    } else {
+      delete axios.defaults.headers.common.Authorization
+    }
+  },
   async register(payload) {
     return axios.post(`${API_BASE}/register`, payload)
   },
@@ -67,6 +78,43 @@ async resetPassword(token, newPassword) {
       user_id: userId ?? null,
     })
   },
+  // Streams the FAQ answer (server-sent events); calls onDelta(text) per chunk
+  async streamFaq(question, userId, onDelta) {
+    const res = await fetch(`${API_BASE}/ai/faq`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'text/event-stream',
+        ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
+      },
+      body: JSON.stringify({ question, user_id: userId ?? null }),
+    })
+    if (!res.ok || !res.body) throw new Error(`AI FAQ failed: ${res.status}`)
+
+    const reader = res.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let answer = ''
+    for (;;) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const events = buffer.split('\n\n')
+      buffer = events.pop()
+      for (const raw of events) {
+        const lines = raw.split('\n')
+        const event = (lines.find((l) => l.startsWith('event:')) || 'event: message').slice(6).trim()
+        const dataLine = lines.find((l) => l.startsWith('data:'))
+        if (!dataLine) continue
+        const data = JSON.parse(dataLine.slice(5))
+        if (event === 'error') throw new Error(data.detail)
+        if (event === 'done') return data.answer || answer
+        answer += data.delta
+        onDelta(data.delta)
+      }
+    }
+    return answer
+  },
 
 }
 
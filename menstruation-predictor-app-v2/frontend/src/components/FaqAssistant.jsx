@@ -24,13 +24,29 @@ function FaqAssistant({ userId }) {
     setMessages((prev) => [...prev, { role: 'user', text: q }])
     setLoading(true)
 
+    // Append the answer to one assistant bubble as it streams in
+    let started = false
+    const appendDelta = (delta) => {
+      if (!started) {
+        started = true
+        setLoading(false)
+        setMessages((prev) => [...prev, { role: 'assistant', text: delta }])
+        return
+      }
+      setMessages((prev) => {
+        const last = prev[prev.length - 1]
+        return [...prev.slice(0, -1), { ...last, text: last.text + delta }]
+      })
+    }
+
     try {
-      const res = await api.askFaq(q, userId)
-      const answer = res.data.answer || 'Sorry, I could not come up with a helpful answer right now.'
-      setMessages((prev) => [
-        ...prev,
-        { role: 'assistant', text: answer },
-      ])
+      const answer = await api.streamFaq(q, userId, appendDelta)
+      if (!started) {
+        setMessages((prev) => [
+          ...prev,
+          { role: 'assistant', text: answer || 'Sorry, I could not come up with a helpful answer right now.' },
+        ])
+      }
     } catch (err) {
       console.error(err)
       setError('The AI assistant is currently unavailable. Please try again in a bit.')